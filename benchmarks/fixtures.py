@@ -0,0 +1,291 @@
+"""Offline stand-ins for the services the call log pipeline talks to.
+
+The pipeline normally reads CELs from the asterisk database, looks participants
+up in wazo-confd, schedules in the wazo database and writes call logs through
+`plugin_reports_call_log`. The benchmarks replace those with in-process fakes
+so only the plugin's own code is measured.
+"""
+import json
+import re
+import uuid
+from contextlib import ExitStack, contextmanager
+from types import SimpleNamespace
+from unittest import mock
+
+from dateutil import parser as dateutil_parser
+from xivo.asterisk.protocol_interface import (
+    InvalidChannelError,
+    protocol_interface_from_channel,
+)
+from xivo_dao.alchemy.cel import CEL
+
+from workano_reports_plugin import generator as generator_module
+from workano_reports_plugin import manager as manager_module
+from workano_reports_plugin import writer as writer_module
+from workano_reports_plugin.cel_interpretor import default_interpretors
+from workano_reports_plugin.generator import CallLogsGenerator
+
+TENANT_UUID = '00000000-0000-4000-8000-000000000001'
+UUID_REGEX = re.compile(r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}')
+
+# contexts whose channels are trunks rather than user lines
+TRUNK_CONTEXT_MARKERS = ('incall', 'outcall', 'to-extern', 'from-extern')
+
+
+def _cel_from_dict(item):
+    call_log_id = item.get('call_log_id')
+    return CEL(
+        id=int(item['id']),
+        eventtype=item['eventtype'],
+        eventtime=dateutil_parser.isoparse(item['eventtime']),
+        userdeftype=item.get('userdeftype', ''),
+        cid_name=item.get('cid_name', ''),
+        cid_num=item.get('cid_num', ''),
+        cid_ani=item.get('cid_ani', ''),
+        cid_rdnis=item.get('cid_rdnis', ''),
+        cid_dnid=item.get('cid_dnid', ''),
+        exten=item.get('exten', ''),
+        context=item.get('context', ''),
+        channame=item.get('channame', ''),
+        appname=item.get('appname', ''),
+        appdata=item.get('appdata', ''),
+        amaflags=int(item.get('amaflags') or 0),
+        accountcode=item.get('accountcode', ''),
+        peeraccount=item.get('peeraccount', ''),
+        uniqueid=item['uniqueid'],
+        linkedid=item['linkedid'],
+        userfield=item.get('userfield', ''),
+        peer=item.get('peer', ''),
+        call_log_id=int(call_log_id) if call_log_id else None,
+        extra=item.get('extra', ''),
+    )
+
+
+def load_cel_items(path):
+    """Read a CEL corpus stored as `{"items": [...]}` (the sample_cel.json format)."""
+    with open(path) as f:
+        content = json.load(f)
+    return content['items'] if isinstance(content, dict) else content
+
+
+def replicate_cel_items(items, copies):
+    """Return `copies` copies of a corpus, each with its own ids, uniqueids and linkedids.
+
+    Copies never correlate with each other (correlation goes through uniqueids
+    and linkedids), so the pipeline sees `copies` times as many calls.
+    """
+    if copies <= 1:
+        return list(items)
+    max_id = max(int(item['id']) for item in items)
+    result = []
+    for copy in range(copies):
+        for item in items:
+            item = dict(item)
+            item['id'] = str(int(item['id']) + copy * max_id)
+            if copy:
+                item['uniqueid'] = f"{item['uniqueid']}.{copy}"
+                item['linkedid'] = f"{item['linkedid']}.{copy}"
+            result.append(item)
+    return result
+
+
+def cels_from_items(items):
+    return [_cel_from_dict(item) for item in items]
+
+
+def _line_name(channame):
+    try:
+        protocol, line_name = protocol_interface_from_channel(channame)
+    except InvalidChannelError:
+        return None
+    return None if protocol == 'Local' else line_name
+
+
+def corpus_tenant_uuid(items):
+    """Return the tenant announced by the corpus' incall/outcall CELs, if any."""
+    for item in items:
+        if item['eventtype'] in ('XIVO_INCALL', 'XIVO_OUTCALL'):
+            match = UUID_REGEX.search(item.get('extra') or '')
+            if match:
+                return match.group(0)
+    return TENANT_UUID
+
+
+def trunk_line_names(items):
+    """Guess which line names are trunks from the context their channels start in."""
+    names = set()
+    for item in items:
+        if item['eventtype'] != 'CHAN_START':
+            continue
+        if any(marker in item.get('context', '') for marker in TRUNK_CONTEXT_MARKERS):
+            name = _line_name(item['channame'])
+            if name:
+                names.add(name)
+    return names
+
+
+class _FakeLines:
+    def __init__(self, confd):
+        self._confd = confd
+
+    def list(self, name=None, recurse=False):
+        if not name or name in self._confd.trunk_names:
+            return {'items': []}
+        return {'items': [self._confd.line(name)]}
+
+
+class _FakeUsers:
+    def __init__(self, confd):
+        self._confd = confd
+
+    def get(self, user_uuid):
+        return self._confd.user(user_uuid)
+
+
+class _FakeContexts:
+    def __init__(self, confd):
+        self._confd = confd
+
+    def list(self, name=None, recurse=False):
+        return {'items': [{'name': name, 'tenant_uuid': self._confd.tenant_uuid}]}
+
+
+class FakeConfd:
+    """wazo-confd client answering every non-trunk line with a one-line user.
+
+    Users known in advance (e.g. the ones of a synthetic workload) are
+    registered with `add_user`; unknown lines and user uuids get a user made up
+    on first lookup.
+    """
+
+    def __init__(self, trunk_names=(), tenant_uuid=TENANT_UUID):
+        self.trunk_names = set(trunk_names)
+        self.tenant_uuid = tenant_uuid
+        self.users_by_uuid = {}
+        self._lines = {}
+        self.lines = _FakeLines(self)
+        self.users = _FakeUsers(self)
+        self.contexts = _FakeContexts(self)
+
+    def add_user(self, user_uuid, line_name=None, exten=None, context='default'):
+        lines = []
+        if line_name:
+            line = {
+                'id': len(self._lines) + 1,
+                'name': line_name,
+                'users': [{'uuid': user_uuid}],
+                'extensions': [
+                    {'exten': exten or str(1000 + len(self._lines)), 'context': context}
+                ],
+            }
+            self._lines[line_name] = line
+            lines.append(line)
+        self.users_by_uuid[user_uuid] = {
+            'uuid': user_uuid,
+            'tenant_uuid': self.tenant_uuid,
+            'userfield': '',
+            'lines': lines,
+        }
+        return self.users_by_uuid[user_uuid]
+
+    def line(self, name):
+        if name not in self._lines:
+            self.add_user(str(uuid.uuid5(uuid.NAMESPACE_URL, name)), line_name=name)
+        return self._lines[name]
+
+    def user(self, user_uuid):
+        return self.users_by_uuid.get(user_uuid) or self.add_user(user_uuid)
+
+
+class MemoryCallLogStore:
+    """In-process replacement for the writer's database functions."""
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.call_logs = []
+        self.deleted_ids = set()
+        self.processed_linkedids = {}
+        self.watermark = 0
+
+    def create_from_list(self, call_logs, processed_linkedids=None, watermark=None):
+        self.call_logs.extend(call_logs)
+        self.processed_linkedids.update(processed_linkedids or {})
+        if watermark is not None:
+            self.watermark = watermark
+
+    def find_processed_linkedids(self, linkedids):
+        return {linkedid for linkedid in linkedids if linkedid in self.processed_linkedids}
+
+    def delete_from_list(self, call_log_ids):
+        self.deleted_ids.update(call_log_ids)
+        self.call_logs = [
+            call_log for call_log in self.call_logs if call_log.id not in call_log_ids
+        ]
+
+
+def fake_dao():
+    return SimpleNamespace(
+        tenant=SimpleNamespace(create_all_uuids_if_not_exist=lambda tenant_uuids: None),
+        call_log=SimpleNamespace(create_from_list=lambda call_logs: None),
+    )
+
+
+def build_generator(trunk_names=(), tenant_uuid=TENANT_UUID, users=()):
+    """Return a CallLogsGenerator resolving participants through a FakeConfd."""
+    confd = FakeConfd(trunk_names=trunk_names, tenant_uuid=tenant_uuid)
+    for user_uuid, line_name, exten, context in users:
+        confd.add_user(user_uuid, line_name, exten, context)
+    generator = CallLogsGenerator(confd, {}, default_interpretors())
+    generator.set_default_tenant_uuid({'metadata': {'tenant_uuid': tenant_uuid}})
+    return generator
+
+
+def _generator_patches(schedule=None):
+    return [
+        mock.patch.object(generator_module, 'get_context_numbers', lambda: []),
+        mock.patch.object(generator_module, 'get_schedule_from_outcall', lambda: None),
+        mock.patch.object(
+            generator_module, 'get_schedule_from_extension', lambda **kwargs: schedule
+        ),
+        mock.patch.object(
+            generator_module, 'get_schedule_from_path', lambda **kwargs: None
+        ),
+        mock.patch.object(
+            generator_module, 'get_schedule_from_exten_tenant', lambda **kwargs: None
+        ),
+    ]
+
+
+@contextmanager
+def _patched(patches):
+    with ExitStack() as stack:
+        for patch in patches:
+            stack.enter_context(patch)
+        yield
+
+
+@contextmanager
+def offline_generator(schedule=None):
+    """Route the generator's schedule lookups away from the database.
+
+    Inbound calls get the state of `schedule` (a loaded xivo-dao Schedule with
+    its periods), the other calls are opened without a schedule.
+    """
+    with _patched(_generator_patches(schedule)):
+        yield
+
+
+@contextmanager
+def offline_pipeline(store):
+    """Route the generator's schedule lookups and the writer's queries away from the database."""
+    patches = _generator_patches() + [
+        mock.patch.object(writer_module, 'create_from_list', store.create_from_list),
+        mock.patch.object(writer_module, 'delete_from_list', store.delete_from_list),
+        mock.patch.object(
+            manager_module, 'find_processed_linkedids', store.find_processed_linkedids
+        ),
+    ]
+    with _patched(patches):
+        yield store
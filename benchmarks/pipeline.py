@@ -0,0 +1,246 @@
+"""End-to-end benchmark of the CEL -> call log pipeline.
+
+Runs `_group_cels_by_shared_channels` -> `CallLogsGenerator.call_logs_from_cel`
+-> `CallLogsWriter.write` over CEL corpora or a synthetic workload with a fake confd and an
+in-memory call log store, and reports throughput, allocations, the memory an
+interpreted `RawCallLog` holds and the time spent in each pipeline stage.
+
+    python -m benchmarks.pipeline --copies 200 --save-baseline baseline.json
+    python -m benchmarks.pipeline --copies 200 --baseline baseline.json
+    python -m benchmarks.pipeline --synthetic 5000 --seed 1
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+from workano_reports_plugin.generator import _group_cels_by_shared_channels
+from workano_reports_plugin.metrics import PIPELINE_STAGES, REGISTRY, stage_duration
+from workano_reports_plugin.raw_call_log import RawCallLog
+from workano_reports_plugin.writer import CallLogsWriter
+
+from .cel_workload import CELWorkload
+from .fixtures import (
+    MemoryCallLogStore,
+    build_generator,
+    cels_from_items,
+    corpus_tenant_uuid,
+    fake_dao,
+    load_cel_items,
+    offline_pipeline,
+    replicate_cel_items,
+    trunk_line_names,
+)
+
+SAMPLE_CORPUS = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    '.vibe',
+    'sample_cel.json',
+)
+
+# result keys where a larger value is an improvement
+HIGHER_IS_BETTER = ('calls_per_second', 'cels_per_second')
+
+
+def _build_pipeline(items, users=()):
+    generator = build_generator(
+        trunk_line_names(items), corpus_tenant_uuid(items), users
+    )
+    return generator, CallLogsWriter(fake_dao())
+
+
+def _run_once(generator, writer, store, cels):
+    store.clear()
+    call_logs = generator.from_cel(cels)
+    writer.write(call_logs)
+    return len(call_logs.new_call_logs)
+
+
+def _interpret_all(generator, groups):
+    call_logs = []
+    for _, cels in groups:
+        try:
+            interpretor = generator._get_interpretor(cels)
+            call_logs.append(interpretor.interpret_cels(cels, RawCallLog()))
+        except Exception:
+            # the generator skips the groups it fails to interpret
+            continue
+    return call_logs
+
+
+def call_log_memory(generator, cels):
+    """Return the bytes each interpreted `RawCallLog` keeps alive, CELs excluded."""
+    groups = list(_group_cels_by_shared_channels(cels))
+    # warm the caches interpretation fills once (regexes, parsed dates)
+    _interpret_all(generator, groups)
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        call_logs = _interpret_all(generator, groups)
+        after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return (after - before) / len(call_logs) if call_logs else 0.0
+
+
+def run(items, repeat=5, warmup=1, users=()):
+    cels = cels_from_items(items)
+    generator, writer = _build_pipeline(items, users)
+    store = MemoryCallLogStore()
+
+    with offline_pipeline(store):
+        for _ in range(warmup):
+            _run_once(generator, writer, store, cels)
+
+        REGISTRY.reset()
+        durations = []
+        calls = 0
+        for _ in range(repeat):
+            start = time.perf_counter()
+            calls = _run_once(generator, writer, store, cels)
+            durations.append(time.perf_counter() - start)
+        stages = {}
+        for stage in PIPELINE_STAGES:
+            count, total = stage_duration.get(stage=stage)
+            if count:
+                stages[stage] = total / repeat
+
+        # allocations are measured on a separate run, tracemalloc slows everything down
+        tracemalloc.start()
+        try:
+            _run_once(generator, writer, store, cels)
+            snapshot = tracemalloc.take_snapshot()
+            _, peak_memory = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        call_log_bytes = call_log_memory(generator, cels)
+    allocated_blocks = sum(stat.count for stat in snapshot.statistics('filename'))
+
+    median = statistics.median(durations)
+    return {
+        'cels': len(cels),
+        'calls': calls,
+        'repeat': repeat,
+        'median_seconds': median,
+        'min_seconds': min(durations),
+        'calls_per_second': calls / median if median else 0.0,
+        'cels_per_second': len(cels) / median if median else 0.0,
+        'peak_memory_bytes': peak_memory,
+        'allocated_blocks': allocated_blocks,
+        'call_log_bytes': call_log_bytes,
+        'stages': stages,
+    }
+
+
+def _flatten(result):
+    values = {
+        key: value
+        for key, value in result.items()
+        if isinstance(value, (int, float)) and key not in ('cels', 'calls', 'repeat')
+    }
+    for stage, seconds in result.get('stages', {}).items():
+        values[f'stage.{stage}'] = seconds
+    return values
+
+
+def compare(result, baseline, tolerance):
+    """Return the rows of a baseline comparison and whether any metric regressed."""
+    current, previous = _flatten(result), _flatten(baseline)
+    rows = []
+    regressed = False
+    for key in sorted(current.keys() & previous.keys()):
+        before, after = previous[key], current[key]
+        if not before:
+            continue
+        change = (after - before) / before
+        worse = -change if key in HIGHER_IS_BETTER else change
+        is_regression = worse > tolerance
+        regressed = regressed or is_regression
+        rows.append((key, before, after, change, is_regression))
+    return rows, regressed
+
+
+def _print_result(result):
+    print(f"cels: {result['cels']}  calls: {result['calls']}  runs: {result['repeat']}")
+    print(f"median: {result['median_seconds']:.4f}s  min: {result['min_seconds']:.4f}s")
+    print(f"calls/s: {result['calls_per_second']:.1f}  cels/s: {result['cels_per_second']:.1f}")
+    print(
+        f"peak memory: {result['peak_memory_bytes'] / 1024:.1f} KiB  "
+        f"allocated blocks: {result['allocated_blocks']}  "
+        f"per RawCallLog: {result['call_log_bytes']:.0f} B"
+    )
+    print('per-stage time per run:')
+    for stage, seconds in result['stages'].items():
+        print(f'  {stage:<14}{seconds * 1000:10.3f} ms')
+
+
+def _print_comparison(rows):
+    print('compared to baseline:')
+    for key, before, after, change, is_regression in rows:
+        flag = '  REGRESSION' if is_regression else ''
+        print(f'  {key:<22}{before:14.6g}{after:14.6g}{change * 100:+9.1f}%{flag}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        '--corpus',
+        action='append',
+        help='CEL corpus in the sample_cel.json format (repeatable, default: the sample corpus)',
+    )
+    parser.add_argument('--copies', type=int, default=100, help='times each corpus is replicated')
+    parser.add_argument(
+        '--synthetic',
+        type=int,
+        metavar='CALLS',
+        help='add a synthetic workload of CALLS calls (see benchmarks.cel_workload)',
+    )
+    parser.add_argument('--seed', type=int, default=0, help='seed of the synthetic workload')
+    parser.add_argument('--repeat', type=int, default=5, help='timed runs')
+    parser.add_argument('--warmup', type=int, default=1, help='untimed runs before timing')
+    parser.add_argument('--save-baseline', metavar='PATH', help='store the result as a baseline')
+    parser.add_argument('--baseline', metavar='PATH', help='compare the result to a baseline')
+    parser.add_argument(
+        '--tolerance',
+        type=float,
+        default=0.1,
+        help='relative change tolerated before a metric counts as a regression',
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+
+    items = []
+    users = []
+    if args.corpus or not args.synthetic:
+        for path in args.corpus or [SAMPLE_CORPUS]:
+            items.extend(load_cel_items(path))
+        items = replicate_cel_items(items, args.copies)
+    if args.synthetic:
+        workload = CELWorkload(seed=args.seed)
+        items.extend(workload.items(args.synthetic))
+        users = workload.users
+
+    result = run(items, repeat=args.repeat, warmup=args.warmup, users=users)
+    _print_result(result)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(result, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        rows, regressed = compare(result, baseline, args.tolerance)
+        _print_comparison(rows)
+        if regressed:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,438 @@
+"""Benchmark of `WorkanoReportsService.get_reports` against a PostgreSQL database.
+
+`provision` fills a database with seeded synthetic CELs (see
+`benchmarks.cel_workload`) and the call logs the pipeline derives from them,
+plus a Monday-Friday 08:00-18:00 schedule for the tenant whose state is stored
+with the inbound call logs. `run` then asks for reports over the last day, week,
+month and year of the dataset, with and without schedules, through the CEL scan
+(no group_by) counted by the python and the numpy engines and the
+plugin_reports_call_log GROUPING SETS query (group_by=default), and records per
+case:
+
+- the median and minimum latency over `--repeat` runs
+- the number of SQL statements and the rows they returned
+- the rows PostgreSQL read per table (seq_tup_read + idx_tup_fetch from
+  pg_stat_user_tables), i.e. how much of each table the report scanned
+- the peak RSS of the process computing the report
+
+Each case runs in its own process so peak RSS is not inherited from a previous
+case. An empty database gets the xivo-dao and plugin schemas created.
+`compare` checks the numpy engine returns the report of the python engine for
+the same periods.
+
+    python -m benchmarks.reports_query --db-uri postgresql://localhost/reports_bench provision --calls 650000
+    python -m benchmarks.reports_query --db-uri postgresql://localhost/reports_bench run --output reports.json
+    python -m benchmarks.reports_query --db-uri postgresql://localhost/reports_bench compare
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
+
+from .cel_workload import (
+    DEFAULT_START,
+    DEFAULT_TENANT_UUID,
+    CELWorkload,
+    copy_cels,
+    parse_mix,
+)
+from .fixtures import build_generator, offline_generator
+
+# report periods, all ending at the last CEL of the dataset
+PERIODS = {
+    'day': timedelta(days=1),
+    'week': timedelta(days=7),
+    'month': timedelta(days=30),
+    'year': timedelta(days=365),
+}
+
+# report parameters and reports.engine setting selecting each way get_reports computes a report
+ENGINES = {
+    'scan': ({}, 'python'),
+    'numpy': ({}, 'numpy'),
+    'grouped': ({'group_by': 'default'}, 'python'),
+}
+
+SCHEDULE_NAME = 'reports-benchmark'
+
+
+def _init_databases(db_uri):
+    from xivo_dao.helpers import db_manager
+
+    from workano_reports_plugin.db import init_db
+
+    db_manager.init_db(db_uri)
+    init_db(db_uri)
+
+
+def _create_schema(db_uri):
+    from xivo_dao.alchemy import all  # noqa: F401, registers every xivo-dao model
+    from xivo_dao.helpers.db_manager import Base
+
+    engine = create_engine(db_uri)
+    try:
+        Base.metadata.create_all(engine)
+    finally:
+        engine.dispose()
+
+
+def _ensure_schedule(session, tenant_uuid):
+    """Return the benchmark schedule of the tenant with its periods loaded, created if missing."""
+    from sqlalchemy.orm import selectinload
+    from xivo_dao.alchemy.schedule import Schedule
+    from xivo_dao.alchemy.schedule_time import ScheduleTime
+
+    query = (
+        session.query(Schedule)
+        .options(selectinload(Schedule.periods))
+        .filter(Schedule.tenant_uuid == tenant_uuid)
+        .filter(Schedule.name == SCHEDULE_NAME)
+    )
+    schedule = query.first()
+    if schedule:
+        return schedule
+    schedule = Schedule(tenant_uuid=tenant_uuid, name=SCHEDULE_NAME, timezone='UTC')
+    session.add(schedule)
+    session.flush()
+    session.add(
+        ScheduleTime(
+            schedule_id=schedule.id,
+            mode='opened',
+            hours='08:00-18:00',
+            weekdays='1-5',
+            monthdays='1-31',
+            months='1-12',
+        )
+    )
+    session.commit()
+    return query.first()
+
+
+def provision(args):
+    from xivo_dao.alchemy.cel import CEL
+    from xivo_dao.helpers.db_manager import Session
+
+    from workano_reports_plugin.models import Tenant
+
+    # spread the calls over `days` whatever their number
+    concurrency = args.calls * CELWorkload.mean_call_seconds() / (args.days * 86400)
+    workload = CELWorkload(
+        seed=args.seed,
+        mix=args.mix,
+        concurrency=concurrency,
+        start=args.start,
+        tenant_uuid=args.tenant_uuid,
+        users=args.users,
+    )
+
+    _create_schema(args.db_uri)
+    _init_databases(args.db_uri)
+    session = Session()
+    session.merge(Tenant(uuid=args.tenant_uuid))
+    session.commit()
+    # inbound calls get the schedule state, so the with-schedule cases filter on it
+    schedule = _ensure_schedule(session, args.tenant_uuid)
+    schedule_id = schedule.id
+    # detached, the batch commits below do not expire it
+    for instance in [schedule] + list(schedule.periods):
+        session.expunge(instance)
+
+    generator = build_generator(workload.trunks, workload.tenant_uuid, workload.users)
+    cel_count = call_log_count = 0
+    calls = workload.call_items(args.calls)
+    with offline_generator(schedule):
+        while True:
+            batch = [item for call in _take(calls, args.batch_size) for item in call]
+            if not batch:
+                break
+            connection = session.connection().connection
+            cel_count += copy_cels(connection, batch)
+            # read the CELs back, the database assigns their ids
+            linkedids = {item['linkedid'] for item in batch}
+            cels = session.query(CEL).filter(CEL.linkedid.in_(linkedids)).all()
+            call_logs = generator.call_logs_from_cel(cels)
+            session.add_all(call_logs)
+            session.commit()
+            session.expunge_all()
+            call_log_count += len(call_logs)
+            print(f'{cel_count} CELs, {call_log_count} call logs', file=sys.stderr)
+
+    session.execute(text('ANALYZE'))
+    session.commit()
+    Session.remove()
+    print(
+        f'provisioned {cel_count} CELs and {call_log_count} call logs for tenant '
+        f'{args.tenant_uuid}, schedule {schedule_id}',
+        file=sys.stderr,
+    )
+    return 0
+
+
+def _take(iterator, count):
+    for _ in range(count):
+        try:
+            yield next(iterator)
+        except StopIteration:
+            return
+
+
+def _dataset_bounds(engine, tenant_uuid):
+    with engine.connect() as connection:
+        last_cel = connection.execute(text('SELECT max(eventtime) FROM cel')).scalar()
+        schedule_id = connection.execute(
+            text('SELECT id FROM schedule WHERE tenant_uuid = :tenant AND name = :name'),
+            tenant=tenant_uuid,
+            name=SCHEDULE_NAME,
+        ).scalar()
+    engine.dispose()
+    return last_cel, schedule_id
+
+
+def _rows_read(engine):
+    with engine.connect() as connection:
+        connection.execute(text('SELECT pg_stat_clear_snapshot()'))
+        rows = connection.execute(
+            text(
+                'SELECT relname, coalesce(seq_tup_read, 0) + coalesce(idx_tup_fetch, 0) '
+                'FROM pg_stat_user_tables'
+            )
+        )
+        result = {name: count for name, count in rows}
+    # forked processes must not inherit a pooled connection
+    engine.dispose()
+    return result
+
+
+def _rss_bytes():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+def _measure(case):
+    """Compute one report `repeat` times; runs in a child process."""
+    from xivo_dao.helpers.db_manager import Session
+
+    from workano_reports_plugin.services import build_otp_request_service
+
+    queries = {'statements': 0, 'rows': 0}
+
+    def count_rows(conn, cursor, statement, parameters, context, executemany):
+        queries['statements'] += 1
+        if cursor.rowcount > 0:
+            queries['rows'] += cursor.rowcount
+
+    _init_databases(case['db_uri'])
+    event.listen(Engine, 'after_cursor_execute', count_rows)
+    service = build_otp_request_service(None, case['service_config'])
+    rss_before = _rss_bytes()
+
+    durations = []
+    for _ in range(case['repeat']):
+        start = time.perf_counter()
+        service.get_reports(
+            dict(case['params']),
+            config=case['config'],
+            tenant=case['tenant_uuid'],
+            wait_for_admission=True,
+        )
+        durations.append(time.perf_counter() - start)
+    Session.remove()
+
+    # ru_maxrss is in kilobytes on Linux
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return {
+        'median_seconds': statistics.median(durations),
+        'min_seconds': min(durations),
+        'statements': queries['statements'] // case['repeat'],
+        'rows_returned': queries['rows'] // case['repeat'],
+        'rss_before_bytes': rss_before,
+        'peak_rss_bytes': peak_rss,
+    }
+
+
+def _service_config(report_engine):
+    return {'workano_reports': {'reports': {'engine': report_engine}}}
+
+
+def _cases(args, last_cel, schedule_id):
+    for period, length in PERIODS.items():
+        params = {
+            'start_time': (last_cel - length).isoformat(),
+            'end_time': last_cel.isoformat(),
+        }
+        for engine_name, (engine_params, report_engine) in ENGINES.items():
+            for schedules in (False, True):
+                case_params = dict(params, **engine_params)
+                config = None
+                if schedules:
+                    # the scan reads the schedule when given a config, the
+                    # grouped query filters on the schedule stored with each call
+                    config = {'workano_reports': {}}
+                    if schedule_id is not None:
+                        case_params['schedule_id'] = schedule_id
+                yield {
+                    'period': period,
+                    'engine': engine_name,
+                    'schedules': schedules,
+                    'db_uri': args.db_uri,
+                    'tenant_uuid': args.tenant_uuid,
+                    'params': case_params,
+                    'config': config,
+                    'service_config': _service_config(report_engine),
+                    'repeat': args.repeat,
+                }
+
+
+def run(args):
+    stats_engine = create_engine(args.db_uri)
+    last_cel, schedule_id = _dataset_bounds(stats_engine, args.tenant_uuid)
+    if last_cel is None:
+        print('the cel table is empty, run `provision` first', file=sys.stderr)
+        return 1
+    if args.schedule_id is not None:
+        schedule_id = args.schedule_id
+
+    results = []
+    context = multiprocessing.get_context('fork')
+    for case in _cases(args, last_cel, schedule_id):
+        if args.period and case['period'] not in args.period:
+            continue
+        if args.engine and case['engine'] not in args.engine:
+            continue
+        before = _rows_read(stats_engine)
+        with context.Pool(1, maxtasksperchild=1) as pool:
+            measure = pool.apply(_measure, (case,))
+        # statistics are published when the backend exits, and asynchronously
+        time.sleep(args.stats_delay)
+        after = _rows_read(stats_engine)
+        rows_read = {
+            table: (after.get(table, 0) - before.get(table, 0)) // args.repeat
+            for table in after
+            if after.get(table, 0) != before.get(table, 0)
+        }
+        result = {
+            key: case[key] for key in ('period', 'engine', 'schedules', 'params')
+        }
+        result.update(measure, rows_read=rows_read)
+        results.append(result)
+        _print_result(result)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'last_cel': last_cel.isoformat(), 'results': results}, f, indent=2)
+    return 0
+
+
+def compare(args):
+    """Check the numpy engine returns the report of the python engine; exit status 1 otherwise."""
+    from workano_reports_plugin.services import build_otp_request_service
+
+    last_cel, schedule_id = _dataset_bounds(create_engine(args.db_uri), args.tenant_uuid)
+    if last_cel is None:
+        print('the cel table is empty, run `provision` first', file=sys.stderr)
+        return 1
+    if args.schedule_id is not None:
+        schedule_id = args.schedule_id
+
+    _init_databases(args.db_uri)
+    services = {
+        report_engine: build_otp_request_service(None, _service_config(report_engine))
+        for report_engine in ('python', 'numpy')
+    }
+    different = 0
+    for period, length in PERIODS.items():
+        if args.period and period not in args.period:
+            continue
+        for schedules in (False, True):
+            params = {
+                'start_time': (last_cel - length).isoformat(),
+                'end_time': last_cel.isoformat(),
+            }
+            config = None
+            if schedules:
+                config = {'workano_reports': {}}
+                if schedule_id is not None:
+                    params['schedule_id'] = schedule_id
+            reports = {
+                report_engine: service.get_reports(
+                    dict(params), config=config, tenant=args.tenant_uuid, wait_for_admission=True
+                )
+                for report_engine, service in services.items()
+            }
+            same = reports['python'] == reports['numpy']
+            different += not same
+            print(
+                f"{period:>6} schedules={'on' if schedules else 'off':<3} "
+                f"{reports['python']['total']['total']:10d} calls "
+                f"{'same' if same else 'DIFFERENT'}"
+            )
+    return 1 if different else 0
+
+
+def _print_result(result):
+    print(
+        f"{result['period']:>6} {result['engine']:>8} "
+        f"schedules={'on' if result['schedules'] else 'off':<3} "
+        f"{result['median_seconds'] * 1000:10.1f} ms "
+        f"{result['statements']:6d} queries "
+        f"{result['rows_returned']:10d} rows returned "
+        f"{sum(result['rows_read'].values()):10d} rows read "
+        f"{result['peak_rss_bytes'] / 2**20:8.1f} MiB peak RSS"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db-uri', required=True)
+    parser.add_argument('--tenant-uuid', default=DEFAULT_TENANT_UUID)
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+
+    provision_parser = commands.add_parser('provision', help='load a synthetic dataset')
+    provision_parser.add_argument(
+        '--calls', type=int, default=65000, help='calls to generate (about 15 CELs each)'
+    )
+    provision_parser.add_argument('--days', type=float, default=365, help='days the calls span')
+    provision_parser.add_argument('--seed', type=int, default=0)
+    provision_parser.add_argument('--mix', type=parse_mix)
+    provision_parser.add_argument('--start', type=datetime.fromisoformat, default=DEFAULT_START)
+    provision_parser.add_argument('--users', type=int, default=200)
+    provision_parser.add_argument('--batch-size', type=int, default=2000, help='calls per transaction')
+    provision_parser.set_defaults(func=provision)
+
+    run_parser = commands.add_parser('run', help='measure reports over the dataset')
+    run_parser.add_argument('--repeat', type=int, default=3)
+    run_parser.add_argument('--period', action='append', choices=list(PERIODS))
+    run_parser.add_argument('--engine', action='append', choices=list(ENGINES))
+    run_parser.add_argument(
+        '--schedule-id', type=int, help='schedule to use (default: the provisioned one)'
+    )
+    run_parser.add_argument(
+        '--stats-delay', type=float, default=1.0, help='seconds to wait for pg_stat counters'
+    )
+    run_parser.add_argument('--output', metavar='PATH', help='write the results as JSON')
+    run_parser.set_defaults(func=run)
+
+    compare_parser = commands.add_parser(
+        'compare', help='check the numpy engine against the python engine'
+    )
+    compare_parser.add_argument('--period', action='append', choices=list(PERIODS))
+    compare_parser.add_argument(
+        '--schedule-id', type=int, help='schedule to use (default: the provisioned one)'
+    )
+    compare_parser.set_defaults(func=compare)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
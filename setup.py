@@ -9,7 +9,7 @@ setup(
     description='workano otp request plugin',
     author='workano team',
     author_email='info@workano.com',
-    packages=find_packages(),
+    packages=find_packages(exclude=['benchmarks', 'benchmarks.*']),
     url='https://workano.com',
     include_package_data=True,
     package_data={
@@ -0,0 +1,136 @@
+import logging
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from workano_reports_plugin.metrics import accumulated_fetches
+
+logger = logging.getLogger(__name__)
+
+
+class _Buffer:
+    __slots__ = ('cels', 'started_at', 'complete', 'open_channels')
+
+    def __init__(self, started_at, complete):
+        self.cels = []
+        self.started_at = started_at
+        # the first CEL was the CHAN_START of the linkedid's own channel
+        self.complete = complete
+        # uniqueids with a CHAN_START and no CHAN_END under this linkedid
+        self.open_channels = set()
+
+
+class CELAccumulator:
+    """CELs received on the bus, kept per linkedid until their call is generated.
+
+    `find_from_linked_id` answers like the CEL DAO (the CELs of the linkedid and
+    of the linkedids sharing a channel with it) from memory, or returns None when
+    a buffer cannot be trusted: its first CELs were missed (e.g. the call started
+    before call-logd), one of its channels did not end under its linkedid, or it
+    was spilled because it held more than `max_cels_per_linkedid` CELs, the
+    buffers held more than `max_cels` CELs or it was older than `max_age`
+    seconds. The caller then reads the `cel` table.
+    """
+
+    def __init__(self, max_cels_per_linkedid=1000, max_cels=500000, max_age=14400):
+        self._max_cels_per_linkedid = max_cels_per_linkedid
+        self._max_cels = max_cels
+        self._max_age = max_age
+        self._lock = threading.Lock()
+        # oldest first
+        self._buffers = OrderedDict()
+        self._linkedids_by_uniqueid = defaultdict(set)
+        self._uniqueids_by_linkedid = defaultdict(set)
+        # linkedids whose next CELs are not buffered (spilled or generated), oldest first
+        self._ignored = OrderedDict()
+        self._cel_count = 0
+
+    def __len__(self):
+        return self._cel_count
+
+    def add(self, cel):
+        with self._lock:
+            # channels are indexed even when CELs are not kept, a spilled linkedid
+            # must still correlate with the others
+            self._linkedids_by_uniqueid[cel.uniqueid].add(cel.linkedid)
+            self._uniqueids_by_linkedid[cel.linkedid].add(cel.uniqueid)
+            buffer = self._buffers.get(cel.linkedid)
+            if buffer is None:
+                if cel.linkedid in self._ignored:
+                    return
+                buffer = self._buffers[cel.linkedid] = _Buffer(
+                    time.monotonic(),
+                    cel.eventtype == 'CHAN_START' and cel.uniqueid == cel.linkedid,
+                )
+            buffer.cels.append(cel)
+            if cel.eventtype == 'CHAN_START':
+                buffer.open_channels.add(cel.uniqueid)
+            elif cel.eventtype == 'CHAN_END':
+                buffer.open_channels.discard(cel.uniqueid)
+            self._cel_count += 1
+            if len(buffer.cels) > self._max_cels_per_linkedid:
+                self._spill(cel.linkedid)
+            self._spill_over_bounds()
+
+    def find_from_linked_id(self, linked_id):
+        """Return the buffered CELs of `linked_id` and its correlated linkedids, or None."""
+        with self._lock:
+            linked_ids = {linked_id}
+            for uniqueid in self._uniqueids_by_linkedid.get(linked_id, ()):
+                linked_ids |= self._linkedids_by_uniqueid[uniqueid]
+            buffers = [self._buffers.get(linked_id) for linked_id in linked_ids]
+            # a channel still up moved to another linkedid (e.g. a transfer) whose
+            # CELs may not be received yet, the database has them
+            if not all(
+                buffer and buffer.complete and not buffer.open_channels for buffer in buffers
+            ):
+                accumulated_fetches.inc(outcome='database')
+                return None
+            accumulated_fetches.inc(outcome='memory')
+            return [cel for buffer in buffers for cel in buffer.cels]
+
+    def discard(self, linked_ids):
+        """Forget the CELs of generated linkedids and ignore their next ones.
+
+        Their channels stay indexed while they are ignored: a linkedid correlating
+        with them later (e.g. a transfer bridging after their LINKEDID_END) is read
+        from the database, with them, as it would be without the accumulator.
+        """
+        with self._lock:
+            for linked_id in linked_ids:
+                self._remove_buffer(linked_id)
+                self._ignore(linked_id)
+
+    def _spill_over_bounds(self):
+        deadline = time.monotonic() - self._max_age
+        while self._buffers:
+            linked_id, buffer = next(iter(self._buffers.items()))
+            if self._cel_count <= self._max_cels and buffer.started_at > deadline:
+                break
+            self._spill(linked_id)
+
+    def _spill(self, linked_id):
+        logger.debug('spilling the CELs of linkedid %s, it will be read from the database', linked_id)
+        self._remove_buffer(linked_id)
+        self._ignore(linked_id)
+        accumulated_fetches.inc(outcome='spilled')
+
+    def _ignore(self, linked_id):
+        self._ignored[linked_id] = None
+        self._ignored.move_to_end(linked_id)
+        while len(self._ignored) > self._max_cels:
+            forgotten, _ = self._ignored.popitem(last=False)
+            self._forget_channels(forgotten)
+
+    def _remove_buffer(self, linked_id):
+        buffer = self._buffers.pop(linked_id, None)
+        if buffer is not None:
+            self._cel_count -= len(buffer.cels)
+
+    def _forget_channels(self, linked_id):
+        for uniqueid in self._uniqueids_by_linkedid.pop(linked_id, ()):
+            linked_ids = self._linkedids_by_uniqueid.get(uniqueid)
+            if linked_ids is not None:
+                linked_ids.discard(linked_id)
+                if not linked_ids:
+                    del self._linkedids_by_uniqueid[uniqueid]
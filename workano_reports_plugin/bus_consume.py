@@ -1,8 +1,13 @@
 import logging
 import time
 import re
+from datetime import datetime, timezone
 
+from workano_reports_plugin.accumulator import CELAccumulator
 from workano_reports_plugin.cel_interpretor import default_interpretors
+from workano_reports_plugin.cel_payload import cel_from_payload, parse_event_time
+from workano_reports_plugin.columnar_cache import build_columnar_cache
+from workano_reports_plugin.config import get_plugin_config
 from workano_reports_plugin.dao import get_trunk_name_number_map
 from workano_reports_plugin.generator import CallLogsGenerator
 from wazo_auth_client import Client as AuthClient
@@ -11,15 +16,23 @@ from xivo.token_renewer import TokenRenewer
 from xivo_dao.helpers.db_manager import daosession
 from xivo_dao.alchemy.trunkfeatures import TrunkFeatures
 from workano_reports_plugin.manager import CallLogsManager
+from workano_reports_plugin.metrics import linkedid_events, queue_lag
+from workano_reports_plugin.pending import PendingGroups
+from workano_reports_plugin.streaming import LiveCalls
 from workano_reports_plugin.writer import CallLogsWriter
 
 logger = logging.getLogger(__name__)
 
 
 class ReportsBusEventHandler:
-    def __init__(self, config, dao):
+    def __init__(self, config, dao, manager=None):
         self.config = config
         self.dao = dao
+        # a manager can be given to run the handler on other services, e.g. benchmarks/replay.py
+        self.manager = manager or self._build_manager(config, dao)
+
+    @staticmethod
+    def _build_manager(config, dao):
         auth_client = AuthClient(**config['auth'])
         token = auth_client.token.new(
             expiration=365 * 24 * 60 * 60)['token']
@@ -27,20 +40,45 @@ class ReportsBusEventHandler:
         confd_client = ConfdClient(**config['confd'], token=token)
         trunk_name_number_map = get_trunk_name_number_map()
 
+        interpretors = default_interpretors()
         generator = CallLogsGenerator(
             confd_client,
             trunk_name_number_map,
-            default_interpretors(),
+            interpretors,
         )
-        writer = CallLogsWriter(self.dao)
-        self.manager = CallLogsManager(self.dao, generator, writer)
-
-
+        plugin_config = get_plugin_config(config)
+        number_sketches_config = plugin_config['number_sketches']
+        writer = CallLogsWriter(
+            dao,
+            number_sketch_capacity=(
+                number_sketches_config['capacity'] if number_sketches_config['enabled'] else None
+            ),
+            columnar_cache=build_columnar_cache(plugin_config['columnar_cache']),
+        )
+        pending = PendingGroups(**plugin_config['pending_groups'])
+        accumulator_config = dict(plugin_config['accumulator'])
+        accumulator = None
+        if accumulator_config.pop('enabled'):
+            accumulator = CELAccumulator(**accumulator_config)
+        streaming_config = dict(plugin_config['streaming'])
+        live_calls = None
+        if streaming_config.pop('enabled'):
+            live_calls = LiveCalls(interpretors, **streaming_config)
+        return CallLogsManager(dao, generator, writer, pending, accumulator, live_calls)
 
     def subscribe(self, bus_consumer):
         bus_consumer.subscribe('CEL', self.handle_cel_event)
 
     def handle_cel_event(self, payload):
+        accumulator = self.manager.accumulator
+        live_calls = self.manager.live_calls
+        if accumulator is not None or live_calls is not None:
+            cel = cel_from_payload(payload)
+            if accumulator is not None:
+                accumulator.add(cel)
+            if live_calls is not None:
+                live_calls.add(cel)
+
         if payload['EventName'] != 'LINKEDID_END':
             return
 
@@ -49,15 +87,23 @@ class ReportsBusEventHandler:
         try:
             self.manager.generate_from_linked_id(linked_id)
         except Exception:
+            linkedid_events.inc(outcome='failed')
             logger.exception(
                 'Reports: Failed to generate call log for linkedid "%s"', linked_id
             )
         else:
+            linkedid_events.inc(outcome='processed')
+            event_time = parse_event_time(payload.get('EventTime'))
+            if event_time:
+                lag = max((datetime.now(timezone.utc) - event_time).total_seconds(), 0)
+                queue_lag.observe(lag)
+                self.manager.bus_lag = lag
             processing_time = time.time() - start_time
             logger.info(
                 'Reports: Generated call log for linkedid "%s" in %.2fs',
                 linked_id,
                 processing_time,
             )
+        self.manager.generate_expired_groups()
 
 
@@ -0,0 +1,94 @@
+import re
+from collections import deque
+from datetime import timedelta
+
+# numbers are compared on their last digits, so that 0912..., 98912... and
+# +98912... match whatever prefix the caller id or the outcall used
+CALLBACK_MATCH_DIGITS = 10
+# upper bounds, in seconds, of the time-to-callback histogram
+CALLBACK_HISTOGRAM_BOUNDS = (300, 900, 3600, 4 * 3600, 24 * 3600)
+
+_NON_DIGITS = re.compile(r'\D')
+
+
+def normalize_number(number):
+    """Return the digits `number` is matched on, or None for a number without digits."""
+    if not number:
+        return None
+    digits = _NON_DIGITS.sub('', number)
+    return digits[-CALLBACK_MATCH_DIGITS:] or None
+
+
+def _percentile(values, fraction):
+    if not values:
+        return None
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def match_callbacks(rows, end, window):
+    """Match missed inbound calls to the first outbound call to their caller within `window`.
+
+    `rows` are (id, date, tenant_uuid, direction, number, missed) ordered by date,
+    as returned by `iter_callback_candidates`, and are read once: the missed calls
+    waiting for a callback are kept in a hash table by (tenant, normalized number)
+    and dropped once `window` passed. Missed calls from `end` on are not counted,
+    they are only read to find the callbacks of the earlier ones.
+    """
+    window_seconds, window = window, timedelta(seconds=window)
+    # (tenant, number) -> deque of the dates of the missed calls waiting for a callback
+    waiting = {}
+    # (date, key) of the missed calls, oldest first, to expire them
+    expiries = deque()
+    missed_count = 0
+    delays = []
+
+    def expire(now):
+        while expiries and expiries[0][0] + window < now:
+            date, key = expiries.popleft()
+            dates = waiting.get(key)
+            if dates and dates[0] == date:
+                dates.popleft()
+                if not dates:
+                    del waiting[key]
+
+    for _, date, tenant_uuid, direction, number, missed in rows:
+        expire(date)
+        number = normalize_number(number)
+        if number is None:
+            continue
+        key = (tenant_uuid, number)
+        if direction == 'inbound':
+            if missed and date < end:
+                missed_count += 1
+                waiting.setdefault(key, deque()).append(date)
+                expiries.append((date, key))
+            continue
+        dates = waiting.pop(key, None)
+        if dates:
+            delays.extend((date - missed_date).total_seconds() for missed_date in dates)
+
+    delays.sort()
+    histogram = []
+    index = 0
+    for bound in CALLBACK_HISTOGRAM_BOUNDS:
+        if bound >= window_seconds:
+            break
+        count = 0
+        while index < len(delays) and delays[index] <= bound:
+            count += 1
+            index += 1
+        histogram.append({'up_to': bound, 'count': count})
+    histogram.append({'up_to': window_seconds, 'count': len(delays) - index})
+
+    return {
+        'missed': missed_count,
+        'called_back': len(delays),
+        'callback_rate': len(delays) / missed_count if missed_count else 0.0,
+        'time_to_callback': {
+            'average': sum(delays) / len(delays) if delays else None,
+            'p50': _percentile(delays, 0.5),
+            'p90': _percentile(delays, 0.9),
+            'max': delays[-1] if delays else None,
+            'histogram': histogram,
+        },
+    }
@@ -22,8 +22,15 @@ from wazo_call_logd.database.cel_event_type import CELEventType
 WAZO_IVR_CHOICE = 'WAZO_IVR_CHOICE'
 
 from .models import ReportsDestination, ReportsRecording
+from .profiling import profiler
 from wazo_call_logd.exceptions import CELInterpretationError, InvalidCallLogException
-from .raw_call_log import BridgeInfo, RawCallLog
+from .raw_call_log import (
+    BridgeInfo,
+    ForwardRecord,
+    IVRChoiceRecord,
+    RawCallLog,
+    TransferRecord,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -216,6 +223,15 @@ def parse_eventtime(eventtime: str | datetime) -> datetime:
         return dateutil.parser.isoparse(eventtime)
 
 
+def _record_eventtime(cel) -> datetime | None:
+    if not getattr(cel, 'eventtime', None):
+        return None
+    try:
+        return parse_eventtime(cel.eventtime)
+    except (ValueError, OverflowError):
+        return None
+
+
 EventInterpretor = Callable[[CEL, RawCallLog], RawCallLog]
 
 
@@ -233,6 +249,8 @@ class AbstractCELInterpretor:
         logger.debug("Interpreting CEL event type %s", eventtype)
         if eventtype in self.eventtype_map:
             interpret_function = self.eventtype_map[eventtype]
+            if profiler.enabled:
+                return profiler.profile(self, eventtype, interpret_function, cel, call)
             return interpret_function(cel, call)
         else:
             logger.debug("Ignoring uninterpretable CEL event type %s", eventtype)
@@ -506,25 +524,16 @@ class CallerCELInterpretor(AbstractCELInterpretor):
             call.interpret_caller_xivo_user_fwd = False
 
         # Append structured forward entry to RawCallLog.forwards
-        try:
-            eventtime_iso = parse_eventtime(cel.eventtime).isoformat() if getattr(cel, 'eventtime', None) else None
-        except Exception:
-            eventtime_iso = None
-
-        forward_entry = {
-            'cel_id': getattr(cel, 'id', None),
-            'num': num,
-            'context': context,
-            'name': name,
-            'channame': getattr(cel, 'channame', None),
-            'eventtime': eventtime_iso,
-        }
-
-        try:
-            if hasattr(call, 'forwards'):
-                call.forwards.append(forward_entry)
-        except Exception:
-            logger.exception('Failed to append forward entry to call.forwards for cel.id=%s', cel.id)
+        call.forwards.append(
+            ForwardRecord(
+                cel_id=getattr(cel, 'id', None),
+                eventtime=_record_eventtime(cel),
+                num=num,
+                context=context,
+                name=name,
+                channame=getattr(cel, 'channame', None),
+            )
+        )
 
         return call
 
@@ -570,36 +579,26 @@ class CallerCELInterpretor(AbstractCELInterpretor):
         transfer_target_line = extract_line(transfer_target_channel_name)
         channel2_line = extract_line(channel2_name)
 
-        try:
-            eventtime_iso = parse_eventtime(cel.eventtime).isoformat() if getattr(cel, 'eventtime', None) else None
-        except Exception:
-            eventtime_iso = None
-
-        transfer_entry = {
-            'cel_id': getattr(cel, 'id', None),
-            'transfer_type': transfer_type,
-            'target_exten': target_exten,
-            'context': context,
-            'transferee_channel_name': transferee_channel_name,
-            'transferee_channel_uniqueid': transferee_channel_uniqueid,
-            'channel2_name': channel2_name,
-            'channel2_uniqueid': channel2_uniqueid,
-            'transfer_target_channel_name': transfer_target_channel_name,
-            'transfer_target_channel_uniqueid': transfer_target_channel_uniqueid,
-            'bridge1_id': bridge1_id,
-            'bridge2_id': bridge2_id,
-            'transferee_line': transferee_line,
-            'transfer_target_line': transfer_target_line,
-            'channel2_line': channel2_line,
-            'channame': getattr(cel, 'channame', None),
-            'eventtime': eventtime_iso,
-        }
-
-        try:
-            if hasattr(call, 'transfers'):
-                call.transfers.append(transfer_entry)
-        except Exception:
-            logger.exception('Failed to append transfer entry to call.transfers for cel.id=%s', cel.id)
+        call.transfers.append(
+            TransferRecord(
+                cel_id=getattr(cel, 'id', None),
+                eventtime=_record_eventtime(cel),
+                transfer_type=transfer_type,
+                target_exten=target_exten,
+                context=context,
+                transferee_channel_name=transferee_channel_name,
+                transferee_channel_uniqueid=transferee_channel_uniqueid,
+                channel2_name=channel2_name,
+                channel2_uniqueid=channel2_uniqueid,
+                transfer_target_channel_name=transfer_target_channel_name,
+                transfer_target_channel_uniqueid=transfer_target_channel_uniqueid,
+                bridge1_id=bridge1_id,
+                bridge2_id=bridge2_id,
+                transferee_line=transferee_line,
+                transfer_target_line=transfer_target_line,
+                channel2_line=channel2_line,
+            )
+        )
 
         return call
 
@@ -645,22 +644,15 @@ class CallerCELInterpretor(AbstractCELInterpretor):
         ivr_exten = data.get('exten')
         ivr_id = data.get('id')
         # record IVR choice history on the RawCallLog
-        try:
-            eventtime_iso = parse_eventtime(cel.eventtime).isoformat() if getattr(cel, 'eventtime', None) else None
-        except Exception:
-            eventtime_iso = None
-        ivr_entry = {
-            'id': ivr_id,
-            'exten': str(ivr_exten) if ivr_exten is not None else None,
-            'context': getattr(cel, 'context', None),
-            'channame': getattr(cel, 'channame', None),
-            'eventtime': eventtime_iso,
-        }
-        try:
-            if hasattr(call, 'ivr_choices'):
-                call.ivr_choices.append(ivr_entry)
-        except Exception:
-            logger.exception('Failed to append ivr choice to call.ivr_choices for cel.id=%s', cel.id)
+        call.ivr_choices.append(
+            IVRChoiceRecord(
+                id=ivr_id,
+                exten=str(ivr_exten) if ivr_exten is not None else None,
+                context=getattr(cel, 'context', None),
+                channame=getattr(cel, 'channame', None),
+                eventtime=_record_eventtime(cel),
+            )
+        )
 
         return call
 
@@ -680,7 +672,7 @@ class CallerCELInterpretor(AbstractCELInterpretor):
         )
 
         if MEETING_EXTENSION_REGEX.match(call.destination_exten):
-            call.extension_filter.add_exten(call.destination_exten)
+            call.hide_extension(call.destination_exten)
             # Don't call filter.filter_call() yet, to avoid empty exten during interpret.
             # Let interpret_chan_end do it instead.
 
@@ -0,0 +1,68 @@
+from datetime import datetime, timezone
+
+from dateutil import parser as dateutil_parser
+from xivo_dao.alchemy.cel import CEL
+
+
+def parse_event_time(value):
+    """Parse the EventTime of a CEL bus event.
+
+    Asterisk sends epoch seconds ("1757175394.807993") unless cel.conf sets a
+    dateformat, in which case naive local times are assumed.
+    """
+    if not value:
+        return None
+    try:
+        return datetime.fromtimestamp(float(value), timezone.utc)
+    except ValueError:
+        pass
+    try:
+        event_time = dateutil_parser.parse(value)
+    except (ValueError, OverflowError):
+        return None
+    if not event_time.tzinfo:
+        event_time = event_time.astimezone()
+    return event_time
+
+
+def _parse_amaflags(value):
+    try:
+        return int(value or 0)
+    except ValueError:
+        return 0
+
+
+def cel_from_payload(payload):
+    """Build a transient CEL, as the `cel` table would store it, from a CEL bus event.
+
+    The CEL has no id: the bus does not carry it.
+    """
+    eventtype = payload['EventName']
+    if eventtype == 'USER_DEFINED' and payload.get('UserDefType'):
+        # the cel table stores the user defined name as eventtype, e.g. XIVO_INCALL
+        eventtype = payload['UserDefType']
+    return CEL(
+        id=None,
+        eventtype=eventtype,
+        eventtime=parse_event_time(payload.get('EventTime')),
+        userdeftype=payload.get('UserDefType', ''),
+        cid_name=payload.get('CallerIDname', ''),
+        cid_num=payload.get('CallerIDnum', ''),
+        cid_ani=payload.get('CallerIDani', ''),
+        cid_rdnis=payload.get('CallerIDrdnis', ''),
+        cid_dnid=payload.get('CallerIDdnid', ''),
+        exten=payload.get('Exten', ''),
+        context=payload.get('Context', ''),
+        channame=payload.get('Channel', ''),
+        appname=payload.get('Application', ''),
+        appdata=payload.get('AppData', ''),
+        amaflags=_parse_amaflags(payload.get('AMAFlags')),
+        accountcode=payload.get('AccountCode', ''),
+        peeraccount=payload.get('PeerAccount', ''),
+        uniqueid=payload.get('UniqueID', ''),
+        linkedid=payload['LinkedID'],
+        userfield=payload.get('Userfield', ''),
+        peer=payload.get('Peer', ''),
+        extra=payload.get('Extra', ''),
+        call_log_id=None,
+    )
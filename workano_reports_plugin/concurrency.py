@@ -0,0 +1,84 @@
+import heapq
+from bisect import bisect_right
+
+
+class _TrunkState:
+    __slots__ = ('count', 'since')
+
+    def __init__(self, since):
+        # calls in progress on the trunk since `since`
+        self.count = 0
+        self.since = since
+
+
+def sweep_concurrency(intervals, boundaries):
+    """Return the maximum and average number of simultaneous calls per trunk and bucket.
+
+    `intervals` are (trunk, start, end) tuples ordered by start and `boundaries`
+    the sorted bounds of the buckets, bucket i being [boundaries[i],
+    boundaries[i + 1]). The intervals are read once: the end of the calls in
+    progress are kept in a heap, so memory depends on the number of simultaneous
+    calls, not on the number of calls. A call ending when another one starts is
+    not simultaneous with it.
+
+    Returns one {trunk: {'max': int, 'average': float}} dict per bucket, the
+    average being the time-weighted number of calls in progress over the bucket.
+    Trunks without calls during a bucket are left out of it.
+    """
+    bucket_count = len(boundaries) - 1
+    if bucket_count < 1:
+        return []
+    first, last = boundaries[0], boundaries[-1]
+    # per bucket, trunk -> [max, call seconds]
+    stats = [{} for _ in range(bucket_count)]
+    states = {}
+    ends = []
+
+    def advance(trunk, state, until):
+        since = max(state.since, first)
+        until = min(until, last)
+        if state.count and since < until:
+            index = bisect_right(boundaries, since) - 1
+            while since < until:
+                bucket_end = min(boundaries[index + 1], until)
+                bucket_stats = stats[index].get(trunk)
+                if bucket_stats is None:
+                    bucket_stats = stats[index][trunk] = [0, 0.0]
+                if state.count > bucket_stats[0]:
+                    bucket_stats[0] = state.count
+                bucket_stats[1] += state.count * (bucket_end - since).total_seconds()
+                since = bucket_end
+                index += 1
+        state.since = max(state.since, until)
+
+    def end_calls(until):
+        while ends and ends[0][0] <= until:
+            end, trunk = heapq.heappop(ends)
+            state = states[trunk]
+            advance(trunk, state, end)
+            state.count -= 1
+
+    for trunk, start, end in intervals:
+        if start >= last:
+            break
+        end_calls(start)
+        state = states.get(trunk)
+        if state is None:
+            state = states[trunk] = _TrunkState(start)
+        advance(trunk, state, start)
+        state.count += 1
+        heapq.heappush(ends, (end, trunk))
+    end_calls(last)
+    for trunk, state in states.items():
+        advance(trunk, state, last)
+
+    result = []
+    for index, bucket_stats in enumerate(stats):
+        seconds = (boundaries[index + 1] - boundaries[index]).total_seconds()
+        result.append(
+            {
+                trunk: {'max': maximum, 'average': area / seconds if seconds else 0.0}
+                for trunk, (maximum, area) in bucket_stats.items()
+            }
+        )
+    return result
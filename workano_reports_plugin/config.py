@@ -0,0 +1,76 @@
+import copy
+
+# Settings read from the `workano_reports` section of the wazo-call-logd configuration.
+DEFAULT_CONFIG = {
+    'reports': {
+        'max_concurrent_per_tenant': 2,
+        'admission_timeout': 5,
+        'engine': 'python',
+    },
+    'profiling': {
+        'enabled': False,
+        'dump_interval': 300,
+        'top': 20,
+    },
+    'jobs': {
+        'max_workers': 2,
+        'max_pending': 20,
+        'result_ttl': 3600,
+    },
+    'pending_groups': {
+        'timeout': 600,
+        'max_groups': 10000,
+    },
+    'accumulator': {
+        'enabled': False,
+        'max_cels_per_linkedid': 1000,
+        'max_cels': 500000,
+        'max_age': 14400,
+    },
+    'streaming': {
+        'enabled': False,
+        'max_calls': 10000,
+        'max_age': 14400,
+    },
+    'rollups': {
+        'delay': 14400,
+    },
+    'number_sketches': {
+        'enabled': False,
+        'capacity': 100,
+    },
+    'export': {
+        'directory': '/var/lib/workano-reports/export',
+        'format': 'parquet',
+        'batch_size': 10000,
+    },
+    'columnar_cache': {
+        'enabled': False,
+        'directory': '/var/lib/workano-reports/cache',
+    },
+    'reconciler': {
+        'enabled': True,
+        'interval': 300,
+        'lookback': 86400,
+        'grace': 120,
+        'batch_size': 200,
+        'max_per_second': 10,
+    },
+}
+
+
+def _merge(base, override):
+    result = copy.deepcopy(base)
+    for key, value in (override or {}).items():
+        if isinstance(value, dict) and isinstance(result.get(key), dict):
+            result[key] = _merge(result[key], value)
+        else:
+            result[key] = value
+    return result
+
+
+def get_plugin_config(config):
+    """Return the plugin settings from the call-logd config, completed with defaults."""
+    if not config:
+        return copy.deepcopy(DEFAULT_CONFIG)
+    return _merge(DEFAULT_CONFIG, config.get('workano_reports') or {})
@@ -1,7 +1,9 @@
 import logging
 import re
+from datetime import datetime, timedelta, timezone
 
 from xivo_dao.helpers.db_manager import daosession
+from xivo_dao.alchemy.cel import CEL
 from xivo_dao.alchemy.trunkfeatures import TrunkFeatures
 from xivo_dao.alchemy.schedule import Schedule
 from xivo_dao.alchemy.schedulepath import SchedulePath
@@ -11,11 +13,39 @@ from xivo_dao.alchemy.extension import Extension
 from xivo_dao.alchemy.context import Context
 from xivo_dao.alchemy.outcall import Outcall
 from xivo_dao.alchemy.contextnumbers import ContextNumbers
-from sqlalchemy import and_, cast, String
-from sqlalchemy.orm import selectinload
+from sqlalchemy import (
+    and_,
+    case,
+    cast,
+    distinct,
+    exists,
+    func,
+    literal,
+    literal_column,
+    String,
+    tablesample,
+    tuple_,
+)
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import aliased, selectinload
+
+from workano_reports_plugin.models import (
+    ReportsCallLog,
+    ReportsCallLogParticipant,
+    ReportsDestination,
+    ReportsDurationRollup,
+    ReportsNumberSketch,
+    ReportsProcessedLinkedid,
+    ReportsRollupHour,
+    ReportsWatermark,
+)
+from workano_reports_plugin.number_sketches import NumberSketches
 
 logger = logging.getLogger(__name__)
 
+# name of the plugin_reports_watermark row of the catch-up generation
+CEL_WATERMARK = 'cel'
+
 @daosession
 def get_trunk_name_number_map(session):
     """Build and return a mapping {trunk_name: number} from database.
@@ -151,3 +181,808 @@ def get_schedule_from_outcall(session ):
     except Exception:
         logger.exception('Failed to get schedule for outcall',)
         return None
+
+
+def _filter_call_logs(query, start=None, end=None, tenant_uuid=None, call_log=ReportsCallLog):
+    if start:
+        query = query.filter(call_log.date >= start)
+    if end:
+        query = query.filter(call_log.date < end)
+    if tenant_uuid:
+        query = query.filter(call_log.tenant_uuid == tenant_uuid)
+    return query
+
+
+@daosession
+def count_call_logs_by_bucket(session, bucket, timezone, start=None, end=None, tenant_uuid=None):
+    """Count call logs per time bucket, direction, trunk and schedule state.
+
+    Buckets are computed with date_trunc on the call date converted to `timezone`,
+    so they are local naive datetimes. Returns rows of
+    (bucket_start, direction, trunk, schedule state, count) ordered by bucket.
+    """
+    bucket_start = func.date_trunc(bucket, func.timezone(timezone, ReportsCallLog.date))
+    state = ReportsCallLog.schedule_state.op('->>')('state')
+    query = session.query(
+        bucket_start.label('bucket_start'),
+        ReportsCallLog.direction,
+        ReportsCallLog.trunk,
+        state.label('state'),
+        func.count().label('count'),
+    )
+    query = _filter_call_logs(query, start, end, tenant_uuid)
+    query = query.group_by(bucket_start, ReportsCallLog.direction, ReportsCallLog.trunk, state)
+    return query.order_by(bucket_start).all()
+
+
+# calls are looked up this long before the start of a concurrency period
+MAX_CALL_DURATION = timedelta(days=1)
+
+
+@daosession
+def iter_trunk_call_intervals(session, start, end, tenant_uuid=None, batch_size=10000):
+    """Return (trunk, date, date_end) of the trunk calls overlapping [start, end), by date.
+
+    Rows are streamed from a server-side cursor, `batch_size` at a time. The scan
+    starts `MAX_CALL_DURATION` before `start` so the date index bounds it: calls
+    that started earlier and were still up at `start` are left out.
+    """
+    query = session.query(ReportsCallLog.trunk, ReportsCallLog.date, ReportsCallLog.date_end)
+    query = query.filter(
+        ReportsCallLog.trunk.isnot(None),
+        ReportsCallLog.date_end > ReportsCallLog.date,
+        ReportsCallLog.date_end > start,
+    )
+    query = _filter_call_logs(query, start - MAX_CALL_DURATION, end, tenant_uuid)
+    return (
+        query.order_by(ReportsCallLog.date)
+        .execution_options(stream_results=True)
+        .yield_per(batch_size)
+    )
+
+
+def _external_number():
+    """The number of the external party: the caller of inbound calls, the dialed number otherwise."""
+    return case(
+        [(ReportsCallLog.direction == 'inbound', ReportsCallLog.source_exten)],
+        else_=func.coalesce(ReportsCallLog.destination_exten, ReportsCallLog.requested_exten),
+    )
+
+
+@daosession
+def iter_callback_candidates(session, start, end, tenant_uuid=None, batch_size=10000):
+    """Return the inbound and outbound calls of [start, end) by date, for callback matching.
+
+    Rows are (id, date, tenant_uuid, direction, number, missed), streamed from a
+    server-side cursor `batch_size` at a time. `number` is the external party. An
+    inbound call is missed when it was not answered, or when none of its
+    destination participants answered.
+    """
+    destination = and_(
+        ReportsCallLogParticipant.call_log_id == ReportsCallLog.id,
+        ReportsCallLogParticipant.role == 'destination',
+    )
+    missed = (ReportsCallLog.date_answer.is_(None)) | (
+        exists().where(destination)
+        & ~exists().where(and_(destination, ReportsCallLogParticipant.answered.is_(True)))
+    )
+    query = session.query(
+        ReportsCallLog.id,
+        ReportsCallLog.date,
+        ReportsCallLog.tenant_uuid,
+        ReportsCallLog.direction,
+        _external_number().label('number'),
+        missed.label('missed'),
+    ).filter(ReportsCallLog.direction.in_(['inbound', 'outbound']))
+    query = _filter_call_logs(query, start, end, tenant_uuid)
+    return (
+        query.order_by(ReportsCallLog.date, ReportsCallLog.id)
+        .execution_options(stream_results=True)
+        .yield_per(batch_size)
+    )
+
+
+@daosession
+def iter_caller_numbers(session, start, end, tenant_uuid=None, batch_size=10000):
+    """Return (date, tenant_uuid, direction, trunk, number) of the inbound and outbound calls by date.
+
+    `number` is the external party. Rows are streamed from a server-side cursor,
+    `batch_size` at a time.
+    """
+    query = session.query(
+        ReportsCallLog.date,
+        ReportsCallLog.tenant_uuid,
+        ReportsCallLog.direction,
+        ReportsCallLog.trunk,
+        _external_number().label('number'),
+    ).filter(ReportsCallLog.direction.in_(['inbound', 'outbound']))
+    query = _filter_call_logs(query, start, end, tenant_uuid)
+    return (
+        query.order_by(ReportsCallLog.date)
+        .execution_options(stream_results=True)
+        .yield_per(batch_size)
+    )
+
+
+def rollup_hour(value):
+    """Return the UTC hour whose rollups count a call started at `value`."""
+    return value.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+@daosession
+def iter_call_durations(session, start, end, tenant_uuid=None, batch_size=10000):
+    """Return (tenant_uuid, direction, trunk, date, date_answer, date_end) of the answered calls of [start, end).
+
+    Rows are streamed from a server-side cursor, `batch_size` at a time.
+    """
+    query = session.query(
+        ReportsCallLog.tenant_uuid,
+        ReportsCallLog.direction,
+        ReportsCallLog.trunk,
+        ReportsCallLog.date,
+        ReportsCallLog.date_answer,
+        ReportsCallLog.date_end,
+    ).filter(ReportsCallLog.date_answer.isnot(None))
+    query = _filter_call_logs(query, start, end, tenant_uuid)
+    return query.execution_options(stream_results=True).yield_per(batch_size)
+
+
+@daosession
+def find_rollup_generations(session, start, end):
+    """Return {hour: (generation, built)} of the hours of [start, end) with a rollup state.
+
+    Hours without state were never written nor built, their generation is 0.
+    """
+    query = session.query(
+        ReportsRollupHour.hour, ReportsRollupHour.generation, ReportsRollupHour.built
+    ).filter(ReportsRollupHour.hour >= start, ReportsRollupHour.hour < end)
+    return {rollup_hour(hour): (generation, built) for hour, generation, built in query}
+
+
+@daosession
+def find_duration_rollups(session, start, end, tenant_uuid=None):
+    """Return (hour, sketches) of the built hours of [start, end).
+
+    sketches is None for a built hour without answered calls (of the tenant).
+    """
+    join_on = ReportsDurationRollup.hour == ReportsRollupHour.hour
+    if tenant_uuid:
+        join_on = and_(join_on, ReportsDurationRollup.tenant_uuid == tenant_uuid)
+    query = (
+        session.query(ReportsRollupHour.hour, ReportsDurationRollup.sketches)
+        .outerjoin(ReportsDurationRollup, join_on)
+        .filter(
+            ReportsRollupHour.built.is_(True),
+            ReportsRollupHour.hour >= start,
+            ReportsRollupHour.hour < end,
+        )
+    )
+    return [(rollup_hour(hour), sketches) for hour, sketches in query]
+
+
+@daosession
+def save_duration_rollups(session, generations, rollups):
+    """Store the rollups {(hour, tenant_uuid): sketches} built from `generations`.
+
+    `generations` maps each hour to the generation its call logs were read at.
+    Hours invalidated since then are left unbuilt and their rollups are not
+    saved; the built hours are returned.
+    """
+    if not generations:
+        return set()
+    now = datetime.now(timezone.utc)
+    # hours locked in order, like invalidate_rollups does
+    statement = insert(ReportsRollupHour).values(
+        [
+            {'hour': hour, 'generation': generation, 'built': True, 'updated_at': now}
+            for hour, generation in sorted(generations.items())
+        ]
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=[ReportsRollupHour.hour],
+        set_={'built': True, 'updated_at': now},
+        where=ReportsRollupHour.generation == statement.excluded.generation,
+    ).returning(ReportsRollupHour.hour)
+    built = {rollup_hour(hour) for hour, in session.execute(statement)}
+    if built:
+        session.query(ReportsDurationRollup).filter(
+            ReportsDurationRollup.hour.in_(list(built))
+        ).delete(synchronize_session=False)
+        values = [
+            {'hour': hour, 'tenant_uuid': tenant_uuid, 'sketches': sketches}
+            for (hour, tenant_uuid), sketches in rollups.items()
+            if hour in built
+        ]
+        if values:
+            session.execute(insert(ReportsDurationRollup).values(values))
+    session.commit()
+    return built
+
+
+def invalidate_rollups(session, hours):
+    """Start a new generation of `hours` and delete their rollups, built again when next read."""
+    if not hours:
+        return
+    now = datetime.now(timezone.utc)
+    statement = insert(ReportsRollupHour).values(
+        [
+            {'hour': hour, 'generation': 1, 'built': False, 'updated_at': now}
+            for hour in sorted(hours)
+        ]
+    )
+    session.execute(
+        statement.on_conflict_do_update(
+            index_elements=[ReportsRollupHour.hour],
+            set_={
+                'generation': ReportsRollupHour.generation + 1,
+                'built': False,
+                'updated_at': now,
+            },
+        )
+    )
+    # deleted once the hours are locked, so the rollups of a concurrent build are seen
+    session.query(ReportsDurationRollup).filter(
+        ReportsDurationRollup.hour.in_(list(hours))
+    ).delete(synchronize_session=False)
+
+
+@daosession
+def find_call_log_numbers(session, call_log_ids):
+    """Return (date, tenant_uuid, trunk, source_exten, destination_exten) of call logs."""
+    if not call_log_ids:
+        return []
+    query = session.query(
+        ReportsCallLog.date,
+        ReportsCallLog.tenant_uuid,
+        ReportsCallLog.trunk,
+        ReportsCallLog.source_exten,
+        ReportsCallLog.destination_exten,
+    ).filter(ReportsCallLog.id.in_(call_log_ids))
+    return query.all()
+
+
+@daosession
+def update_number_sketches(session, added, removed, capacity):
+    """Count the `added` calls in the number sketches of their day, tenant and trunk, uncount the `removed` ones.
+
+    Calls are (date, tenant_uuid, trunk, source_exten, destination_exten). The
+    sketch rows are locked while they are updated, writers update them in turn.
+    """
+    changes = {}
+    for calls, sign in ((added, 1), (removed, -1)):
+        for date, tenant_uuid, trunk, source_exten, destination_exten in calls:
+            key = (date.astimezone(timezone.utc).date(), tenant_uuid, trunk or '')
+            changes.setdefault(key, []).append((sign, source_exten, destination_exten))
+    if not changes:
+        return
+
+    try:
+        empty = NumberSketches(capacity).to_dict()
+        statement = insert(ReportsNumberSketch).values(
+            [
+                {'day': day, 'tenant_uuid': tenant_uuid, 'trunk': trunk, 'sketches': empty}
+                for day, tenant_uuid, trunk in changes
+            ]
+        )
+        session.execute(statement.on_conflict_do_nothing())
+        # rows are locked in the same order by every writer, so they cannot deadlock
+        for (day, tenant_uuid, trunk), calls in sorted(
+            changes.items(), key=lambda item: str(item[0])
+        ):
+            row = (
+                session.query(ReportsNumberSketch)
+                .filter(
+                    ReportsNumberSketch.day == day,
+                    ReportsNumberSketch.tenant_uuid == tenant_uuid,
+                    ReportsNumberSketch.trunk == trunk,
+                )
+                .with_for_update()
+                .one()
+            )
+            sketches = NumberSketches.from_dict(row.sketches)
+            for sign, source_exten, destination_exten in calls:
+                if sign > 0:
+                    sketches.add_call(source_exten, destination_exten)
+                else:
+                    sketches.remove_call(source_exten, destination_exten)
+            row.sketches = sketches.to_dict()
+        session.commit()
+    except Exception:
+        # the session is shared with the writer, leave it usable
+        session.rollback()
+        raise
+
+
+@daosession
+def rebuild_number_sketches(session, day, capacity):
+    """Replace the number sketches of a UTC day by sketches of its call logs, return their count.
+
+    The sketch rows of the day are locked while they are rebuilt. A call written
+    during the rebuild can be counted twice in the frequent numbers, rebuild the
+    days that no longer get call logs.
+    """
+    start = datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+    try:
+        existing = (
+            session.query(ReportsNumberSketch)
+            .filter(ReportsNumberSketch.day == day)
+            .with_for_update()
+            .all()
+        )
+        query = session.query(
+            ReportsCallLog.tenant_uuid,
+            ReportsCallLog.trunk,
+            ReportsCallLog.source_exten,
+            ReportsCallLog.destination_exten,
+        ).filter(ReportsCallLog.date >= start, ReportsCallLog.date < start + timedelta(days=1))
+        sketches = {}
+        count = 0
+        for tenant_uuid, trunk, source_exten, destination_exten in query.yield_per(10000):
+            key = (tenant_uuid, trunk or '')
+            if key not in sketches:
+                sketches[key] = NumberSketches(capacity)
+            sketches[key].add_call(source_exten, destination_exten)
+            count += 1
+        # rows are updated rather than deleted, writers waiting on them update the new sketches
+        empty = NumberSketches(capacity).to_dict()
+        rebuilt = {(str(tenant_uuid), trunk) for tenant_uuid, trunk in sketches}
+        for row in existing:
+            if (str(row.tenant_uuid), row.trunk) not in rebuilt:
+                row.sketches = empty
+        if sketches:
+            statement = insert(ReportsNumberSketch).values(
+                [
+                    {
+                        'day': day,
+                        'tenant_uuid': tenant_uuid,
+                        'trunk': trunk,
+                        'sketches': day_sketches.to_dict(),
+                    }
+                    for (tenant_uuid, trunk), day_sketches in sketches.items()
+                ]
+            )
+            session.execute(
+                statement.on_conflict_do_update(
+                    index_elements=[
+                        ReportsNumberSketch.day,
+                        ReportsNumberSketch.tenant_uuid,
+                        ReportsNumberSketch.trunk,
+                    ],
+                    set_={'sketches': statement.excluded.sketches},
+                )
+            )
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    return count
+
+
+@daosession
+def find_number_sketches(session, start_day, end_day, tenant_uuid=None):
+    """Return (trunk, sketches) of the number sketches of the days of [start_day, end_day]."""
+    query = session.query(ReportsNumberSketch.trunk, ReportsNumberSketch.sketches).filter(
+        ReportsNumberSketch.day >= start_day, ReportsNumberSketch.day <= end_day
+    )
+    if tenant_uuid:
+        query = query.filter(ReportsNumberSketch.tenant_uuid == tenant_uuid)
+    return query.all()
+
+
+# call log columns written by the export, in order
+EXPORT_CALL_LOG_COLUMNS = (
+    'id',
+    'date',
+    'date_answer',
+    'date_end',
+    'tenant_uuid',
+    'direction',
+    'trunk',
+    'source_name',
+    'source_exten',
+    'source_internal_exten',
+    'requested_exten',
+    'requested_context',
+    'destination_name',
+    'destination_exten',
+    'destination_internal_exten',
+    'conversation_id',
+    'user_field',
+    'blocked',
+    'schedule_state',
+)
+
+
+@daosession
+def find_first_call_log_date(session):
+    return session.query(func.min(ReportsCallLog.date)).scalar()
+
+
+@daosession
+def iter_call_log_export_batches(session, start, end, batch_size=10000):
+    """Yield the call logs of [start, end) by date, in batches of `batch_size`.
+
+    Each batch is (rows, participants, destination details): rows hold the
+    EXPORT_CALL_LOG_COLUMNS and are streamed from a server-side cursor,
+    participants are (role, user_uuid, answered) and destination details
+    {key: value}, both by call log id and read with one query per batch.
+    """
+    columns = [getattr(ReportsCallLog, name) for name in EXPORT_CALL_LOG_COLUMNS]
+    query = session.query(*columns)
+    query = _filter_call_logs(query, start, end)
+    query = (
+        query.order_by(ReportsCallLog.date, ReportsCallLog.id)
+        .execution_options(stream_results=True)
+        .yield_per(batch_size)
+    )
+    batch = []
+    for row in query:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield _with_export_details(session, batch)
+            batch = []
+    if batch:
+        yield _with_export_details(session, batch)
+
+
+def _with_export_details(session, rows):
+    ids = [row.id for row in rows]
+    participants = {}
+    query = session.query(
+        ReportsCallLogParticipant.call_log_id,
+        ReportsCallLogParticipant.role,
+        ReportsCallLogParticipant.user_uuid,
+        ReportsCallLogParticipant.answered,
+    ).filter(ReportsCallLogParticipant.call_log_id.in_(ids))
+    for call_log_id, role, user_uuid, answered in query:
+        participants.setdefault(call_log_id, []).append((role, user_uuid, answered))
+    destinations = {}
+    query = session.query(
+        ReportsDestination.call_log_id,
+        ReportsDestination.destination_details_key,
+        ReportsDestination.destination_details_value,
+    ).filter(ReportsDestination.call_log_id.in_(ids))
+    for call_log_id, key, value in query:
+        destinations.setdefault(call_log_id, {})[key] = value
+    return rows, participants, destinations
+
+
+@daosession
+def find_call_log_dates(session, call_log_ids):
+    """Return (id, date) of call logs."""
+    if not call_log_ids:
+        return []
+    query = session.query(ReportsCallLog.id, ReportsCallLog.date).filter(
+        ReportsCallLog.id.in_(call_log_ids)
+    )
+    return query.all()
+
+
+@daosession
+def iter_call_log_cache_rows(session, start, end, batch_size=10000):
+    """Yield the call logs of [start, end) with the columns of the columnar cache."""
+    query = session.query(
+        ReportsCallLog.id,
+        ReportsCallLog.date,
+        ReportsCallLog.date_answer,
+        ReportsCallLog.date_end,
+        ReportsCallLog.tenant_uuid,
+        ReportsCallLog.direction,
+        ReportsCallLog.trunk,
+        ReportsCallLog.schedule_state,
+    )
+    query = _filter_call_logs(query, start, end)
+    return query.order_by(ReportsCallLog.id).execution_options(stream_results=True).yield_per(
+        batch_size
+    )
+
+
+# dimensions accepted by count_call_logs_by_grouping_sets
+REPORT_DIMENSIONS = (
+    'direction',
+    'trunk',
+    'tenant',
+    'schedule_state',
+    'schedule_id',
+    'destination_type',
+    'user',
+)
+
+# named (dimensions, grouping sets) combinations accepted as group_by
+REPORT_GROUPING_PRESETS = {
+    # total, by direction, by trunk and by direction x trunk, as in the CEL based report
+    'default': (
+        ('direction', 'trunk'),
+        [(), ('direction',), ('trunk',), ('direction', 'trunk')],
+    ),
+}
+
+
+@daosession
+def count_call_logs_by_grouping_sets(
+    session,
+    dimensions,
+    grouping_sets,
+    start=None,
+    end=None,
+    tenant_uuid=None,
+    schedule_id=None,
+    sample_percent=None,
+):
+    """Count call logs for every grouping set with a single GROUPING SETS query.
+
+    `dimensions` lists the REPORT_DIMENSIONS used by `grouping_sets`, a list of
+    tuples of dimension names. Each returned dict holds the grouping set, the value
+    of each of its dimensions and the working_hours / outside_working_hours / total
+    counters. A call is within working hours when its schedule state is 'opened'.
+
+    With `sample_percent`, only that percentage of the table pages is read
+    (TABLESAMPLE SYSTEM, with a fixed seed so the same sample answers the same
+    query) and the counters are those of the sample. Groups then also hold
+    'squares', the sums over the sampled pages of the squared counters of each
+    page, from which the variance of the sampled counters is estimated.
+    """
+    call_log = ReportsCallLog
+    page = None
+    if sample_percent:
+        call_log = aliased(
+            ReportsCallLog,
+            tablesample(
+                ReportsCallLog.__table__,
+                func.system(sample_percent),
+                name='sampled_call_log',
+                seed=literal(0),
+            ),
+        )
+        # '(page,tuple)' of the row, up to the comma
+        page = func.split_part(cast(literal_column('sampled_call_log.ctid'), String), ',', 1)
+    state = call_log.schedule_state.op('->>')('state')
+    columns = {}
+    joins = []
+    for name in dimensions:
+        if name == 'direction':
+            columns[name] = call_log.direction
+        elif name == 'trunk':
+            columns[name] = call_log.trunk
+        elif name == 'tenant':
+            columns[name] = call_log.tenant_uuid
+        elif name == 'schedule_state':
+            columns[name] = state
+        elif name == 'schedule_id':
+            columns[name] = call_log.schedule_state.op('->>')('schedule_id')
+        elif name == 'destination_type':
+            destination = aliased(ReportsDestination)
+            joins.append(
+                (
+                    destination,
+                    and_(
+                        destination.call_log_id == call_log.id,
+                        destination.destination_details_key == 'type',
+                    ),
+                )
+            )
+            columns[name] = destination.destination_details_value
+        elif name == 'user':
+            joins.append(
+                (
+                    ReportsCallLogParticipant,
+                    ReportsCallLogParticipant.call_log_id == call_log.id,
+                )
+            )
+            columns[name] = ReportsCallLogParticipant.user_uuid
+        else:
+            raise ValueError(f'unknown report dimension {name}')
+
+    if 'user' in columns:
+        # participants multiply rows: count each call log once per group
+        working_hours = func.count(distinct(case([(state == 'opened', call_log.id)])))
+        total = func.count(distinct(call_log.id))
+    else:
+        working_hours = func.count(case([(state == 'opened', call_log.id)]))
+        total = func.count()
+
+    selected = [columns[name] for name in dimensions]
+    grouping = func.grouping(*selected) if selected else literal(0)
+    query = session.query(
+        grouping.label('grouping_id'),
+        working_hours.label('working_hours'),
+        total.label('total'),
+        *[column.label(name) for name, column in zip(dimensions, selected)]
+    ).select_from(call_log)
+    for target, onclause in joins:
+        query = query.outerjoin(target, onclause)
+    query = _filter_call_logs(query, start, end, tenant_uuid, call_log)
+    if schedule_id is not None:
+        query = query.filter(
+            call_log.schedule_state.op('->>')('schedule_id') == str(schedule_id)
+        )
+    extra = [page] if page is not None else []
+    query = query.group_by(
+        func.grouping_sets(
+            *[
+                tuple_(*[columns[name] for name in grouping_set] + extra)
+                for grouping_set in grouping_sets
+            ]
+        )
+    )
+    if page is not None:
+        # counters per group and page, summed per group with their squares
+        pages = query.subquery()
+        outside = pages.c.total - pages.c.working_hours
+        by_group = [pages.c.grouping_id] + [pages.c[name] for name in dimensions]
+        query = session.query(
+            pages.c.grouping_id,
+            func.sum(pages.c.working_hours),
+            func.sum(pages.c.total),
+            *by_group[1:],
+            func.sum(pages.c.working_hours * pages.c.working_hours),
+            func.sum(outside * outside),
+            func.sum(pages.c.total * pages.c.total),
+        ).group_by(*by_group)
+
+    results = []
+    for row in query:
+        grouping_id, working, count = row[0], int(row[1]), int(row[2])
+        # grouping() sets the bit of each dimension aggregated away, first dimension first
+        present = tuple(
+            name
+            for position, name in enumerate(dimensions)
+            if not grouping_id & (1 << (len(dimensions) - 1 - position))
+        )
+        results.append(
+            {
+                'grouping_set': present,
+                'values': {name: row[3 + dimensions.index(name)] for name in present},
+                'working_hours': working,
+                'outside_working_hours': count - working,
+                'total': count,
+            }
+        )
+        if page is not None:
+            squares = row[3 + len(dimensions):]
+            results[-1]['squares'] = {
+                'working_hours': int(squares[0]),
+                'outside_working_hours': int(squares[1]),
+                'total': int(squares[2]),
+            }
+    return results
+
+
+@daosession
+def get_cel_watermark(session):
+    watermark = session.query(ReportsWatermark.cel_id).filter(
+        ReportsWatermark.name == CEL_WATERMARK
+    ).scalar()
+    return watermark or 0
+
+
+@daosession
+def advance_cel_watermark(session, before):
+    """Move the watermark up to just below the first CEL of `before` or later, return it.
+
+    The CELs under it are left behind for good: neither the reconciler nor
+    catch-up runs read them again, and their processed linkedids are pruned. The
+    CELs are scanned by id from the current watermark, so a pass only reads the
+    CELs that aged out since the previous one.
+    """
+    watermark = get_cel_watermark()
+    first_id = (
+        session.query(CEL.id)
+        .filter(CEL.id > watermark, CEL.eventtime >= before)
+        .order_by(CEL.id)
+        .limit(1)
+        .scalar()
+    )
+    if first_id is not None:
+        next_watermark = first_id - 1
+    else:
+        next_watermark = (
+            session.query(func.max(CEL.id)).filter(CEL.id > watermark).scalar() or watermark
+        )
+    if next_watermark <= watermark:
+        return watermark
+    now = datetime.now(timezone.utc)
+    statement = insert(ReportsWatermark).values(
+        name=CEL_WATERMARK, cel_id=next_watermark, updated_at=now
+    )
+    session.execute(
+        statement.on_conflict_do_update(
+            index_elements=[ReportsWatermark.name],
+            # a catch-up run may have moved it meanwhile
+            set_={
+                'cel_id': func.greatest(ReportsWatermark.cel_id, next_watermark),
+                'updated_at': now,
+            },
+        )
+    )
+    session.commit()
+    return next_watermark
+
+
+@daosession
+def find_unprocessed_cels(session, above_id, limit=None, older=None):
+    """Return the CELs above `above_id` whose linkedid was not processed, by ascending id.
+
+    An anti-join on plugin_reports_processed_linkedid skips the calls the bus
+    handler already turned into call logs.
+    """
+    query = (
+        session.query(CEL)
+        .outerjoin(
+            ReportsProcessedLinkedid,
+            ReportsProcessedLinkedid.linkedid == CEL.linkedid,
+        )
+        .filter(ReportsProcessedLinkedid.linkedid.is_(None))
+        .filter(CEL.id > above_id)
+    )
+    if older:
+        query = query.filter(CEL.eventtime >= older)
+    query = query.order_by(CEL.id)
+    if limit:
+        query = query.limit(limit)
+    return query.all()
+
+
+@daosession
+def find_unreconciled_linkedids(session, start, end, limit, above_id=0):
+    """Return (linkedid, eventtime) of the LINKEDID_END of [start, end) that have no call log.
+
+    A linkedid is reconciled when a call log has it as conversation_id or when it
+    is a processed linkedid; CELs under `above_id` (the watermark) are left out.
+    Oldest first.
+    """
+    has_call_log = exists().where(ReportsCallLog.conversation_id == CEL.linkedid)
+    processed = exists().where(ReportsProcessedLinkedid.linkedid == CEL.linkedid)
+    query = (
+        session.query(CEL.linkedid, CEL.eventtime)
+        .filter(CEL.eventtype == 'LINKEDID_END')
+        .filter(CEL.eventtime >= start)
+        .filter(CEL.eventtime < end)
+        .filter(CEL.id > above_id)
+        .filter(~has_call_log)
+        .filter(~processed)
+        .order_by(CEL.eventtime)
+        .limit(limit)
+    )
+    return query.all()
+
+
+@daosession
+def find_processed_linkedids(session, linkedids):
+    """Return those of `linkedids` that have a call log or are processed linkedids."""
+    if not linkedids:
+        return set()
+    linkedids = list(linkedids)
+    with_call_log = session.query(ReportsCallLog.conversation_id).filter(
+        ReportsCallLog.conversation_id.in_(linkedids)
+    )
+    processed = session.query(ReportsProcessedLinkedid.linkedid).filter(
+        ReportsProcessedLinkedid.linkedid.in_(linkedids)
+    )
+    return {linkedid for linkedid, in with_call_log.union(processed)}
+
+
+@daosession
+def prune_processed_linkedids(session, processed_before, watermark):
+    """Delete the processed linkedids whose CELs are all under the watermark.
+
+    Linkedids generated from CELs received on the bus have no CEL id: those
+    processed before `processed_before` get the highest id of their CELs in the
+    cel table first (0 when the cel table has none left), so the watermark prunes
+    them like the others. Their CELs above the watermark would otherwise be read
+    again and generate duplicates.
+    """
+    max_cel_id = func.coalesce(
+        session.query(func.max(CEL.id))
+        .filter(CEL.linkedid == ReportsProcessedLinkedid.linkedid)
+        .as_scalar(),
+        0,
+    )
+    session.query(ReportsProcessedLinkedid).filter(
+        ReportsProcessedLinkedid.max_cel_id.is_(None),
+        ReportsProcessedLinkedid.processed_at < processed_before,
+    ).update({'max_cel_id': max_cel_id}, synchronize_session=False)
+    session.query(ReportsProcessedLinkedid).filter(
+        ReportsProcessedLinkedid.max_cel_id <= watermark
+    ).delete(synchronize_session=False)
+    session.commit()
@@ -1,8 +1,10 @@
 import logging
+import re
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, scoped_session
+from sqlalchemy.schema import CreateIndex
 from sqlalchemy_utils import database_exists, create_database
 
 Base = declarative_base()
@@ -17,4 +19,43 @@ def init_db(db_uri):
         logger.info('creating db')
         create_database(engine.url)
     Base.metadata.create_all(engine)
+    _create_missing_indexes(engine)
     ScopedSession.configure(bind=engine)
+
+
+def _create_missing_indexes(engine):
+    # create_all() skips existing tables, so indexes added to a model later are created here.
+    # CREATE INDEX CONCURRENTLY does not block writes to a populated table, but cannot run
+    # inside a transaction
+    inspector = inspect(engine)
+    connection = engine.connect().execution_options(isolation_level='AUTOCOMMIT')
+    try:
+        # an interrupted concurrent build leaves an invalid index: it is built again
+        invalid = {
+            row[0]
+            for row in connection.execute(
+                text(
+                    'SELECT c.relname FROM pg_index i '
+                    'JOIN pg_class c ON c.oid = i.indexrelid WHERE NOT i.indisvalid'
+                )
+            )
+        }
+        for table in Base.metadata.sorted_tables:
+            existing = {index['name'] for index in inspector.get_indexes(table.name)} - invalid
+            for index in table.indexes:
+                if index.name not in existing:
+                    _create_index_concurrently(connection, index)
+    finally:
+        connection.close()
+
+
+def _create_index_concurrently(connection, index):
+    logger.info('creating index %s', index.name)
+    connection.execute(text('DROP INDEX CONCURRENTLY IF EXISTS "{}"'.format(index.name)))
+    statement = str(CreateIndex(index).compile(dialect=connection.dialect))
+    statement = re.sub(r'^CREATE (UNIQUE )?INDEX ', r'CREATE \1INDEX CONCURRENTLY ', statement)
+    try:
+        connection.execute(text(statement))
+    except Exception:
+        # the invalid index left behind is dropped and built again at the next startup
+        logger.exception('failed to create index %s', index.name)
@@ -0,0 +1,85 @@
+from workano_reports_plugin.sketches import DDSketch
+
+DURATION_METRICS = ('talk_time', 'answer_time')
+DURATION_QUANTILES = (('p50', 0.5), ('p90', 0.9), ('p99', 0.99))
+
+
+def _summary(sketch):
+    summary = {
+        'count': sketch.count,
+        'average': sketch.sum / sketch.count if sketch.count else None,
+    }
+    for name, fraction in DURATION_QUANTILES:
+        summary[name] = sketch.quantile(fraction)
+    return summary
+
+
+class DurationStats:
+    """Talk and answer time sketches per direction and trunk.
+
+    Only answered calls have durations: answer time is date_answer - date and
+    talk time date_end - date_answer. Stats are built from call log rows or from
+    serialized rollups, and merge without loss beyond the sketch accuracy.
+    """
+
+    def __init__(self):
+        # (direction, trunk) -> {metric: DDSketch}
+        self._sketches = {}
+
+    def _group(self, direction, trunk):
+        group = self._sketches.get((direction, trunk))
+        if group is None:
+            group = self._sketches[(direction, trunk)] = {
+                metric: DDSketch() for metric in DURATION_METRICS
+            }
+        return group
+
+    def add(self, direction, trunk, date, date_answer, date_end):
+        if date_answer is None:
+            return
+        group = self._group(direction, 'unknown' if trunk is None else trunk)
+        group['answer_time'].add(max((date_answer - date).total_seconds(), 0.0))
+        if date_end is not None:
+            group['talk_time'].add(max((date_end - date_answer).total_seconds(), 0.0))
+
+    def merge(self, other):
+        for (direction, trunk), sketches in other._sketches.items():
+            group = self._group(direction, trunk)
+            for metric, sketch in sketches.items():
+                group[metric].merge(sketch)
+
+    def merge_dict(self, data):
+        """Merge the stats of `to_dict`."""
+        for direction, trunks in data.items():
+            for trunk, sketches in trunks.items():
+                group = self._group(direction, trunk)
+                for metric, sketch in sketches.items():
+                    group[metric].merge(DDSketch.from_dict(sketch))
+
+    def to_dict(self):
+        data = {}
+        for (direction, trunk), sketches in self._sketches.items():
+            data.setdefault(direction, {})[trunk] = {
+                metric: sketch.to_dict() for metric, sketch in sketches.items()
+            }
+        return data
+
+    def report(self):
+        """Return the summaries per direction, merged from the trunk sketches, and per trunk."""
+        by_direction = {}
+        for (direction, trunk), sketches in sorted(self._sketches.items()):
+            entry = by_direction.get(direction)
+            if entry is None:
+                entry = by_direction[direction] = {
+                    'sketches': {metric: DDSketch() for metric in DURATION_METRICS},
+                    'by_trunk': {},
+                }
+            for metric, sketch in sketches.items():
+                entry['sketches'][metric].merge(sketch)
+            entry['by_trunk'][trunk] = {
+                metric: _summary(sketch) for metric, sketch in sketches.items()
+            }
+        for entry in by_direction.values():
+            for metric, sketch in entry.pop('sketches').items():
+                entry[metric] = _summary(sketch)
+        return by_direction
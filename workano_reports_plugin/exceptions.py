@@ -0,0 +1,71 @@
+from xivo.rest_api_helpers import APIException
+
+
+class ReportJobNotFound(APIException):
+    def __init__(self, job_uuid):
+        super().__init__(
+            status_code=404,
+            message='No report job found',
+            error_id='report-job-not-found',
+            details={'job_uuid': str(job_uuid)},
+        )
+
+
+class TooManyReportJobs(APIException):
+    def __init__(self, max_pending):
+        super().__init__(
+            status_code=429,
+            message='Too many report jobs in progress',
+            error_id='too-many-report-jobs',
+            details={'max_pending': max_pending},
+        )
+
+
+class TooManyReportsInProgress(APIException):
+    def __init__(self, tenant_uuid, max_concurrent):
+        super().__init__(
+            status_code=429,
+            message='Too many reports in progress for this tenant',
+            error_id='too-many-reports-in-progress',
+            details={'tenant_uuid': tenant_uuid, 'max_concurrent': max_concurrent},
+        )
+
+
+class LiveCallsDisabled(APIException):
+    def __init__(self):
+        super().__init__(
+            status_code=404,
+            message='Calls in progress are only followed with streaming enabled',
+            error_id='live-calls-disabled',
+            details={},
+        )
+
+
+class NumberSketchesDisabled(APIException):
+    def __init__(self):
+        super().__init__(
+            status_code=404,
+            message='Number sketches are only kept with number_sketches enabled',
+            error_id='number-sketches-disabled',
+            details={},
+        )
+
+
+class ExportInProgress(APIException):
+    def __init__(self):
+        super().__init__(
+            status_code=409,
+            message='A call log export is already running',
+            error_id='export-in-progress',
+            details={},
+        )
+
+
+class ExportUnavailable(APIException):
+    def __init__(self):
+        super().__init__(
+            status_code=503,
+            message='The call log export requires pyarrow',
+            error_id='export-unavailable',
+            details={},
+        )
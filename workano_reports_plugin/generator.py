@@ -17,9 +17,11 @@ from workano_reports_plugin.dao import get_context_numbers, get_schedule_from_ex
 from workano_reports_plugin.schedule_utils import get_schedule_mapper
 
 from .cel_interpretor import AbstractCELInterpretor
+from .metrics import incomplete_groups, interpreted_calls, timed_stage
 from wazo_call_logd.database.cel_event_type import CELEventType
 from wazo_call_logd.exceptions import InvalidCallLogException
 from .raw_call_log import RawCallLog
+from .streaming import LiveCalls
 
 from .models import ReportsCallLog, ReportsCallLogParticipant
 from .participant import ParticipantInfo, find_participant, find_participant_by_uuid
@@ -57,10 +59,30 @@ def check_if_is_in_contextnumbers(context_numbers, exten):
 
 
 CallLogsCreation = namedtuple(
-    'CallLogsCreation', ('new_call_logs', 'call_logs_to_delete')
+    'CallLogsCreation',
+    ('new_call_logs', 'call_logs_to_delete', 'processed_linkedids', 'incomplete_groups'),
+    defaults=(None, None),
 )
 
 
+def _processed_linkedids(cels, call_logs):
+    """Map the linkedids whose CELs made it into `call_logs` to their highest CEL id.
+
+    CELs received on the bus have no id, their linkedids map to None.
+    """
+    cel_ids = {cel_id for call_log in call_logs for cel_id in call_log.cel_ids}
+    result = {}
+    for cel in cels:
+        if cel.id not in cel_ids:
+            continue
+        current = result.get(cel.linkedid)
+        if cel.id is not None and (current is None or cel.id > current):
+            result[cel.linkedid] = cel.id
+        else:
+            result.setdefault(cel.linkedid, None)
+    return result
+
+
 class _ParticipantsProcessor:
     def __init__(self, confd_client: ConfdClient):
         self.confd: ConfdClient = confd_client
@@ -242,17 +264,39 @@ class CallLogsGenerator:
     def set_default_tenant_uuid(self, token):
         self._service_tenant_uuid = token['metadata']['tenant_uuid']
 
-    def from_cel(self, cels):
+    def from_cel(self, cels, allow_incomplete=False, live_calls=None):
         call_logs_to_delete = self.list_call_log_ids(cels)
-        new_call_logs = self.call_logs_from_cel(cels)
+        skipped = []
+        new_call_logs = self.call_logs_from_cel(
+            cels, allow_incomplete=allow_incomplete, skipped=skipped, live_calls=live_calls
+        )
         return CallLogsCreation(
             new_call_logs=new_call_logs,
             call_logs_to_delete=call_logs_to_delete,
+            processed_linkedids=_processed_linkedids(cels, new_call_logs),
+            incomplete_groups=skipped,
         )
 
-    def call_logs_from_cel(self, cels: list[CEL]) -> list[ReportsCallLog]:
+    def call_logs_from_cel(
+        self,
+        cels: list[CEL],
+        allow_incomplete: bool = False,
+        skipped: list | None = None,
+        live_calls: LiveCalls | None = None,
+    ) -> list[ReportsCallLog]:
+        """Interpret the CELs of each correlated group into a call log.
+
+        Groups whose linkedids are not all terminated are skipped, and appended
+        to `skipped` as (linkedids, terminated linkedids), unless
+        `allow_incomplete` is set.
+
+        Groups already interpreted as their CELs arrived in `live_calls` are
+        taken from there instead of being interpreted again.
+        """
         result = []
-        for linkedids, cels_by_call in _group_cels_by_shared_channels(cels):
+        with timed_stage('group'):
+            groups = list(_group_cels_by_shared_channels(cels))
+        for linkedids, cels_by_call in groups:
             logger.debug(
                 'interpreting %d cels from correlated linkedids(%s)',
                 len(cels_by_call),
@@ -265,30 +309,48 @@ class CallLogsGenerator:
                 if cel.eventtype == CELEventType.linkedid_end
             }
 
-            if linkedids != terminated_links:
+            if linkedids != terminated_links and not allow_incomplete:
                 unterminated_links = linkedids - terminated_links
+                incomplete_groups.inc()
+                if skipped is not None:
+                    skipped.append((linkedids, terminated_links))
                 logger.debug(
                     'Skipping correlated cel sequence with incomplete linkedid sequences (%s)',
                     ', '.join(unterminated_links),
                 )
                 continue
 
-            call_log = RawCallLog()
+            live_call = None
+            if live_calls is not None:
+                live_call = live_calls.pop(linkedids, cels_by_call)
+
+            if live_call is not None:
+                # already interpreted CEL by CEL as they arrived
+                interpretor = live_call.interpretor
+                call_log = live_call.bind(cels_by_call)
+            else:
+                interpretor = self._get_interpretor(cels_by_call)
+                call_log = RawCallLog()
 
             # Call pickups may have multiple linkedids.
             # In that case, use the linkedid of the caller, i.e. the smaller one.
             call_log.conversation_id = min(linkedids)
             call_log.cel_ids = [cel.id for cel in cels_by_call]
 
-            interpretor = self._get_interpretor(cels_by_call)
             logger.debug('interpreting cels using %s', interpretor.__class__.__name__)
             try:
-                call_log = interpretor.interpret_cels(cels_by_call, call_log)
+                if live_call is None:
+                    with timed_stage('interpret'):
+                        call_log = interpretor.interpret_cels(cels_by_call, call_log)
+                interpreted_calls.inc(interpretor=interpretor.__class__.__name__)
                 self._fill_trunk(call_log)
-                self._check_schedule(call_log)
+                with timed_stage('schedule'):
+                    self._check_schedule(call_log)
                 self._remove_duplicate_participants(call_log)
-                self._fetch_participants(call_log)
-                self._ensure_tenant_uuid_is_set(call_log)
+                with timed_stage('participants'):
+                    self._fetch_participants(call_log)
+                with timed_stage('tenant'):
+                    self._ensure_tenant_uuid_is_set(call_log)
                 self._fill_extensions_from_participants(call_log)
                 self._remove_incomplete_recordings(call_log)
                 self._handle_recording_pauses(call_log)
@@ -0,0 +1,186 @@
+import logging
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from xivo_dao.helpers.db_manager import daosession
+
+from workano_reports_plugin.config import get_plugin_config
+from workano_reports_plugin.exceptions import ReportJobNotFound, TooManyReportJobs
+from workano_reports_plugin.models import ReportsJob
+
+logger = logging.getLogger(__name__)
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+@daosession
+def create_job(session, params, tenant_uuid):
+    job = ReportsJob(
+        uuid=uuid.uuid4(),
+        tenant_uuid=tenant_uuid,
+        status='pending',
+        params=params,
+        created_at=_now(),
+    )
+    session.add(job)
+    session.flush()
+    session.expunge(job)
+    session.commit()
+    return job
+
+
+@daosession
+def find_job(session, job_uuid):
+    job = session.query(ReportsJob).filter(ReportsJob.uuid == job_uuid).first()
+    if job:
+        session.expunge(job)
+    session.commit()
+    return job
+
+
+@daosession
+def update_job(session, job_uuid, **fields):
+    query = session.query(ReportsJob).filter(ReportsJob.uuid == job_uuid)
+    query.update(fields, synchronize_session=False)
+    session.commit()
+
+
+@daosession
+def delete_expired_jobs(session):
+    query = session.query(ReportsJob).filter(ReportsJob.expires_at < _now())
+    query.delete(synchronize_session=False)
+    session.commit()
+
+
+@daosession
+def fail_interrupted_jobs(session):
+    # jobs still pending or running belonged to a previous process and will never finish
+    query = session.query(ReportsJob).filter(
+        ReportsJob.status.in_(['pending', 'running'])
+    )
+    query.update(
+        {
+            'status': 'failed',
+            'error': 'interrupted',
+            'finished_at': _now(),
+            'expires_at': _now(),
+        },
+        synchronize_session=False,
+    )
+    session.commit()
+
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+
+def job_to_dict(job, progress=None):
+    result = {
+        'uuid': str(job.uuid),
+        'tenant_uuid': job.tenant_uuid,
+        'status': job.status,
+        'params': job.params,
+        'progress': progress if progress is not None else job.progress,
+        'error': job.error,
+        'created_at': _isoformat(job.created_at),
+        'started_at': _isoformat(job.started_at),
+        'finished_at': _isoformat(job.finished_at),
+        'expires_at': _isoformat(job.expires_at),
+    }
+    if job.status == 'finished':
+        result['result'] = job.result
+    return result
+
+
+def build_report_jobs_service(reports_service, config):
+    return ReportJobsService(reports_service, config)
+
+
+class ReportJobsService:
+    """Run `WorkanoReportsService.get_reports` in a bounded pool of background workers.
+
+    Progress of running jobs is kept in memory; status and results are stored in
+    `plugin_reports_job` and purged once their TTL expires.
+    """
+
+    def __init__(self, reports_service, config):
+        jobs_config = get_plugin_config(config)['jobs']
+        self._reports_service = reports_service
+        self._config = config
+        self._max_pending = jobs_config['max_pending']
+        self._result_ttl = timedelta(seconds=jobs_config['result_ttl'])
+        self._executor = ThreadPoolExecutor(
+            max_workers=jobs_config['max_workers'],
+            thread_name_prefix='reports-job',
+        )
+        self._lock = threading.Lock()
+        self._progress = {}
+        try:
+            fail_interrupted_jobs()
+        except Exception:
+            logger.exception('Failed to mark interrupted report jobs')
+
+    def create(self, params, tenant=None):
+        delete_expired_jobs()
+        with self._lock:
+            if len(self._progress) >= self._max_pending:
+                raise TooManyReportJobs(self._max_pending)
+            job = create_job(params, tenant)
+            self._progress[job.uuid] = {}
+        self._executor.submit(self._run, job.uuid, params, tenant)
+        return job_to_dict(job)
+
+    def get(self, job_uuid, tenant=None):
+        delete_expired_jobs()
+        job = find_job(job_uuid)
+        if not job or (tenant and job.tenant_uuid != tenant):
+            raise ReportJobNotFound(job_uuid)
+        with self._lock:
+            progress = self._progress.get(job.uuid)
+            progress = dict(progress) if progress is not None else None
+        return job_to_dict(job, progress=progress)
+
+    def _set_progress(self, job_uuid, **progress):
+        with self._lock:
+            if job_uuid in self._progress:
+                self._progress[job_uuid] = progress
+
+    def _run(self, job_uuid, params, tenant):
+        def progress(**kwargs):
+            self._set_progress(job_uuid, **kwargs)
+
+        try:
+            update_job(job_uuid, status='running', started_at=_now())
+            result = self._reports_service.get_reports(
+                params,
+                config=self._config,
+                tenant=tenant,
+                progress=progress,
+                wait_for_admission=True,
+            )
+        except Exception as e:
+            logger.exception('Report job %s failed', job_uuid)
+            update_job(
+                job_uuid,
+                status='failed',
+                error=str(e),
+                finished_at=_now(),
+                expires_at=_now() + self._result_ttl,
+            )
+        else:
+            update_job(
+                job_uuid,
+                status='finished',
+                result=result,
+                progress={'phase': 'done'},
+                finished_at=_now(),
+                expires_at=_now() + self._result_ttl,
+            )
+            logger.info('Report job %s finished', job_uuid)
+        finally:
+            with self._lock:
+                self._progress.pop(job_uuid, None)
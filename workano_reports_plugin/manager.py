@@ -4,9 +4,19 @@
 from __future__ import annotations
 
 import logging
+import threading
 from datetime import datetime, timedelta
 
-from workano_reports_plugin.generator import CallLogsGenerator
+from workano_reports_plugin.accumulator import CELAccumulator
+from workano_reports_plugin.dao import (
+    find_processed_linkedids,
+    find_unprocessed_cels,
+    get_cel_watermark,
+)
+from workano_reports_plugin.generator import CallLogsCreation, CallLogsGenerator
+from workano_reports_plugin.metrics import timed_stage
+from workano_reports_plugin.pending import PendingGroups
+from workano_reports_plugin.streaming import LiveCalls
 
 from wazo_call_logd.database.queries import DAO
 
@@ -14,12 +24,60 @@ from workano_reports_plugin.writer import CallLogsWriter
 
 logger = logging.getLogger(__name__)
 
+# an unprocessed linkedid stops holding the watermark back once its last CEL is
+# this much older than the newest CEL read, e.g. when its LINKEDID_END never came
+UNPROCESSED_LINKEDID_TIMEOUT = timedelta(hours=24)
+
+
+def _next_watermark(watermark, cels, processed_linkedids):
+    """Return the highest CEL id under which no CEL still has to be read again.
+
+    `cels` are the unprocessed CELs above `watermark`; those whose linkedid is
+    still unprocessed (unterminated, incomplete or failed calls) are read again
+    by the next run, unless they timed out.
+    """
+    if not cels:
+        return watermark
+    newest = max(cel.eventtime for cel in cels)
+    first_ids = {}
+    last_times = {}
+    for cel in cels:
+        if cel.linkedid in processed_linkedids:
+            continue
+        first_ids[cel.linkedid] = min(cel.id, first_ids.get(cel.linkedid, cel.id))
+        last_times[cel.linkedid] = max(cel.eventtime, last_times.get(cel.linkedid, cel.eventtime))
+    held = [
+        first_ids[linkedid]
+        for linkedid, last_time in last_times.items()
+        if newest - last_time < UNPROCESSED_LINKEDID_TIMEOUT
+    ]
+    if held:
+        return max(min(held) - 1, watermark)
+    return max(cel.id for cel in cels)
+
+
+def _unique_cels(cels):
+    # correlated linkedids return the same CELs; accumulated CELs have no id
+    unique = {}
+    for cel in cels:
+        unique.setdefault(cel.id if cel.id is not None else id(cel), cel)
+    return list(unique.values())
+
 
 class CallLogsManager:
-    def __init__(self, dao, generator, writer):
+    def __init__(self, dao, generator, writer, pending=None, accumulator=None, live_calls=None):
         self.dao: DAO = dao
         self.generator: CallLogsGenerator = generator
         self.writer: CallLogsWriter = writer
+        self.pending: PendingGroups = pending or PendingGroups()
+        # when set, CELs received on the bus are generated without reading the cel table
+        self.accumulator: CELAccumulator | None = accumulator
+        # when set, calls are interpreted as their CELs arrive on the bus
+        self.live_calls: LiveCalls | None = live_calls
+        # the bus handler and the reconciler both write call logs
+        self._write_lock = threading.Lock()
+        # seconds between the last LINKEDID_END handled from the bus and its event time
+        self.bus_lag = 0.0
         # self.publisher = publisher
 
     ### these two methods uses call_log from original dao, we should update it to use reports_call_log before enabling them
@@ -34,27 +92,108 @@ class CallLogsManager:
 
     def generate_from_days(self, days):
         older_cel = datetime.now() - timedelta(days=days)
-        cels = self.dao.cel.find_last_unprocessed(older=older_cel)
-        self._generate_from_cels(cels)
+        self._generate_from_watermark(older=older_cel)
 
     def generate_from_count(self, cel_count):
-        cels = self.dao.cel.find_last_unprocessed(cel_count)
+        self._generate_from_watermark(limit=cel_count)
+
+    def _generate_from_watermark(self, limit=None, older=None):
+        with timed_stage('fetch'):
+            watermark = get_cel_watermark()
+            cels = find_unprocessed_cels(watermark, limit=limit, older=older)
         logger.debug(
-            'Generating call logs from the last %s CEL (found %s)',
-            cel_count,
+            'Generating call logs from %s unprocessed CEL above id %s (limit %s)',
             len(cels),
+            watermark,
+            limit,
         )
-        self._generate_from_cels(cels)
+        call_logs = self.generator.from_cel(cels)
+        logger.debug('Generated %s call logs', len(call_logs.new_call_logs))
+        next_watermark = _next_watermark(watermark, cels, call_logs.processed_linkedids)
+        self._write(call_logs, watermark=next_watermark)
 
     def generate_from_linked_id(self, linked_id):
-        cels = self.dao.cel.find_from_linked_id(linked_id)
+        linked_ids = self.pending.terminate(linked_id)
+        if linked_ids is None:
+            logger.debug(
+                'linked_id %s waits for the other linked_ids of its call', linked_id
+            )
+            return CallLogsCreation(new_call_logs=[], call_logs_to_delete=set())
+        return self._generate_from_linked_ids(linked_ids)
+
+    def generate_expired_groups(self):
+        """Generate the pending groups that waited too long for a LINKEDID_END, as they are."""
+        for linked_ids in self.pending.pop_expired():
+            try:
+                self._generate_from_linked_ids(linked_ids, allow_incomplete=True)
+            except Exception:
+                logger.exception(
+                    'Failed to generate call log for expired linked_ids %s', linked_ids
+                )
+
+    def _generate_from_linked_ids(self, linked_ids, allow_incomplete=False):
+        with timed_stage('fetch'):
+            cels = self._find_from_linked_ids(linked_ids)
         logger.debug(
-            'Generating call log for linked_id %s from %s CEL', linked_id, len(cels)
+            'Generating call log for linked_ids %s from %s CEL', linked_ids, len(cels)
         )
-        self._generate_from_cels(cels)
+        call_logs = self._generate_from_cels(cels, allow_incomplete, self.live_calls)
+        incomplete_linked_ids = set()
+        for group_linked_ids, terminated in call_logs.incomplete_groups:
+            self.pending.add(group_linked_ids, terminated)
+            incomplete_linked_ids |= group_linked_ids
+        # the LINKEDID_END of the other linkedids of these calls is still to come
+        self.pending.done(call_logs.processed_linkedids.keys() - linked_ids)
+        generated_linked_ids = {cel.linkedid for cel in cels} - incomplete_linked_ids
+        if self.accumulator is not None:
+            self.accumulator.discard(generated_linked_ids)
+        if self.live_calls is not None:
+            self.live_calls.discard(generated_linked_ids)
+        return call_logs
 
-    def _generate_from_cels(self, cels):
-        call_logs = self.generator.from_cel(cels)
+    def _find_from_linked_ids(self, linked_ids):
+        if self.accumulator is not None:
+            cels = []
+            for linked_id in linked_ids:
+                found = self.accumulator.find_from_linked_id(linked_id)
+                if found is None:
+                    break
+                cels.extend(found)
+            else:
+                return _unique_cels(cels)
+        cels = []
+        for linked_id in linked_ids:
+            cels.extend(self.dao.cel.find_from_linked_id(linked_id))
+        return _unique_cels(cels)
+
+    def _generate_from_cels(self, cels, allow_incomplete=False, live_calls=None):
+        call_logs = self.generator.from_cel(
+            cels, allow_incomplete=allow_incomplete, live_calls=live_calls
+        )
         logger.debug('Generated %s call logs', len(call_logs.new_call_logs))
-        self.writer.write(call_logs)
-        # self.publisher.publish_call_log(*call_logs.new_call_logs)
\ No newline at end of file
+        return self._write(call_logs)
+        # self.publisher.publish_call_log(*call_logs.new_call_logs)
+
+    def _write(self, call_logs, watermark=None):
+        """Write the call logs that were not written since their CELs were read.
+
+        The bus handler and the reconciler can generate the same call at the same
+        time: the check and the write are serialized so that only the first one
+        writes it. Call logs replacing existing ones are always written.
+        """
+        with self._write_lock:
+            if not call_logs.call_logs_to_delete:
+                written = find_processed_linkedids(
+                    {call_log.conversation_id for call_log in call_logs.new_call_logs}
+                )
+                if written:
+                    logger.debug('Call logs of %s already written, skipping', written)
+                    call_logs = call_logs._replace(
+                        new_call_logs=[
+                            call_log
+                            for call_log in call_logs.new_call_logs
+                            if call_log.conversation_id not in written
+                        ]
+                    )
+            self.writer.write(call_logs, watermark=watermark)
+        return call_logs
@@ -0,0 +1,214 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LAG_BUCKETS = (0.1, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+# stages of the CEL -> call log pipeline, in processing order
+PIPELINE_STAGES = (
+    'stream',
+    'fetch',
+    'group',
+    'interpret',
+    'schedule',
+    'participants',
+    'tenant',
+    'write',
+)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    content = ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+        for name, value in pairs
+    )
+    return '{' + content + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type_name = ''
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.label_names):
+            raise ValueError(f'{self.name} expects labels {self.label_names}, got {tuple(labels)}')
+        return tuple(labels[name] for name in self.label_names)
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def render(self):
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.type_name}',
+        ]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.extend(self._render_value(key, value))
+        return lines
+
+
+class Counter(_Metric):
+    type_name = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _render_value(self, key, value):
+        yield f'{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}'
+
+
+class Histogram(_Metric):
+    type_name = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def get(self, **labels):
+        """Return (count, sum) of the observations for these labels."""
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return (state[2], state[1]) if state else (0, 0.0)
+
+    def _render_value(self, key, value):
+        counts, total, count = value
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            labels = _format_labels(self.label_names, key, [('le', _format_value(bound))])
+            yield f'{self.name}_bucket{labels} {cumulative}'
+        labels = _format_labels(self.label_names, key)
+        yield f'{self.name}_sum{labels} {_format_value(total)}'
+        yield f'{self.name}_count{labels} {count}'
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name, documentation, labels=()):
+        metric = Counter(name, documentation, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, documentation, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def reset(self):
+        for metric in self._metrics:
+            metric.reset()
+
+    def render(self):
+        """Return all metrics in the Prometheus text exposition format."""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+stage_duration = REGISTRY.histogram(
+    'workano_reports_pipeline_stage_duration_seconds',
+    'Time spent in each stage of the call log pipeline.',
+    labels=('stage',),
+)
+stage_errors = REGISTRY.counter(
+    'workano_reports_pipeline_stage_errors_total',
+    'Exceptions raised in each stage of the call log pipeline.',
+    labels=('stage',),
+)
+interpreted_calls = REGISTRY.counter(
+    'workano_reports_interpreted_calls_total',
+    'Correlated CEL groups interpreted, by interpretor.',
+    labels=('interpretor',),
+)
+incomplete_groups = REGISTRY.counter(
+    'workano_reports_incomplete_groups_total',
+    'Correlated CEL groups skipped because a linkedid was not terminated.',
+)
+pending_groups = REGISTRY.counter(
+    'workano_reports_pending_groups_total',
+    'Incomplete correlated groups buffered, completed by a later LINKEDID_END or expired.',
+    labels=('outcome',),
+)
+accumulated_fetches = REGISTRY.counter(
+    'workano_reports_accumulator_total',
+    'Calls read from the CEL accumulator (memory) or the cel table (database), and spilled linkedids.',
+    labels=('outcome',),
+)
+streamed_calls = REGISTRY.counter(
+    'workano_reports_streamed_calls_total',
+    'Calls interpreted as their CELs arrived, finalized from it, interpreted again (fallback) or dropped.',
+    labels=('outcome',),
+)
+written_call_logs = REGISTRY.counter(
+    'workano_reports_call_logs_written_total',
+    'Call logs written to plugin_reports_call_log.',
+)
+linkedid_events = REGISTRY.counter(
+    'workano_reports_linkedid_end_total',
+    'LINKEDID_END events handled, by outcome.',
+    labels=('outcome',),
+)
+reconciled_linkedids = REGISTRY.counter(
+    'workano_reports_reconciled_linkedids_total',
+    'Terminated linkedids without call log regenerated by the reconciler, by outcome.',
+    labels=('outcome',),
+)
+queue_lag = REGISTRY.histogram(
+    'workano_reports_linkedid_end_lag_seconds',
+    'Delay between a LINKEDID_END event time and the commit of its call log.',
+    buckets=LAG_BUCKETS,
+)
+
+
+@contextmanager
+def timed_stage(stage):
+    """Record the duration (and failures) of a pipeline stage."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        stage_errors.inc(stage=stage)
+        raise
+    finally:
+        stage_duration.observe(time.perf_counter() - start, stage=stage)
@@ -14,7 +14,7 @@ from sqlalchemy.ext.mutable import MutableList
 from sqlalchemy.orm import relationship
 from sqlalchemy.schema import CheckConstraint, Column, ForeignKey, Index
 from sqlalchemy.sql import and_, case, select, text
-from sqlalchemy.types import Boolean, DateTime, Enum, Integer, String, Text, JSON
+from sqlalchemy.types import Boolean, Date, DateTime, Enum, Integer, String, Text, JSON
 from sqlalchemy_utils import UUIDType, generic_repr
 from .db import Base
 
@@ -143,6 +143,7 @@ class ReportsCallLog(Base):
 
     __table_args__ = (
         Index('plugin_reports_call_log__idx__conversation_id', 'conversation_id'),
+        Index('plugin_reports_call_log__idx__date', 'date'),
         CheckConstraint(
             direction.in_(['inbound', 'internal', 'outbound']),
             name='plugin_reports_call_log_direction_check',
@@ -409,3 +410,117 @@ class ReportsTransfer(Base):
         Index('plugin_reports_call_log_transfer__idx__event_time', 'event_time'),
     )
 
+
+
+@generic_repr
+class ReportsJob(Base):
+    """Background report computation requested through the jobs API.
+
+    The result is kept until `expires_at` so it can be fetched without recomputation.
+    """
+
+    __tablename__ = 'plugin_reports_job'
+
+    uuid = Column(UUIDType, primary_key=True)
+    tenant_uuid = Column(String(255))
+    status = Column(
+        Enum(
+            'pending',
+            'running',
+            'finished',
+            'failed',
+            name='plugin_reports_job_status',
+        ),
+        nullable=False,
+    )
+    params = Column(JSON)
+    progress = Column(JSON)
+    result = Column(JSON)
+    error = Column(Text)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    started_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
+    expires_at = Column(DateTime(timezone=True))
+
+    __table_args__ = (
+        Index('plugin_reports_job__idx__expires_at', 'expires_at'),
+    )
+
+
+@generic_repr
+class ReportsProcessedLinkedid(Base):
+    """Linkedid whose CELs were turned into call logs, with the highest of their CEL ids.
+
+    max_cel_id is unknown (NULL) when the call was generated from CELs received
+    on the bus, until the reconciler reads it from the cel table. A linkedid is
+    deleted once the CEL watermark passes its max_cel_id.
+    """
+
+    __tablename__ = 'plugin_reports_processed_linkedid'
+
+    linkedid = Column(String(150), primary_key=True)
+    max_cel_id = Column(Integer)
+    processed_at = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        Index('plugin_reports_processed_linkedid__idx__max_cel_id', 'max_cel_id'),
+    )
+
+
+@generic_repr
+class ReportsWatermark(Base):
+    """Highest CEL id below which every CEL was processed (or given up on)."""
+
+    __tablename__ = 'plugin_reports_watermark'
+
+    name = Column(String(64), primary_key=True)
+    cel_id = Column(Integer, nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False)
+
+
+@generic_repr
+class ReportsRollupHour(Base):
+    """UTC hour of the duration rollups, built for every tenant at once.
+
+    generation is incremented, built cleared and the rollups of the hour deleted
+    when a call log of the hour is written or deleted. Rollups built from the call
+    logs of a generation are saved only if the generation did not change meanwhile.
+    """
+
+    __tablename__ = 'plugin_reports_rollup_hour'
+
+    hour = Column(DateTime(timezone=True), primary_key=True)
+    generation = Column(Integer, nullable=False)
+    built = Column(Boolean, nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False)
+
+
+@generic_repr
+class ReportsDurationRollup(Base):
+    """Talk and answer time sketches of the calls of a tenant started during a UTC hour.
+
+    sketches is {direction: {trunk: {'talk_time': sketch, 'answer_time': sketch}}},
+    each sketch being a serialized DDSketch.
+    """
+
+    __tablename__ = 'plugin_reports_duration_rollup'
+
+    hour = Column(DateTime(timezone=True), primary_key=True)
+    tenant_uuid = Column(UUIDType, primary_key=True)
+    sketches = Column(JSON, nullable=False)
+
+
+@generic_repr
+class ReportsNumberSketch(Base):
+    """Distinct and most frequent numbers of the calls of a tenant and trunk started on a UTC day.
+
+    sketches is a serialized NumberSketches, updated by the writer as call logs
+    are written. trunk is '' for calls without trunk.
+    """
+
+    __tablename__ = 'plugin_reports_number_sketch'
+
+    day = Column(Date, primary_key=True)
+    tenant_uuid = Column(UUIDType, primary_key=True)
+    trunk = Column(String(255), primary_key=True)
+    sketches = Column(JSON, nullable=False)
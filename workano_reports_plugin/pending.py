@@ -0,0 +1,115 @@
+import threading
+import time
+from collections import OrderedDict
+
+from workano_reports_plugin.metrics import pending_groups
+
+
+class _PendingGroup:
+    __slots__ = ('linkedids', 'missing', 'deadline')
+
+    def __init__(self, linkedids, missing, deadline):
+        self.linkedids = linkedids
+        self.missing = missing
+        self.deadline = deadline
+
+
+class PendingGroups:
+    """Correlated linkedids skipped because some of them were not terminated yet.
+
+    Only linkedids are kept, not CELs: a LINKEDID_END of a pending group does not
+    fetch anything until the group's last missing LINKEDID_END arrives, or until
+    `timeout` seconds passed, after which the group is generated as it is.
+
+    Linkedids of groups generated before their own LINKEDID_END was handled are
+    remembered as done for `timeout` seconds, so that event does not generate
+    the group a second time.
+    """
+
+    def __init__(self, timeout=600, max_groups=10000):
+        self._timeout = timeout
+        self._max_groups = max_groups
+        self._lock = threading.Lock()
+        # keyed by the group's linkedids, oldest (i.e. first to expire) first
+        self._groups = OrderedDict()
+        self._by_linkedid = {}
+        # linkedid -> deadline, oldest first
+        self._done = OrderedDict()
+
+    def __len__(self):
+        return len(self._groups)
+
+    def add(self, linkedids, terminated):
+        """Remember a group whose `linkedids` are not all in `terminated`."""
+        linkedids = set(linkedids)
+        with self._lock:
+            members = set(linkedids)
+            missing = linkedids - terminated
+            deadline = time.monotonic() + self._timeout
+            for linkedid in linkedids:
+                previous = self._by_linkedid.get(linkedid)
+                if previous is None:
+                    continue
+                # the group grew since it was buffered, merge both
+                members |= previous.linkedids
+                missing |= previous.missing - linkedids
+                deadline = min(deadline, previous.deadline)
+                self._remove(previous)
+            if not missing:
+                return
+            group = _PendingGroup(frozenset(members), missing, deadline)
+            for linkedid in members:
+                self._by_linkedid[linkedid] = group
+            self._groups[group.linkedids] = group
+            pending_groups.inc(outcome='buffered')
+
+    def terminate(self, linkedid):
+        """Record a LINKEDID_END and return the linkedids now ready to be generated.
+
+        Returns None while the group of `linkedid` still waits for other linkedids.
+        """
+        with self._lock:
+            if self._done.pop(linkedid, None) is not None:
+                pending_groups.inc(outcome='already_generated')
+                return None
+            group = self._by_linkedid.get(linkedid)
+            if group is None:
+                return {linkedid}
+            group.missing.discard(linkedid)
+            if group.missing:
+                return None
+            self._remove(group)
+            pending_groups.inc(outcome='completed')
+            return set(group.linkedids)
+
+    def done(self, linkedids):
+        """Remember linkedids generated before their LINKEDID_END was handled."""
+        deadline = time.monotonic() + self._timeout
+        with self._lock:
+            for linkedid in linkedids:
+                self._done[linkedid] = deadline
+
+    def pop_expired(self):
+        """Remove and return the linkedid sets of the groups that waited too long."""
+        now = time.monotonic()
+        expired = []
+        with self._lock:
+            while self._done:
+                linkedid, deadline = next(iter(self._done.items()))
+                if deadline > now and len(self._done) <= self._max_groups:
+                    break
+                del self._done[linkedid]
+            while self._groups:
+                group = next(iter(self._groups.values()))
+                if group.deadline > now and len(self._groups) <= self._max_groups:
+                    break
+                self._remove(group)
+                pending_groups.inc(outcome='expired')
+                expired.append(set(group.linkedids))
+        return expired
+
+    def _remove(self, group):
+        self._groups.pop(group.linkedids, None)
+        for linkedid in group.linkedids:
+            if self._by_linkedid.get(linkedid) is group:
+                del self._by_linkedid[linkedid]
@@ -1,9 +1,28 @@
 import logging
 
 from workano_reports_plugin.bus_consume import ReportsBusEventHandler
+from workano_reports_plugin.config import get_plugin_config
 from workano_reports_plugin.db import init_db
+from workano_reports_plugin.profiling import profiler
+from workano_reports_plugin.reconciler import GapReconciler
+from .export import build_export_service
+from .jobs import build_report_jobs_service
 from .services import build_otp_request_service
-from .resource import  ReportsResource
+from .resource import (
+    ReportsCallbacksResource,
+    ReportsConcurrencyResource,
+    ReportsDurationsResource,
+    ReportsExportResource,
+    ReportsJobItemResource,
+    ReportsJobsResource,
+    ReportsLiveCallsResource,
+    ReportsMetricsResource,
+    ReportsNumbersResource,
+    ReportsProfilingResource,
+    ReportsRepeatCallersResource,
+    ReportsResource,
+    ReportsTimeseriesResource,
+)
 logger = logging.getLogger(__name__)
 
 class Plugin:
@@ -14,14 +33,82 @@ class Plugin:
         config = dependencies['config']
         bus_consumer = dependencies['bus_consumer']
         init_db(config['db_uri'])
-        otp_request_service = build_otp_request_service(dao)
+        plugin_config = get_plugin_config(config)
+        profiler.configure(**plugin_config['profiling'])
+        otp_request_service = build_otp_request_service(dao, config)
+        report_jobs_service = build_report_jobs_service(otp_request_service, config)
+        export_service = build_export_service(config)
         bus_event_handler = ReportsBusEventHandler(config, dao)
 
         # Subscribe to bus events
         bus_event_handler.subscribe(bus_consumer)
+        reconciler = GapReconciler(
+            bus_event_handler.manager, **plugin_config['reconciler']
+        )
+        reconciler.start()
 
         api.add_resource(
             ReportsResource,
             '/reports',
             resource_class_args=(otp_request_service, config)
         )
+        api.add_resource(
+            ReportsTimeseriesResource,
+            '/reports/timeseries',
+            resource_class_args=(otp_request_service, config)
+        )
+        api.add_resource(
+            ReportsConcurrencyResource,
+            '/reports/concurrency',
+            resource_class_args=(otp_request_service, config)
+        )
+        api.add_resource(
+            ReportsCallbacksResource,
+            '/reports/callbacks',
+            resource_class_args=(otp_request_service, config)
+        )
+        api.add_resource(
+            ReportsRepeatCallersResource,
+            '/reports/repeat-callers',
+            resource_class_args=(otp_request_service, config)
+        )
+        api.add_resource(
+            ReportsDurationsResource,
+            '/reports/durations',
+            resource_class_args=(otp_request_service, config)
+        )
+        api.add_resource(
+            ReportsNumbersResource,
+            '/reports/numbers',
+            resource_class_args=(otp_request_service, config)
+        )
+        api.add_resource(
+            ReportsExportResource,
+            '/reports/export',
+            resource_class_args=(export_service, config)
+        )
+        api.add_resource(
+            ReportsMetricsResource,
+            '/reports/metrics',
+            resource_class_args=(otp_request_service, config)
+        )
+        api.add_resource(
+            ReportsLiveCallsResource,
+            '/reports/live',
+            resource_class_args=(bus_event_handler.manager.live_calls, config)
+        )
+        api.add_resource(
+            ReportsProfilingResource,
+            '/reports/profiling',
+            resource_class_args=(otp_request_service, config)
+        )
+        api.add_resource(
+            ReportsJobsResource,
+            '/reports/jobs',
+            resource_class_args=(report_jobs_service, config)
+        )
+        api.add_resource(
+            ReportsJobItemResource,
+            '/reports/jobs/<uuid:job_uuid>',
+            resource_class_args=(report_jobs_service, config)
+        )
@@ -0,0 +1,135 @@
+import logging
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# number of durations kept per entry to estimate percentiles
+RESERVOIR_SIZE = 1024
+
+
+class _Stats:
+    __slots__ = ('count', 'total', 'max', 'samples')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = []
+
+    def add(self, duration):
+        self.count += 1
+        self.total += duration
+        if duration > self.max:
+            self.max = duration
+        # reservoir sampling keeps a uniform sample of all durations
+        if len(self.samples) < RESERVOIR_SIZE:
+            self.samples.append(duration)
+        else:
+            index = random.randrange(self.count)
+            if index < RESERVOIR_SIZE:
+                self.samples[index] = duration
+
+    def percentile(self, percent):
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        index = min(int(len(ordered) * percent / 100), len(ordered) - 1)
+        return ordered[index]
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'total_seconds': self.total,
+            'mean_seconds': self.total / self.count if self.count else 0.0,
+            'p99_seconds': self.percentile(99),
+            'max_seconds': self.max,
+        }
+
+
+class InterpretorProfiler:
+    """Opt-in timing of CEL interpretation, per event type and per interpretor method.
+
+    When disabled, the dispatch in AbstractCELInterpretor only pays one attribute
+    check per CEL.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._by_event_type = {}
+        self._by_method = {}
+        self._dump_thread = None
+        self._stop = threading.Event()
+
+    def configure(self, enabled=False, dump_interval=None, top=20):
+        self.enabled = enabled
+        if dump_interval and not self._dump_thread:
+            self._dump_thread = threading.Thread(
+                target=self._dump_loop,
+                args=(dump_interval, top),
+                name='reports-profiler',
+                daemon=True,
+            )
+            self._dump_thread.start()
+
+    def reset(self):
+        with self._lock:
+            self._by_event_type.clear()
+            self._by_method.clear()
+
+    def profile(self, interpretor, eventtype, interpret_function, cel, call):
+        start = time.perf_counter()
+        try:
+            return interpret_function(cel, call)
+        finally:
+            duration = time.perf_counter() - start
+            interpretor_name = type(interpretor).__name__
+            method_name = getattr(interpret_function, '__name__', repr(interpret_function))
+            with self._lock:
+                for stats_by_key, key in (
+                    (self._by_event_type, (interpretor_name, eventtype)),
+                    (self._by_method, (interpretor_name, method_name)),
+                ):
+                    stats = stats_by_key.get(key)
+                    if stats is None:
+                        stats = stats_by_key[key] = _Stats()
+                    stats.add(duration)
+
+    def snapshot(self):
+        """Return the collected statistics, most expensive entries first."""
+        with self._lock:
+            by_event_type = [
+                dict(stats.to_dict(), interpretor=interpretor, event_type=eventtype)
+                for (interpretor, eventtype), stats in self._by_event_type.items()
+            ]
+            by_method = [
+                dict(stats.to_dict(), interpretor=interpretor, method=method)
+                for (interpretor, method), stats in self._by_method.items()
+            ]
+        by_total = lambda entry: entry['total_seconds']  # noqa: E731
+        return {
+            'enabled': self.enabled,
+            'by_event_type': sorted(by_event_type, key=by_total, reverse=True),
+            'by_method': sorted(by_method, key=by_total, reverse=True),
+        }
+
+    def _dump_loop(self, interval, top):
+        while not self._stop.wait(interval):
+            if not self.enabled:
+                continue
+            snapshot = self.snapshot()
+            for entry in snapshot['by_method'][:top]:
+                logger.info(
+                    'CEL interpretation profile: %s.%s count=%d total=%.3fs mean=%.6fs p99=%.6fs',
+                    entry['interpretor'],
+                    entry['method'],
+                    entry['count'],
+                    entry['total_seconds'],
+                    entry['mean_seconds'],
+                    entry['p99_seconds'],
+                )
+
+
+profiler = InterpretorProfiler()
@@ -9,7 +9,12 @@ from dataclasses import dataclass, field
 from datetime import datetime
 from typing import Callable, DefaultDict, Literal
 
-from .models import ReportsCallLog, ReportsCallLogParticipant
+from .models import (
+    ReportsCallLog,
+    ReportsCallLogParticipant,
+    ReportsForward,
+    ReportsTransfer,
+)
 from wazo_call_logd.exceptions import InvalidCallLogException
 from wazo_call_logd.extension_filter import DEFAULT_HIDDEN_EXTENSIONS, ExtensionFilter
 from wazo_call_logd.utils import find
@@ -17,14 +22,146 @@ from wazo_call_logd.utils import find
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+@dataclass(slots=True)
 class BridgeInfo:
     id: str
     technology: str
     channels: set[str] = field(default_factory=set)
 
 
+@dataclass(slots=True)
+class ForwardRecord:
+    cel_id: int | None
+    eventtime: datetime | None
+    num: str | None
+    context: str | None
+    name: str | None
+    channame: str | None
+
+    def to_model(self) -> ReportsForward:
+        return ReportsForward(
+            cel_id=self.cel_id,
+            event_time=self.eventtime,
+            num=self.num,
+            context=self.context,
+            name=self.name,
+            channame=self.channame,
+        )
+
+
+@dataclass(slots=True)
+class TransferRecord:
+    cel_id: int | None
+    eventtime: datetime | None
+    transfer_type: str
+    target_exten: str | None
+    context: str | None
+    transferee_channel_name: str | None
+    transferee_channel_uniqueid: str | None
+    channel2_name: str | None
+    channel2_uniqueid: str | None
+    transfer_target_channel_name: str | None
+    transfer_target_channel_uniqueid: str | None
+    bridge1_id: str | None
+    bridge2_id: str | None
+    transferee_line: str | None
+    transfer_target_line: str | None
+    channel2_line: str | None
+
+    def to_model(self) -> ReportsTransfer:
+        return ReportsTransfer(
+            cel_id=self.cel_id,
+            event_time=self.eventtime,
+            transfer_type=self.transfer_type,
+            target_exten=self.target_exten,
+            context=self.context,
+            transferee_channel_name=self.transferee_channel_name,
+            transferee_channel_uniqueid=self.transferee_channel_uniqueid,
+            channel2_name=self.channel2_name,
+            channel2_uniqueid=self.channel2_uniqueid,
+            transfer_target_channel_name=self.transfer_target_channel_name,
+            transfer_target_channel_uniqueid=self.transfer_target_channel_uniqueid,
+            bridge1_id=self.bridge1_id,
+            bridge2_id=self.bridge2_id,
+            transferee_line=self.transferee_line,
+            transfer_target_line=self.transfer_target_line,
+            channel2_line=self.channel2_line,
+        )
+
+
+@dataclass(slots=True)
+class IVRChoiceRecord:
+    id: int | str | None
+    exten: str | None
+    context: str | None
+    channame: str | None
+    eventtime: datetime | None
+
+    def to_json(self) -> dict:
+        # stored in the ivr_choices JSON column
+        return {
+            'id': self.id,
+            'exten': self.exten,
+            'context': self.context,
+            'channame': self.channame,
+            'eventtime': self.eventtime.isoformat() if self.eventtime else None,
+        }
+
+
+# shared by the call logs until one of them hides another extension
+_DEFAULT_EXTENSION_FILTER = ExtensionFilter(DEFAULT_HIDDEN_EXTENSIONS)
+
+
 class RawCallLog:
+    __slots__ = (
+        'date',
+        'date_end',
+        'source_name',
+        'source_exten',
+        'source_internal_exten',
+        'source_internal_context',
+        'source_internal_name',
+        'requested_name',
+        'requested_exten',
+        'requested_context',
+        'requested_internal_exten',
+        'requested_internal_context',
+        'requested_type',
+        'destination_name',
+        'destination_exten',
+        'destination_internal_exten',
+        'destination_internal_context',
+        'destination_line_identity',
+        'user_field',
+        'date_answer',
+        'source_line_identity',
+        'direction',
+        'raw_participants',
+        'participants_info',
+        'participants',
+        'recordings',
+        'cel_ids',
+        'conversation_id',
+        'interpret_callee_bridge_enter',
+        'interpret_caller_xivo_user_fwd',
+        'authoritative_destination_info',
+        '_tenant_uuid',
+        'pending_wait_for_mobile_peers',
+        'caller_id_by_channels',
+        'extension_filter',
+        'bridges',
+        'destination_details',
+        'was_forwarded',
+        'blocked',
+        'temp_user_exten',
+        'trunk',
+        'schedule_state',
+        'ivr_choices',
+        'forwards',
+        'transfers',
+        'original_call_log_id',
+    )
+
     def __init__(self):
         self.date: datetime | None = None
         self.date_end: datetime | None = None
@@ -62,9 +199,8 @@ class RawCallLog:
         self._tenant_uuid: str = None  # type: ignore[assignment]
         self.pending_wait_for_mobile_peers: set[str] = set()
         self.caller_id_by_channels: dict[str, tuple[str, str]] = {}
-        self.extension_filter: ExtensionFilter = ExtensionFilter(
-            DEFAULT_HIDDEN_EXTENSIONS
-        )
+        # replaced by a copy of its own by hide_extension
+        self.extension_filter: ExtensionFilter = _DEFAULT_EXTENSION_FILTER
         self.bridges: dict[str, BridgeInfo] = {}
         self.destination_details: list = []
         self.was_forwarded: bool = False
@@ -74,11 +210,11 @@ class RawCallLog:
         self.trunk: str | None = None
         self.schedule_state: dict[str, str] = {}
         # History of IVR choices detected during CEL interpretation
-        self.ivr_choices: list[dict] = []
+        self.ivr_choices: list[IVRChoiceRecord] = []
         # History of forward events (to be converted to ReportsForward rows)
-        self.forwards: list[dict] = []
+        self.forwards: list[ForwardRecord] = []
         # History of transfer events (to be converted to ReportsTransfer rows)
-        self.transfers: list[dict] = []
+        self.transfers: list[TransferRecord] = []
         self.original_call_log_id: int | None = None
 
     @property
@@ -95,6 +231,12 @@ class RawCallLog:
                 self._tenant_uuid,
             )
 
+    def hide_extension(self, exten):
+        """Filter `exten` out of this call's extensions, as the default hidden ones."""
+        if self.extension_filter is _DEFAULT_EXTENSION_FILTER:
+            self.extension_filter = ExtensionFilter(DEFAULT_HIDDEN_EXTENSIONS)
+        self.extension_filter.add_exten(exten)
+
     def to_call_log(self) -> ReportsCallLog:
         if not self.date:
             raise InvalidCallLogException('date not found')
@@ -129,79 +271,18 @@ class RawCallLog:
             conversation_id=self.conversation_id,
             blocked=self.blocked,
             schedule_state=self.schedule_state,
-            ivr_choices=self.ivr_choices if self.ivr_choices else None,
+            ivr_choices=(
+                [choice.to_json() for choice in self.ivr_choices] if self.ivr_choices else None
+            ),
             original_call_log_id=self.original_call_log_id,
         )
         result.participants = self.participants
         result.cel_ids = self.cel_ids
         result.recordings = self.recordings
-        # convert forwards dicts to ReportsForward model instances if present
-        try:
-            from .models import ReportsForward
-            from datetime import datetime as _dt
-
-            forwards_models = []
-            for f in getattr(self, 'forwards', []) or []:
-                event_time = f.get('eventtime')
-                if isinstance(event_time, str):
-                    try:
-                        # try ISO format first
-                        event_time = _dt.fromisoformat(event_time)
-                    except Exception:
-                        event_time = None
-                forwards_models.append(
-                    ReportsForward(
-                        cel_id=f.get('cel_id'),
-                        event_time=event_time,
-                        num=f.get('num'),
-                        context=f.get('context'),
-                        name=f.get('name'),
-                        channame=f.get('channame'),
-                    )
-                )
-            if forwards_models:
-                result.forwards = forwards_models
-        except Exception:
-            # best effort: don't break call log conversion if forwards conversion fails
-            logger.exception('Failed to convert forwards to model instances')
-        # convert transfers dicts to ReportsTransfer model instances if present
-        try:
-            from .models import ReportsTransfer
-            from datetime import datetime as _dt
-
-            transfers_models = []
-            for t in getattr(self, 'transfers', []) or []:
-                event_time = t.get('eventtime')
-                if isinstance(event_time, str):
-                    try:
-                        event_time = _dt.fromisoformat(event_time)
-                    except Exception:
-                        event_time = None
-                transfers_models.append(
-                    ReportsTransfer(
-                        cel_id=t.get('cel_id'),
-                        event_time=event_time,
-                        transfer_type=t.get('transfer_type'),
-                        target_exten=t.get('target_exten'),
-                        context=t.get('context'),
-                        transferee_channel_name=t.get('transferee_channel_name'),
-                        transferee_channel_uniqueid=t.get('transferee_channel_uniqueid'),
-                        channel2_name=t.get('channel2_name'),
-                        channel2_uniqueid=t.get('channel2_uniqueid'),
-                        transfer_target_channel_name=t.get('transfer_target_channel_name'),
-                        transfer_target_channel_uniqueid=t.get('transfer_target_channel_uniqueid'),
-                        bridge1_id=t.get('bridge1_id'),
-                        bridge2_id=t.get('bridge2_id'),
-                        transferee_line=t.get('transferee_line'),
-                        transfer_target_line=t.get('transfer_target_line'),
-                        channel2_line=t.get('channel2_line'),
-                    )
-                )
-            if transfers_models:
-                result.transfers = transfers_models
-        except Exception:
-            logger.exception('Failed to convert transfers to model instances')
-
+        if self.forwards:
+            result.forwards = [forward.to_model() for forward in self.forwards]
+        if self.transfers:
+            result.transfers = [transfer.to_model() for transfer in self.transfers]
         return result
 
     def insert_or_update_participants_info(
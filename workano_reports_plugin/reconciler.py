@@ -0,0 +1,139 @@
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from workano_reports_plugin.dao import (
+    advance_cel_watermark,
+    find_unreconciled_linkedids,
+    prune_processed_linkedids,
+)
+from workano_reports_plugin.metrics import reconciled_linkedids
+
+logger = logging.getLogger(__name__)
+
+
+class GapReconciler:
+    """Regenerate the calls whose LINKEDID_END never reached the bus handler.
+
+    Every `interval` seconds, the LINKEDID_END of the last `lookback` seconds
+    that have no call log are regenerated through the call log manager, oldest
+    first, at most `batch_size` per pass and `max_per_second` per second. The
+    last `grace` seconds, plus the current lag of the bus handler behind its
+    events, are left to the bus handler. Linkedids that produce no call log are
+    not retried until they leave the lookback window.
+
+    Each pass moves the CEL watermark up to the start of the lookback window,
+    which bounds the processed linkedids kept.
+
+    When it starts, the unprocessed CELs of the lookback window above the
+    watermark are generated at once, catching up with the calls terminated
+    while wazo-call-logd was down.
+    """
+
+    def __init__(
+        self,
+        manager,
+        enabled=True,
+        interval=300,
+        lookback=86400,
+        grace=120,
+        batch_size=200,
+        max_per_second=10,
+    ):
+        self.enabled = enabled
+        self._manager = manager
+        self._interval = interval
+        self._lookback = timedelta(seconds=lookback)
+        self._grace = timedelta(seconds=grace)
+        self._batch_size = batch_size
+        self._min_delay = 1.0 / max_per_second if max_per_second else 0.0
+        self._given_up = {}
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self):
+        if not self.enabled or self._thread:
+            return
+        self._thread = threading.Thread(
+            target=self._loop,
+            name='reports-reconciler',
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def catch_up(self):
+        """Generate the call logs of the unprocessed CELs of the lookback window."""
+        self._manager.generate_from_days(self._lookback / timedelta(days=1))
+
+    def run_once(self):
+        """Regenerate one batch of missed linkedids, return how many got a call log."""
+        self._manager.generate_expired_groups()
+        now = datetime.now(timezone.utc)
+        start = now - self._lookback
+        # CELs older than the lookback are given up, their processed linkedids pruned
+        watermark = advance_cel_watermark(start)
+        # a backlogged bus handler has not reached the recent LINKEDID_END yet
+        grace = self._grace + timedelta(seconds=self._manager.bus_lag)
+        # after the grace, the CELs of the linkedids processed from the bus are written
+        prune_processed_linkedids(now - grace, watermark)
+        self._given_up = {
+            linkedid: eventtime
+            for linkedid, eventtime in self._given_up.items()
+            if eventtime >= start
+        }
+        missed = find_unreconciled_linkedids(
+            start,
+            now - grace,
+            self._batch_size + len(self._given_up),
+            above_id=watermark,
+        )
+        missed = [
+            (linkedid, eventtime)
+            for linkedid, eventtime in missed
+            if linkedid not in self._given_up
+        ][:self._batch_size]
+
+        reconciled = 0
+        for linkedid, eventtime in missed:
+            if self._stop.is_set():
+                break
+            started_at = time.monotonic()
+            try:
+                call_logs = self._manager.generate_from_linked_id(linkedid)
+            except Exception:
+                reconciled_linkedids.inc(outcome='failed')
+                logger.exception('Reports: failed to reconcile linkedid "%s"', linkedid)
+                self._given_up[linkedid] = eventtime
+            else:
+                if call_logs.new_call_logs:
+                    reconciled_linkedids.inc(outcome='processed')
+                    reconciled += 1
+                else:
+                    reconciled_linkedids.inc(outcome='empty')
+                    self._given_up[linkedid] = eventtime
+            # rate limit, live LINKEDID_END handling has priority
+            self._stop.wait(self._min_delay - (time.monotonic() - started_at))
+
+        if missed:
+            logger.info(
+                'Reports: reconciled %d of %d linkedids without call log', reconciled, len(missed)
+            )
+        return reconciled
+
+    def _loop(self):
+        try:
+            self.catch_up()
+        except Exception:
+            logger.exception('Reports: call log catch-up failed')
+        while not self._stop.wait(self._interval):
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception('Reports: call log reconciliation failed')
@@ -0,0 +1,94 @@
+from collections import deque
+from datetime import timedelta
+
+from workano_reports_plugin.callbacks import normalize_number
+from workano_reports_plugin.sketches import HyperLogLog
+
+# upper bounds, in seconds, of the time-to-repeat histogram
+REPEAT_HISTOGRAM_BOUNDS = (3600, 4 * 3600, 24 * 3600, 3 * 24 * 3600, 7 * 24 * 3600)
+
+
+class _RepeatStats:
+    __slots__ = ('calls', 'repeat_calls', 'callers', 'repeat_callers', 'delays')
+
+    def __init__(self, approximate, bucket_count):
+        self.calls = 0
+        self.repeat_calls = 0
+        # distinct numbers, exactly or with a sketch of bounded size
+        self.callers = HyperLogLog() if approximate else set()
+        self.repeat_callers = HyperLogLog() if approximate else set()
+        self.delays = [0] * bucket_count
+
+    def to_dict(self, bounds):
+        callers = len(self.callers)
+        repeat_callers = len(self.repeat_callers)
+        return {
+            'calls': self.calls,
+            'repeat_calls': self.repeat_calls,
+            'callers': callers,
+            'repeat_callers': repeat_callers,
+            'repeat_caller_rate': repeat_callers / callers if callers else 0.0,
+            'time_to_repeat': [
+                {'up_to': bound, 'count': count} for bound, count in zip(bounds, self.delays)
+            ],
+        }
+
+
+def count_repeat_callers(rows, window, approximate=False):
+    """Count the calls of a number following another call of it within `window` seconds.
+
+    `rows` are (date, tenant_uuid, direction, trunk, number) ordered by date, as
+    returned by `iter_caller_numbers`, and are read once. The last call of each
+    number is kept until `window` passed, but distinct callers are counted in
+    sets of every number of the range. Repeats are detected per direction and
+    per direction and trunk, a call of a number on another trunk is a repeat of
+    the direction only. With `approximate`, distinct callers are counted with
+    HyperLogLog sketches instead of sets, so memory depends on the numbers seen
+    during a window rather than on the range.
+    """
+    bounds = [bound for bound in REPEAT_HISTOGRAM_BOUNDS if bound < window] + [window]
+    window = timedelta(seconds=window)
+    stats = {}
+    # (direction, trunk, tenant, number) -> date of the last call
+    last_calls = {}
+    # (date, key) of the calls, oldest first, to expire them
+    expiries = deque()
+
+    for date, tenant_uuid, direction, trunk, number in rows:
+        while expiries and expiries[0][0] + window < date:
+            expired_date, key = expiries.popleft()
+            if last_calls.get(key) == expired_date:
+                del last_calls[key]
+
+        number = normalize_number(number)
+        if number is None:
+            continue
+        caller = (tenant_uuid, number)
+        for group in ((direction, None), (direction, trunk or 'unknown')):
+            group_stats = stats.get(group)
+            if group_stats is None:
+                group_stats = stats[group] = _RepeatStats(approximate, len(bounds))
+            group_stats.calls += 1
+            group_stats.callers.add(caller)
+            key = group + caller
+            previous = last_calls.get(key)
+            if previous is not None:
+                group_stats.repeat_calls += 1
+                group_stats.repeat_callers.add(caller)
+                delay = (date - previous).total_seconds()
+                index = 0
+                while index < len(bounds) - 1 and delay > bounds[index]:
+                    index += 1
+                group_stats.delays[index] += 1
+            last_calls[key] = date
+            expiries.append((date, key))
+
+    by_direction = {}
+    for (direction, trunk), group_stats in stats.items():
+        if trunk is None:
+            by_direction[direction] = group_stats.to_dict(bounds)
+    for (direction, trunk), group_stats in stats.items():
+        if trunk is not None:
+            by_trunk = by_direction[direction].setdefault('by_trunk', {})
+            by_trunk[trunk] = group_stats.to_dict(bounds)
+    return by_direction
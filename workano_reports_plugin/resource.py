@@ -3,13 +3,29 @@ from functools import wraps
 
 
 # from ari.exceptions import ARIException, ARIHTTPError
+from .exceptions import LiveCallsDisabled
+from .export import ExportService
+from .jobs import ReportJobsService
+from .metrics import REGISTRY
+from .profiling import profiler
 from .services import WorkanoReportsService
-from .schema import ReportsRequestSchema
+from .streaming import LiveCalls
+from .schema import (
+    ProfilingSchema,
+    ReportsCallbacksRequestSchema,
+    ReportsConcurrencyRequestSchema,
+    ReportsDurationsRequestSchema,
+    ReportsExportRequestSchema,
+    ReportsNumbersRequestSchema,
+    ReportsRepeatCallersRequestSchema,
+    ReportsRequestSchema,
+    ReportsTimeseriesRequestSchema,
+)
 from xivo import mallow_helpers, rest_api_helpers
 from xivo.flask.auth_verifier import AuthVerifierFlask
 
 
-from flask import url_for, request
+from flask import Response, url_for, request
 from wazo_confd.auth import required_acl
 # from wazo_calld.http import  Resource
 from flask_restful import Resource
@@ -58,3 +74,189 @@ class ReportsResource(ErrorCatchingResource):
         tenant = request.args.get('tenant')
         result = self.service.get_reports(params, config=self.config, tenant=tenant)
         return result, 200
+
+
+class ReportsTimeseriesResource(ErrorCatchingResource):
+    def __init__(self, service, config):
+        super().__init__()
+        self.service: WorkanoReportsService = service
+        self.schema = ReportsTimeseriesRequestSchema()
+        self.config = config
+
+    @required_acl('workano.reports.read')
+    def get(self):
+        params = self.schema.load(request.args)
+
+        tenant = request.args.get('tenant')
+        result = self.service.get_timeseries(params, tenant=tenant)
+        return result, 200
+
+
+class ReportsConcurrencyResource(ErrorCatchingResource):
+    def __init__(self, service, config):
+        super().__init__()
+        self.service: WorkanoReportsService = service
+        self.schema = ReportsConcurrencyRequestSchema()
+        self.config = config
+
+    @required_acl('workano.reports.read')
+    def get(self):
+        params = self.schema.load(request.args)
+
+        tenant = request.args.get('tenant')
+        result = self.service.get_concurrency(params, tenant=tenant)
+        return result, 200
+
+
+class ReportsCallbacksResource(ErrorCatchingResource):
+    def __init__(self, service, config):
+        super().__init__()
+        self.service: WorkanoReportsService = service
+        self.schema = ReportsCallbacksRequestSchema()
+        self.config = config
+
+    @required_acl('workano.reports.read')
+    def get(self):
+        params = self.schema.load(request.args)
+
+        tenant = request.args.get('tenant')
+        result = self.service.get_callbacks(params, tenant=tenant)
+        return result, 200
+
+
+class ReportsRepeatCallersResource(ErrorCatchingResource):
+    def __init__(self, service, config):
+        super().__init__()
+        self.service: WorkanoReportsService = service
+        self.schema = ReportsRepeatCallersRequestSchema()
+        self.config = config
+
+    @required_acl('workano.reports.read')
+    def get(self):
+        params = self.schema.load(request.args)
+
+        tenant = request.args.get('tenant')
+        result = self.service.get_repeat_callers(params, tenant=tenant)
+        return result, 200
+
+
+class ReportsDurationsResource(ErrorCatchingResource):
+    def __init__(self, service, config):
+        super().__init__()
+        self.service: WorkanoReportsService = service
+        self.schema = ReportsDurationsRequestSchema()
+        self.config = config
+
+    @required_acl('workano.reports.read')
+    def get(self):
+        params = self.schema.load(request.args)
+
+        tenant = request.args.get('tenant')
+        result = self.service.get_durations(params, tenant=tenant)
+        return result, 200
+
+
+class ReportsNumbersResource(ErrorCatchingResource):
+    def __init__(self, service, config):
+        super().__init__()
+        self.service: WorkanoReportsService = service
+        self.schema = ReportsNumbersRequestSchema()
+        self.config = config
+
+    @required_acl('workano.reports.read')
+    def get(self):
+        params = self.schema.load(request.args)
+
+        tenant = request.args.get('tenant')
+        result = self.service.get_numbers(params, tenant=tenant)
+        return result, 200
+
+
+class ReportsExportResource(ErrorCatchingResource):
+    def __init__(self, service, config):
+        super().__init__()
+        self.service: ExportService = service
+        self.schema = ReportsExportRequestSchema()
+        self.config = config
+
+    @required_acl('workano.reports.export.read')
+    def get(self):
+        return self.service.status(), 200
+
+    @required_acl('workano.reports.export.create')
+    def post(self):
+        body = self.schema.load(request.get_json(force=True, silent=True) or {})
+        return self.service.start(since=body.get('since')), 202
+
+
+class ReportsMetricsResource(ErrorCatchingResource):
+    def __init__(self, service, config):
+        super().__init__()
+        self.config = config
+
+    @required_acl('workano.reports.metrics.read')
+    def get(self):
+        return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+
+class ReportsProfilingResource(ErrorCatchingResource):
+    def __init__(self, service, config):
+        super().__init__()
+        self.schema = ProfilingSchema()
+        self.config = config
+
+    @required_acl('workano.reports.profiling.read')
+    def get(self):
+        return profiler.snapshot(), 200
+
+    @required_acl('workano.reports.profiling.update')
+    def put(self):
+        body = self.schema.load(request.get_json(force=True, silent=True) or {})
+        if body['reset']:
+            profiler.reset()
+        profiler.enabled = body['enabled']
+        return profiler.snapshot(), 200
+
+
+class ReportsJobsResource(ErrorCatchingResource):
+    def __init__(self, service, config):
+        super().__init__()
+        self.service: ReportJobsService = service
+        self.schema = ReportsRequestSchema()
+        self.config = config
+
+    @required_acl('workano.reports.jobs.create')
+    def post(self):
+        params = self.schema.load(request.get_json(force=True, silent=True) or {})
+
+        tenant = request.args.get('tenant')
+        job = self.service.create(params, tenant=tenant)
+        return job, 202
+
+
+class ReportsJobItemResource(ErrorCatchingResource):
+    def __init__(self, service, config):
+        super().__init__()
+        self.service: ReportJobsService = service
+        self.config = config
+
+    @required_acl('workano.reports.jobs.read')
+    def get(self, job_uuid):
+        tenant = request.args.get('tenant')
+        job = self.service.get(job_uuid, tenant=tenant)
+        return job, 200
+
+
+class ReportsLiveCallsResource(ErrorCatchingResource):
+    def __init__(self, service, config):
+        super().__init__()
+        self.service: LiveCalls | None = service
+        self.config = config
+
+    @required_acl('workano.reports.live.read')
+    def get(self):
+        if self.service is None:
+            raise LiveCallsDisabled()
+        tenant = request.args.get('tenant')
+        items = self.service.snapshot(tenant_uuid=tenant)
+        return {'items': items, 'total': len(items)}, 200
@@ -1,10 +1,85 @@
 import os
+from zoneinfo import ZoneInfo
+
 from marshmallow import fields, validates, ValidationError, validates_schema
 from wazo_confd.helpers.mallow import BaseSchema
 from xivo.mallow.validate import Length, OneOf, Range, Regexp
 
+from .dao import REPORT_DIMENSIONS, REPORT_GROUPING_PRESETS
+
+
+def _validate_group_by(value):
+    if value in REPORT_GROUPING_PRESETS:
+        return
+    dimensions = [dimension.strip() for dimension in value.split(',')]
+    unknown = [dimension for dimension in dimensions if dimension not in REPORT_DIMENSIONS]
+    if unknown:
+        raise ValidationError(
+            f'unknown dimensions {unknown}, expected a preset {list(REPORT_GROUPING_PRESETS)} '
+            f'or a comma separated list of {list(REPORT_DIMENSIONS)}'
+        )
+    if len(set(dimensions)) != len(dimensions):
+        raise ValidationError('duplicated dimensions')
+
+
 class ReportsRequestSchema(BaseSchema):
     # External query param names: 'from' and 'until' but keep internal keys start_time/end_time
     start_time = fields.String(data_key='from', allow_none=True)
     end_time = fields.String(data_key='until', allow_none=True)
-    schedule_id = fields.Integer(allow_none=True)
\ No newline at end of file
+    schedule_id = fields.Integer(allow_none=True)
+    group_by = fields.String(allow_none=True, validate=_validate_group_by)
+    # estimate the counters from a sample of `sample` percent of the call logs
+    approximate = fields.Boolean(missing=False)
+    sample = fields.Float(allow_none=True, validate=Range(min=0.01, max=100))
+
+
+def _validate_timezone(value):
+    try:
+        ZoneInfo(value)
+    except Exception:
+        raise ValidationError(f'unknown timezone: {value}')
+
+
+class ProfilingSchema(BaseSchema):
+    enabled = fields.Boolean(required=True)
+    reset = fields.Boolean(missing=False)
+
+
+class ReportsTimeseriesRequestSchema(BaseSchema):
+    start_time = fields.String(data_key='from', allow_none=True)
+    end_time = fields.String(data_key='until', allow_none=True)
+    bucket = fields.String(missing='day', validate=OneOf(['hour', 'day', 'week', 'month']))
+    timezone = fields.String(missing='UTC', validate=_validate_timezone)
+
+
+class ReportsConcurrencyRequestSchema(ReportsTimeseriesRequestSchema):
+    start_time = fields.String(data_key='from', required=True)
+
+
+class ReportsCallbacksRequestSchema(BaseSchema):
+    start_time = fields.String(data_key='from', required=True)
+    end_time = fields.String(data_key='until', allow_none=True)
+    window = fields.Integer(missing=86400, validate=Range(min=60, max=7 * 86400))
+
+
+class ReportsRepeatCallersRequestSchema(BaseSchema):
+    start_time = fields.String(data_key='from', required=True)
+    end_time = fields.String(data_key='until', allow_none=True)
+    window = fields.Integer(missing=86400, validate=Range(min=60, max=30 * 86400))
+    approximate = fields.Boolean(missing=False)
+
+
+class ReportsDurationsRequestSchema(BaseSchema):
+    start_time = fields.String(data_key='from', required=True)
+    end_time = fields.String(data_key='until', allow_none=True)
+
+
+class ReportsNumbersRequestSchema(BaseSchema):
+    start_time = fields.String(data_key='from', required=True)
+    end_time = fields.String(data_key='until', allow_none=True)
+    top = fields.Integer(missing=10, validate=Range(min=1, max=100))
+
+
+class ReportsExportRequestSchema(BaseSchema):
+    # first day to export again, the high-water mark is kept otherwise
+    since = fields.Date(allow_none=True)
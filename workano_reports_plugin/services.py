@@ -1,3 +1,4 @@
+import math
 import os
 import re
 import traceback
@@ -6,7 +7,7 @@ from datetime import datetime
 from threading import Thread
 import uuid
 import requests
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from marshmallow import ValidationError
 from wazo_calld_client import Client as CalldClient
 from wazo_auth_client import Client as AuthClient
@@ -25,6 +26,35 @@ from xivo_dao.alchemy.cel import CEL
 from xivo_dao.alchemy.schedule import Schedule
 from xivo_dao.alchemy.trunkfeatures import TrunkFeatures
 from xivo_dao.alchemy.endpoint_sip import EndpointSIP
+
+from workano_reports_plugin.config import get_plugin_config
+from workano_reports_plugin.dao import (
+    REPORT_GROUPING_PRESETS,
+    count_call_logs_by_bucket,
+    count_call_logs_by_grouping_sets,
+    iter_callback_candidates,
+    find_duration_rollups,
+    find_number_sketches,
+    find_rollup_generations,
+    iter_call_durations,
+    iter_caller_numbers,
+    iter_trunk_call_intervals,
+    rollup_hour,
+    save_duration_rollups,
+)
+from workano_reports_plugin.callbacks import match_callbacks
+from workano_reports_plugin.columnar_cache import (
+    CACHE_DIMENSIONS,
+    build_columnar_cache,
+    merge_groups,
+)
+from workano_reports_plugin.durations import DurationStats
+from workano_reports_plugin.exceptions import NumberSketchesDisabled
+from workano_reports_plugin.number_sketches import NumberSketches
+from workano_reports_plugin.repeat import count_repeat_callers
+from workano_reports_plugin.concurrency import sweep_concurrency
+from workano_reports_plugin.singleflight import SingleFlight, TenantAdmission
+from workano_reports_plugin import vectorized_reports
 try:
     from dateutil import parser as _dateutil_parser
 except Exception:
@@ -72,27 +102,198 @@ def _parse_time_hhmm(s):
         return None
 
 
+def _get_timezone(tzname):
+    if ZoneInfo:
+        return ZoneInfo(tzname)
+    if _dateutil_tz:
+        return _dateutil_tz.gettz(tzname)
+    return None
+
+
+def _truncate_to_bucket(dt, bucket):
+    """Truncate a naive local datetime like PostgreSQL date_trunc does."""
+    if bucket == 'hour':
+        return dt.replace(minute=0, second=0, microsecond=0)
+    day = dt.replace(hour=0, minute=0, second=0, microsecond=0)
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    if bucket == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def _next_bucket(dt, bucket):
+    if bucket == 'hour':
+        return dt + timedelta(hours=1)
+    if bucket == 'week':
+        return dt + timedelta(days=7)
+    if bucket == 'month':
+        if dt.month == 12:
+            return dt.replace(year=dt.year + 1, month=1)
+        return dt.replace(month=dt.month + 1)
+    return dt + timedelta(days=1)
+
+
+def _exists_in_timezone(dt, tz):
+    """Return False for local times skipped by a DST transition."""
+    roundtrip = dt.replace(tzinfo=tz).astimezone(timezone.utc).astimezone(tz)
+    return roundtrip.replace(tzinfo=None) == dt
+
+
+def _empty_counters():
+    return {'working_hours': 0, 'outside_working_hours': 0, 'total': 0}
+
+
+def _empty_timeseries_item():
+    item = _empty_counters()
+    item['by_direction'] = {
+        'inbound': _empty_counters(),
+        'outbound': _empty_counters(),
+        'internal': _empty_counters(),
+    }
+    item['by_trunk'] = {}
+    return item
+
+
+def _group_key(value):
+    return 'unknown' if value is None else str(value)
+
+
+def _group_counters(group):
+    counters = {
+        'working_hours': group['working_hours'],
+        'outside_working_hours': group['outside_working_hours'],
+        'total': group['total'],
+    }
+    if 'confidence_intervals' in group:
+        counters['confidence_intervals'] = group['confidence_intervals']
+    return counters
+
+
+def _sample_percent(params):
+    """Return the percentage of call logs an approximate report reads, None for exact reports."""
+    if params.get('sample'):
+        return params['sample']
+    if params.get('approximate'):
+        return DEFAULT_SAMPLE_PERCENT
+    return None
+
+
+def _scale_sampled_group(group, fraction):
+    """Scale the counters of a sample up to the whole table, with their confidence intervals.
+
+    Pages are sampled, each with probability `fraction`: a counter of `count`
+    sampled rows estimates count / fraction rows, with a standard error of
+    sqrt((1 - fraction) * sum of the squared counters of the sampled pages) / fraction,
+    so rows of a page are not assumed independent. A zero counter gets the exact
+    Poisson upper bound of zero sampled rows instead of an empty interval.
+    """
+    scaled = dict(group, confidence_intervals={})
+    squares = scaled.pop('squares')
+    for name in ('working_hours', 'outside_working_hours', 'total'):
+        count = group[name]
+        estimate = count / fraction
+        if count:
+            margin = SAMPLE_Z_SCORE * math.sqrt((1 - fraction) * squares[name]) / fraction
+        else:
+            margin = -math.log((1 - SAMPLE_CONFIDENCE) / 2) * (1 - fraction) / fraction
+        scaled[name] = int(round(estimate))
+        scaled['confidence_intervals'][name] = [
+            int(math.floor(max(estimate - margin, count))),
+            int(math.ceil(estimate + margin)),
+        ]
+    return scaled
+
+
+def _default_report_from_groups(groups):
+    """Build the nested total/by_direction/by_trunk shape of the CEL based report."""
+    def direction_entry(direction):
+        entry = result['by_direction'].get(direction)
+        if entry is None:
+            entry = result['by_direction'][direction] = dict(_empty_counters(), by_trunk={})
+        return entry
+
+    def trunk_entry(trunk):
+        entry = result['by_trunk'].get(trunk)
+        if entry is None:
+            entry = result['by_trunk'][trunk] = {
+                'total': _empty_counters(),
+                'by_direction': {
+                    'inbound': _empty_counters(),
+                    'outbound': _empty_counters(),
+                    'internal': _empty_counters(),
+                },
+            }
+        return entry
+
+    result = {'total': dict(_empty_counters(), by_trunk={}), 'by_direction': {}, 'by_trunk': {}}
+    for direction in ('inbound', 'outbound', 'internal'):
+        direction_entry(direction)
+
+    for group in groups:
+        grouping_set = group['grouping_set']
+        direction = group['values'].get('direction')
+        trunk = group['values'].get('trunk')
+        counters = _group_counters(group)
+        if not grouping_set:
+            result['total'].update(counters)
+        elif grouping_set == ('direction',):
+            direction_entry(direction).update(counters)
+        elif not trunk:
+            # calls without trunk are left out of the by_trunk breakdowns
+            continue
+        elif grouping_set == ('trunk',):
+            result['total']['by_trunk'][trunk] = counters
+            trunk_entry(trunk)['total'] = dict(counters)
+        else:
+            direction_entry(direction)['by_trunk'][trunk] = counters
+            trunk_entry(trunk)['by_direction'][direction] = dict(counters)
+    return result
+
+
+def _nested_report_from_groups(dimensions, groups):
+    """Nest each rollup level under by_<dimension> keys of its parent level."""
+    result = dict(_empty_counters(), group_by=list(dimensions))
+    for group in groups:
+        node = result
+        for name in group['grouping_set']:
+            node = node.setdefault(f'by_{name}', {}).setdefault(
+                _group_key(group['values'][name]), {}
+            )
+        node.update(_group_counters(group))
+    return result
+
+
+def _period_timezone(tzname):
+    """Return the time zone a period is evaluated in, None to keep the datetime's own."""
+    if not tzname:
+        return None
+    try:
+        if ZoneInfo:
+            return ZoneInfo(tzname)
+        if _dateutil_tz:
+            return _dateutil_tz.gettz(tzname)
+    except Exception:
+        pass
+    return None
+
+
+def _period_hours(period):
+    start_s = period.get('hours_start')
+    end_s = period.get('hours_end')
+    start_t = _parse_time_hhmm(start_s) if isinstance(start_s, str) else _parse_time_hhmm(str(start_s))
+    end_t = _parse_time_hhmm(end_s) if isinstance(end_s, str) else _parse_time_hhmm(str(end_s))
+    return start_t, end_t
+
+
 def _is_dt_in_period(dt_obj, period):
     """Return True if dt_obj (aware datetime) falls into period.
     period keys: hours_start, hours_end, week_days (list of 1-7), month_days, months, timezone
     """
-    tzname = period.get('timezone')
     # convert datetime to period timezone if provided
+    tz = _period_timezone(period.get('timezone'))
     try:
-        if tzname:
-            if ZoneInfo:
-                tz = ZoneInfo(tzname)
-                dt_local = dt_obj.astimezone(tz)
-            elif _dateutil_tz:
-                tz = _dateutil_tz.gettz(tzname)
-                if tz:
-                    dt_local = dt_obj.astimezone(tz)
-                else:
-                    dt_local = dt_obj
-            else:
-                dt_local = dt_obj
-        else:
-            dt_local = dt_obj
+        dt_local = dt_obj.astimezone(tz) if tz else dt_obj
     except Exception:
         dt_local = dt_obj
 
@@ -111,10 +312,7 @@ def _is_dt_in_period(dt_obj, period):
         return False
 
     # compare times
-    start_s = period.get('hours_start')
-    end_s = period.get('hours_end')
-    start_t = _parse_time_hhmm(start_s) if isinstance(start_s, str) else _parse_time_hhmm(str(start_s))
-    end_t = _parse_time_hhmm(end_s) if isinstance(end_s, str) else _parse_time_hhmm(str(end_s))
+    start_t, end_t = _period_hours(period)
     if not start_t or not end_t:
         return False
 
@@ -129,20 +327,75 @@ def _is_dt_in_period(dt_obj, period):
     return False
 
 
+def _compile_schedule_periods(schedule_periods):
+    """Prepare schedule periods for the numpy engine, None when calls are never within working hours.
+
+    Periods without valid hours are left out, as _is_dt_in_period never matches them.
+    """
+    if not schedule_periods:
+        return None
+    compiled = {}
+    for name in ('open_periods', 'exceptional_periods'):
+        compiled[name] = []
+        for period in schedule_periods.get(name, []):
+            try:
+                start_t, end_t = _period_hours(period)
+            except Exception:
+                continue
+            if not start_t or not end_t:
+                continue
+            compiled[name].append(
+                {
+                    'timezone': _period_timezone(period.get('timezone')),
+                    'months': set(period.get('months') or []),
+                    'month_days': set(period.get('month_days') or []),
+                    'week_days': set(period.get('week_days') or []),
+                    'start': (start_t.hour * 3600 + start_t.minute * 60) * 10**6,
+                    'end': (end_t.hour * 3600 + end_t.minute * 60) * 10**6,
+                }
+            )
+    return compiled
+
+
 logger = logging.getLogger(__name__)
 UPLOAD_FOLDER = '/var/lib/wazo/sounds/tenants'  # Make sure this directory exists and is writable
 TMP_UPLOAD_FOLDER = '/var/lib/wazo/sounds/tmp'  # Make sure this directory exists and is writable
 TTS_UPLOAD_FOLDER = '/var/lib/wazo/sounds/tts'  # Make sure this directory exists and is writable
+# upper bound on the number of zero-filled buckets returned by a timeseries
+MAX_TIMESERIES_BUCKETS = 10000
+# consecutive hours of duration rollups built from one pass over the call logs
+MAX_ROLLUP_BUILD_HOURS = 24
+# percentage of the call log table read by approximate reports without `sample`
+DEFAULT_SAMPLE_PERCENT = 1.0
+# confidence level of the intervals of approximate reports and its two-sided z-score
+SAMPLE_CONFIDENCE = 0.95
+SAMPLE_Z_SCORE = 1.96
+# number of CEL rows scanned between two progress notifications
+PROGRESS_INTERVAL = 10000
 
 
-def build_otp_request_service(dao):
-    return WorkanoReportsService(dao)
+def build_otp_request_service(dao, config=None):
+    return WorkanoReportsService(dao, config)
 
 
 class WorkanoReportsService:
 
-    def __init__(self, dao):
+    def __init__(self, dao, config=None):
         self.dao = dao
+        plugin_config = get_plugin_config(config)
+        reports_config = plugin_config['reports']
+        self._rollup_delay = timedelta(seconds=plugin_config['rollups']['delay'])
+        self._number_sketches = plugin_config['number_sketches']
+        self._columnar_cache = build_columnar_cache(plugin_config['columnar_cache'])
+        self._report_engine = reports_config['engine']
+        if self._report_engine == 'numpy' and vectorized_reports.np is None:
+            logger.warning('the numpy report engine requires numpy, using the python engine')
+            self._report_engine = 'python'
+        self._single_flight = SingleFlight()
+        self._admission = TenantAdmission(
+            reports_config['max_concurrent_per_tenant'],
+            reports_config['admission_timeout'],
+        )
         super().__init__()
 
     def _parse_time(self, tstr):
@@ -265,11 +518,458 @@ class WorkanoReportsService:
         except Exception:
             return None
 
-    def get_reports(self, params, config=None, tenant=None):
+    def get_timeseries(self, params, tenant=None):
+        """
+        Count calls per hour/day/week/month bucket of the requested timezone.
+        - computed with one GROUP BY query over plugin_reports_call_log
+        - a call is within working hours when its schedule state is 'opened'
+        - buckets without calls are filled with zero counters
+        """
+        bucket = params.get('bucket') or 'day'
+        tzname = params.get('timezone') or 'UTC'
+        tz = _get_timezone(tzname)
+        start_time = _parse_iso_datetime(params.get('start_time'))
+        end_time = _parse_iso_datetime(params.get('end_time')) or datetime.now(timezone.utc)
+        # naive bounds are local times of the requested timezone
+        if start_time and not start_time.tzinfo:
+            start_time = start_time.replace(tzinfo=tz)
+        if not end_time.tzinfo:
+            end_time = end_time.replace(tzinfo=tz)
+
+        rows = count_call_logs_by_bucket(
+            bucket, tzname, start=start_time, end=end_time, tenant_uuid=tenant
+        )
+
+        items = {}
+        for bucket_start, direction, trunk, state, count in rows:
+            item = items.get(bucket_start)
+            if item is None:
+                item = items[bucket_start] = _empty_timeseries_item()
+            counters = [item, item['by_direction'].setdefault(direction, _empty_counters())]
+            if trunk:
+                counters.append(item['by_trunk'].setdefault(trunk, _empty_counters()))
+            key = 'working_hours' if state == 'opened' else 'outside_working_hours'
+            for counter in counters:
+                counter[key] += count
+                counter['total'] += count
+
+        # zero-fill: walk every local bucket between the bounds
+        if start_time:
+            current = start_time.astimezone(tz).replace(tzinfo=None)
+        elif items:
+            current = min(items)
+        else:
+            current = None
+        last = end_time.astimezone(tz).replace(tzinfo=None)
+
+        bucket_starts = set(items)
+        if current is not None:
+            current = _truncate_to_bucket(current, bucket)
+            while current < last:
+                if _exists_in_timezone(current, tz):
+                    bucket_starts.add(current)
+                if len(bucket_starts) > MAX_TIMESERIES_BUCKETS:
+                    raise ValidationError(
+                        f'too many {bucket} buckets, max is {MAX_TIMESERIES_BUCKETS}',
+                        field_name='bucket',
+                    )
+                current = _next_bucket(current, bucket)
+
+        result = []
+        for bucket_start in sorted(bucket_starts):
+            item = items.get(bucket_start) or _empty_timeseries_item()
+            item['bucket_start'] = bucket_start.replace(tzinfo=tz).isoformat()
+            result.append(item)
+
+        return {'bucket': bucket, 'timezone': tzname, 'items': result}
+
+    def get_concurrency(self, params, tenant=None):
+        """
+        Maximum and average number of simultaneous calls per trunk and
+        hour/day/week/month bucket of the requested timezone.
+        - the calls of the period are streamed by date and swept once, keeping
+          only the end of the calls in progress
+        - the first and last buckets are cut at the requested bounds, averages
+          are over the time of the bucket within them
+        - computations are admitted like reports
+        """
+        bucket = params.get('bucket') or 'day'
+        tzname = params.get('timezone') or 'UTC'
+        tz = _get_timezone(tzname)
+        start_time = _parse_iso_datetime(params.get('start_time'))
+        end_time = _parse_iso_datetime(params.get('end_time')) or datetime.now(timezone.utc)
+        if start_time is None:
+            raise ValidationError('invalid date', field_name='from')
+        # naive bounds are local times of the requested timezone
+        if not start_time.tzinfo:
+            start_time = start_time.replace(tzinfo=tz)
+        if not end_time.tzinfo:
+            end_time = end_time.replace(tzinfo=tz)
+        if start_time >= end_time:
+            raise ValidationError('must be before until', field_name='from')
+
+        boundaries = [start_time.astimezone(timezone.utc)]
+        local_start = start_time.astimezone(tz).replace(tzinfo=None)
+        current = _next_bucket(_truncate_to_bucket(local_start, bucket), bucket)
+        while True:
+            if _exists_in_timezone(current, tz):
+                boundary = current.replace(tzinfo=tz).astimezone(timezone.utc)
+                if boundary >= end_time:
+                    break
+                boundaries.append(boundary)
+                if len(boundaries) > MAX_TIMESERIES_BUCKETS:
+                    raise ValidationError(
+                        f'too many {bucket} buckets, max is {MAX_TIMESERIES_BUCKETS}',
+                        field_name='bucket',
+                    )
+            current = _next_bucket(current, bucket)
+        boundaries.append(end_time.astimezone(timezone.utc))
+
+        with self._admission.admit(tenant):
+            intervals = iter_trunk_call_intervals(start_time, end_time, tenant_uuid=tenant)
+            by_bucket = sweep_concurrency(intervals, boundaries)
+
+        items = [
+            {'bucket_start': bucket_start.astimezone(tz).isoformat(), 'by_trunk': by_trunk}
+            for bucket_start, by_trunk in zip(boundaries, by_bucket)
+        ]
+        return {'bucket': bucket, 'timezone': tzname, 'items': items}
+
+    def get_callbacks(self, params, tenant=None):
+        """
+        Rate and delay at which missed inbound calls were called back.
+        - a missed inbound call is called back by the first outbound call to its
+          caller number within `window` seconds
+        - the calls from `from` to `until` + window are streamed by date and
+          joined in one pass
+        - computations are admitted like reports
+        """
+        window = params['window']
+        start_time = _parse_iso_datetime(params.get('start_time'))
+        end_time = _parse_iso_datetime(params.get('end_time')) or datetime.now(timezone.utc)
+        if start_time is None:
+            raise ValidationError('invalid date', field_name='from')
+        if start_time.tzinfo is None:
+            start_time = start_time.replace(tzinfo=timezone.utc)
+        if end_time.tzinfo is None:
+            end_time = end_time.replace(tzinfo=timezone.utc)
+        if start_time >= end_time:
+            raise ValidationError('must be before until', field_name='from')
+
+        with self._admission.admit(tenant):
+            rows = iter_callback_candidates(
+                start_time, end_time + timedelta(seconds=window), tenant_uuid=tenant
+            )
+            result = match_callbacks(rows, end_time, window)
+        result['window'] = window
+        return result
+
+    def get_repeat_callers(self, params, tenant=None):
+        """
+        Calls and callers calling again within `window` seconds, per direction and trunk.
+        - the calls of the period are streamed by date and scanned once, keeping
+          the last call of each number until the window passed
+        - distinct callers are kept in sets over the whole range; with
+          `approximate`, they are estimated with HyperLogLog sketches instead,
+          which bounds the memory of long ranges
+        - computations are admitted like reports
+        """
+        window = params['window']
+        start_time = _parse_iso_datetime(params.get('start_time'))
+        end_time = _parse_iso_datetime(params.get('end_time')) or datetime.now(timezone.utc)
+        if start_time is None:
+            raise ValidationError('invalid date', field_name='from')
+        if start_time.tzinfo is None:
+            start_time = start_time.replace(tzinfo=timezone.utc)
+        if end_time.tzinfo is None:
+            end_time = end_time.replace(tzinfo=timezone.utc)
+        if start_time >= end_time:
+            raise ValidationError('must be before until', field_name='from')
+
+        with self._admission.admit(tenant):
+            rows = iter_caller_numbers(start_time, end_time, tenant_uuid=tenant)
+            by_direction = count_repeat_callers(rows, window, approximate=params['approximate'])
+        return {
+            'window': window,
+            'approximate': params['approximate'],
+            'by_direction': by_direction,
+        }
+
+    def get_durations(self, params, tenant=None):
+        """
+        Average, p50, p90 and p99 of talk time and time to answer per direction and trunk.
+        - quantiles come from mergeable sketches (DDSketch, 1% relative accuracy)
+        - whole UTC hours ended more than `rollups.delay` seconds ago are read from
+          hourly rollups, built once from the call logs of every tenant and rebuilt
+          when a call log of the hour is written again
+        - the rest of the range, and the hours whose rollups were invalidated while
+          they were built, are read from the call logs in streaming passes
+        """
+        start_time = _parse_iso_datetime(params.get('start_time'))
+        end_time = _parse_iso_datetime(params.get('end_time')) or datetime.now(timezone.utc)
+        if start_time is None:
+            raise ValidationError('invalid date', field_name='from')
+        if start_time.tzinfo is None:
+            start_time = start_time.replace(tzinfo=timezone.utc)
+        if end_time.tzinfo is None:
+            end_time = end_time.replace(tzinfo=timezone.utc)
+
+        # hours of [rolled_start, rolled_end) come from the rollups
+        rolled_start = rollup_hour(start_time)
+        if rolled_start < start_time:
+            rolled_start += timedelta(hours=1)
+        rolled_end = rollup_hour(min(end_time, datetime.now(timezone.utc) - self._rollup_delay))
+        stats = DurationStats()
+        with self._admission.admit(tenant):
+            if rolled_start < rolled_end:
+                self._build_duration_rollups(rolled_start, rolled_end)
+                built = set()
+                for hour, sketches in find_duration_rollups(
+                    rolled_start, rolled_end, tenant_uuid=tenant
+                ):
+                    built.add(hour)
+                    if sketches:
+                        stats.merge_dict(sketches)
+                spans = [(start_time, rolled_start), (rolled_end, end_time)]
+                # hours written again while their rollups were built
+                hour = rolled_start
+                while hour < rolled_end:
+                    if hour not in built:
+                        spans.append((hour, hour + timedelta(hours=1)))
+                    hour += timedelta(hours=1)
+            else:
+                spans = [(start_time, end_time)]
+            for span_start, span_end in spans:
+                if span_start < span_end:
+                    rows = iter_call_durations(span_start, span_end, tenant_uuid=tenant)
+                    for _, direction, trunk, date, date_answer, date_end in rows:
+                        stats.add(direction, trunk, date, date_answer, date_end)
+        return {'by_direction': stats.report()}
+
+    def _build_duration_rollups(self, start, end):
+        """Build the rollups of the hours of [start, end) not built yet.
+
+        Consecutive missing hours are read in one pass, up to
+        MAX_ROLLUP_BUILD_HOURS at a time to bound the sketches held in memory.
+        The generations are read before the call logs: an hour written meanwhile
+        is left unbuilt.
+        """
+        generations = find_rollup_generations(start, end)
+        hour = start
+        while hour < end:
+            hours = []
+            while (
+                hour < end
+                and not generations.get(hour, (0, False))[1]
+                and len(hours) < MAX_ROLLUP_BUILD_HOURS
+            ):
+                hours.append(hour)
+                hour += timedelta(hours=1)
+            if not hours:
+                hour += timedelta(hours=1)
+                continue
+            rollups = {}
+            rows = iter_call_durations(hours[0], hours[-1] + timedelta(hours=1))
+            for tenant_uuid, direction, trunk, date, date_answer, date_end in rows:
+                key = (rollup_hour(date), tenant_uuid)
+                hour_stats = rollups.get(key)
+                if hour_stats is None:
+                    hour_stats = rollups[key] = DurationStats()
+                hour_stats.add(direction, trunk, date, date_answer, date_end)
+            save_duration_rollups(
+                {hour: generations.get(hour, (0, False))[0] for hour in hours},
+                {key: hour_stats.to_dict() for key, hour_stats in rollups.items()},
+            )
+
+    def get_numbers(self, params, tenant=None):
+        """
+        Approximate distinct and most frequent caller and destination numbers, per trunk.
+        - merged from the daily number sketches the writer keeps, so the range is
+          extended to whole UTC days
+        - distinct numbers are HyperLogLog estimates (about 1.6% error), top
+          numbers come with the error bound of their count
+        """
+        if not self._number_sketches['enabled']:
+            raise NumberSketchesDisabled()
+        start_time = _parse_iso_datetime(params.get('start_time'))
+        end_time = _parse_iso_datetime(params.get('end_time')) or datetime.now(timezone.utc)
+        if start_time is None:
+            raise ValidationError('invalid date', field_name='from')
+        if start_time.tzinfo is None:
+            start_time = start_time.replace(tzinfo=timezone.utc)
+        if end_time.tzinfo is None:
+            end_time = end_time.replace(tzinfo=timezone.utc)
+        # until is excluded, a day is only read if some of it is before until
+        start_day = start_time.astimezone(timezone.utc).date()
+        end_day = (end_time.astimezone(timezone.utc) - timedelta(microseconds=1)).date()
+
+        top = params['top']
+        capacity = self._number_sketches['capacity']
+        total = NumberSketches(capacity)
+        by_trunk = {}
+        for trunk, data in find_number_sketches(start_day, end_day, tenant_uuid=tenant):
+            sketches = NumberSketches.from_dict(data)
+            total.merge(sketches)
+            trunk = trunk or 'unknown'
+            if trunk in by_trunk:
+                by_trunk[trunk].merge(sketches)
+            else:
+                by_trunk[trunk] = sketches
+        result = total.report(top)
+        result['from'] = start_day.isoformat()
+        result['until'] = end_day.isoformat()
+        result['by_trunk'] = {trunk: sketches.report(top) for trunk, sketches in by_trunk.items()}
+        return result
+
+    def _reports_key(self, params, tenant, wait_for_admission=False):
+        """Normalize report parameters so equivalent requests share the same key.
+
+        Waiting and non-waiting callers never share a computation: a request
+        rejected by admission must not fail a job willing to wait, and the
+        other way around.
+        """
+        bounds = []
+        for name in ('start_time', 'end_time'):
+            value = params.get(name)
+            try:
+                parsed = _parse_iso_datetime(value)
+            except Exception:
+                parsed = None
+            if parsed is None:
+                bounds.append(value or None)
+            elif parsed.tzinfo:
+                bounds.append(parsed.astimezone(timezone.utc).isoformat())
+            else:
+                bounds.append(parsed.isoformat())
+        return (
+            tenant,
+            bounds[0],
+            bounds[1],
+            params.get('schedule_id'),
+            params.get('group_by'),
+            _sample_percent(params),
+            bool(wait_for_admission),
+        )
+
+    def get_reports(self, params, config=None, tenant=None, progress=None, wait_for_admission=False):
+        """
+        Concurrent calls with the same normalized parameters share one computation,
+        and at most `max_concurrent_per_tenant` computations run for a tenant.
+        Callers over the limit wait `admission_timeout` seconds (or indefinitely when
+        wait_for_admission is set) before TooManyReportsInProgress is raised.
+        """
+        def compute():
+            with self._admission.admit(tenant, wait=wait_for_admission):
+                if params.get('group_by') or _sample_percent(params):
+                    return self._compute_grouped_reports(params, tenant=tenant)
+                return self._compute_reports(params, config=config, tenant=tenant, progress=progress)
+
+        return self._single_flight.do(
+            self._reports_key(params, tenant, wait_for_admission), compute
+        )
+
+    def _compute_grouped_reports(self, params, tenant=None):
+        """
+        Count calls of plugin_reports_call_log grouped by the group_by dimensions.
+        - a preset name (e.g. 'default') returns that preset's shape
+        - a comma separated list of dimensions returns every rollup level (total,
+          first dimension, first two dimensions, ...) nested under by_<dimension> keys
+        - all levels are computed by a single GROUPING SETS query
+        - working hours come from the schedule state stored with each call and
+          schedule_id, if given, keeps only calls evaluated against that schedule
+        - with `approximate` or `sample`, counters are estimated from a sample of
+          the table pages, scaled back up and given 95% confidence intervals
+          from the variance of the counters across the sampled pages; without
+          group_by the 'default' preset is used
+        - with the columnar cache, the days it holds are counted from it and the
+          others by SQL, unless a dimension is not cached (user, destination_type)
+        """
+        group_by = params.get('group_by') or 'default'
+        sample_percent = _sample_percent(params)
+        start_time = _parse_iso_datetime(params.get('start_time'))
+        end_time = _parse_iso_datetime(params.get('end_time'))
+        # naive bounds are UTC, for SQL as for the UTC days of the columnar cache
+        if start_time is not None and start_time.tzinfo is None:
+            start_time = start_time.replace(tzinfo=timezone.utc)
+        if end_time is not None and end_time.tzinfo is None:
+            end_time = end_time.replace(tzinfo=timezone.utc)
+
+        if group_by in REPORT_GROUPING_PRESETS:
+            dimensions, grouping_sets = REPORT_GROUPING_PRESETS[group_by]
+        else:
+            dimensions = tuple(dimension.strip() for dimension in group_by.split(','))
+            grouping_sets = [dimensions[:length] for length in range(len(dimensions) + 1)]
+
+        if (
+            self._columnar_cache is not None
+            and not sample_percent
+            and start_time is not None
+            and set(dimensions) <= set(CACHE_DIMENSIONS)
+        ):
+            groups = self._count_with_columnar_cache(
+                dimensions, grouping_sets, start_time, end_time, tenant, params.get('schedule_id')
+            )
+        else:
+            groups = count_call_logs_by_grouping_sets(
+                dimensions,
+                grouping_sets,
+                start=start_time,
+                end=end_time,
+                tenant_uuid=tenant,
+                schedule_id=params.get('schedule_id'),
+                sample_percent=sample_percent,
+            )
+        if sample_percent:
+            groups = [_scale_sampled_group(group, sample_percent / 100) for group in groups]
+
+        if group_by == 'default':
+            result = _default_report_from_groups(groups)
+        else:
+            result = _nested_report_from_groups(dimensions, groups)
+        if sample_percent:
+            result['sample'] = {'percent': sample_percent, 'confidence': SAMPLE_CONFIDENCE}
+        return result
+
+    def _count_with_columnar_cache(
+        self, dimensions, grouping_sets, start_time, end_time, tenant, schedule_id
+    ):
+        if end_time is None:
+            end_time = datetime.now(timezone.utc)
+        try:
+            groups, uncached = self._columnar_cache.count_by_grouping_sets(
+                dimensions,
+                grouping_sets,
+                start_time,
+                end_time,
+                tenant_uuid=tenant,
+                schedule_id=schedule_id,
+            )
+        except Exception:
+            logger.exception('failed to read the columnar cache, counting by SQL')
+            groups, uncached = [], [(start_time, end_time)]
+        for span_start, span_end in uncached:
+            groups = merge_groups(
+                groups,
+                count_call_logs_by_grouping_sets(
+                    dimensions,
+                    grouping_sets,
+                    start=span_start,
+                    end=span_end,
+                    tenant_uuid=tenant,
+                    schedule_id=schedule_id,
+                ),
+            )
+        return groups
+
+    def _compute_reports(self, params, config=None, tenant=None, progress=None):
         """
         Generate reports based on CEL table.
         - start_time / end_time: ISO8601 string or datetime; if None, no bound.
         - config, tenant: if provided, will attempt to fetch schedules from DB and use the selected schedule to determine working periods.
+        - progress: optional callable receiving keyword progress info (phase, cels, calls).
+        - the scanned calls are counted by the Python loop below, or with the
+          `numpy` engine by vectorized_reports.aggregate_calls, which returns the
+          same result.
 
         Returns a dict with totals and breakdown by direction (inbound/outbound/internal)
         and split between calls within working hours and outside working hours.
@@ -306,7 +1006,11 @@ class WorkanoReportsService:
 
             # build calls dict keyed by linkedid/uniqueid/id
             calls = {}
+            cel_count = 0
             for cel in q:
+                cel_count += 1
+                if progress and cel_count % PROGRESS_INTERVAL == 0:
+                    progress(phase='scanning', cels=cel_count, calls=len(calls))
                 lid = cel.linkedid or cel.uniqueid or str(cel.id)
                 entry = calls.get(lid)
                 if not entry:
@@ -374,6 +1078,13 @@ class WorkanoReportsService:
                 except Exception:
                     pass
 
+            if progress:
+                progress(phase='aggregating', cels=cel_count, calls=len(calls))
+            if self._report_engine == 'numpy':
+                return vectorized_reports.aggregate_calls(
+                    calls, _compile_schedule_periods(schedule_periods)
+                )
+
             # initialize counters (same shape as before)
             result = {
                 'total': {'working_hours': 0, 'outside_working_hours': 0, 'total': 0, 'by_trunk': {}},
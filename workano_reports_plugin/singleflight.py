@@ -0,0 +1,81 @@
+import logging
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+
+from workano_reports_plugin.exceptions import TooManyReportsInProgress
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Share one in-flight computation between concurrent callers using the same key.
+
+    The first caller runs the function; callers arriving while it runs wait for it
+    and receive the same result (or exception). Nothing is cached once it completes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict = {}
+
+    def do(self, key, func):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.waiters += 1
+
+        if not leader:
+            logger.debug('Joining in-flight computation for %s', key)
+            call.done.wait()
+            if call.error:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+            if call.waiters:
+                logger.debug('Shared computation for %s with %d callers', key, call.waiters)
+        return call.result
+
+
+class TenantAdmission:
+    """Limit the number of concurrent heavy computations per tenant."""
+
+    def __init__(self, max_concurrent, timeout):
+        self._max_concurrent = max_concurrent
+        self._timeout = timeout
+        self._lock = threading.Lock()
+        self._semaphores = defaultdict(
+            lambda: threading.BoundedSemaphore(self._max_concurrent)
+        )
+
+    @contextmanager
+    def admit(self, tenant, wait=False):
+        with self._lock:
+            semaphore = self._semaphores[tenant]
+        timeout = None if wait else self._timeout
+        if not semaphore.acquire(timeout=timeout):
+            raise TooManyReportsInProgress(tenant, self._max_concurrent)
+        try:
+            yield
+        finally:
+            semaphore.release()
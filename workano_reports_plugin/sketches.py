@@ -0,0 +1,223 @@
+import base64
+from hashlib import blake2b
+from math import ceil, exp, log
+
+
+def _hash64(value):
+    return int.from_bytes(blake2b(str(value).encode(), digest_size=8).digest(), 'big')
+
+
+class HyperLogLog:
+    """Approximate count of distinct values in 2 ** `precision` one-byte registers.
+
+    The standard error is about 1.04 / sqrt(2 ** precision), 1.6% with the
+    default precision, whatever the number of values added. Sketches of the same
+    precision merge into the sketch of the union of their values.
+    """
+
+    __slots__ = ('precision', 'registers')
+
+    def __init__(self, precision=12):
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, value):
+        hashed = _hash64(value)
+        index = hashed >> (64 - self.precision)
+        rest = hashed & ((1 << (64 - self.precision)) - 1)
+        # position of the leftmost 1 bit of the remaining bits
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError('cannot merge sketches of different precisions')
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def to_string(self):
+        return base64.b64encode(bytes(self.registers)).decode()
+
+    @classmethod
+    def from_string(cls, value):
+        registers = bytearray(base64.b64decode(value))
+        sketch = cls(len(registers).bit_length() - 1)
+        sketch.registers = registers
+        return sketch
+
+    def __len__(self):
+        size = len(self.registers)
+        if size >= 128:
+            alpha = 0.7213 / (1 + 1.079 / size)
+        else:
+            alpha = {16: 0.673, 32: 0.697, 64: 0.709}[size]
+        estimate = alpha * size * size / sum(2.0 ** -register for register in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * size and zeros:
+            # linear counting is more accurate for small cardinalities
+            estimate = size * log(size / zeros)
+        return int(round(estimate))
+
+
+class DDSketch:
+    """Quantiles of positive values within `relative_accuracy`, in logarithmic bins.
+
+    A value v is counted in bin ceil(log(v) / log(gamma)), gamma being
+    (1 + relative_accuracy) / (1 - relative_accuracy), so the quantiles returned
+    are within `relative_accuracy` of the exact ones and sketches of the same
+    accuracy merge exactly. Values under `min_value` (e.g. zero durations) are
+    counted apart.
+    """
+
+    __slots__ = (
+        'relative_accuracy',
+        'min_value',
+        '_log_gamma',
+        'bins',
+        'zeros',
+        'count',
+        'sum',
+        'min',
+        'max',
+    )
+
+    def __init__(self, relative_accuracy=0.01, min_value=0.001):
+        self.relative_accuracy = relative_accuracy
+        self.min_value = min_value
+        self._log_gamma = log((1 + relative_accuracy) / (1 - relative_accuracy))
+        self.bins = {}
+        self.zeros = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        if value < self.min_value:
+            self.zeros += 1
+        else:
+            key = ceil(log(value) / self._log_gamma)
+            self.bins[key] = self.bins.get(key, 0) + 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError('cannot merge sketches of different accuracies')
+        for key, count in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + count
+        self.zeros += other.zeros
+        self.count += other.count
+        self.sum += other.sum
+        if other.count:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def quantile(self, fraction):
+        if not self.count:
+            return None
+        rank = fraction * (self.count - 1)
+        seen = self.zeros
+        if rank < seen:
+            return self.min
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if rank < seen:
+                gamma = exp(self._log_gamma)
+                value = 2 * gamma ** key / (gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def to_dict(self):
+        return {
+            'relative_accuracy': self.relative_accuracy,
+            'min_value': self.min_value,
+            'bins': {str(key): count for key, count in self.bins.items()},
+            'zeros': self.zeros,
+            'count': self.count,
+            'sum': self.sum,
+            'min': self.min,
+            'max': self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data['relative_accuracy'], data['min_value'])
+        sketch.bins = {int(key): count for key, count in data['bins'].items()}
+        sketch.zeros = data['zeros']
+        sketch.count = data['count']
+        sketch.sum = data['sum']
+        sketch.min = data['min']
+        sketch.max = data['max']
+        return sketch
+
+
+class SpaceSaving:
+    """The most frequent items of a stream, in at most `capacity` counters.
+
+    When all counters are taken, a new item replaces the least counted one and
+    inherits its count as error: an item counted `count` was seen between
+    count - error and count times, and every item seen more than N / capacity
+    times (N being the total count) is kept. Summaries merge by adding counters,
+    an item missing from a full summary being counted that summary's minimum.
+    """
+
+    __slots__ = ('capacity', 'counters')
+
+    def __init__(self, capacity=100):
+        self.capacity = capacity
+        # item -> [count, error]
+        self.counters = {}
+
+    def _minimum(self):
+        if len(self.counters) < self.capacity:
+            return 0
+        return min(count for count, _ in self.counters.values())
+
+    def add(self, item, count=1):
+        counter = self.counters.get(item)
+        if counter is not None:
+            counter[0] += count
+            return
+        if len(self.counters) < self.capacity:
+            self.counters[item] = [count, 0]
+            return
+        smallest = min(self.counters, key=lambda key: self.counters[key][0])
+        minimum = self.counters.pop(smallest)[0]
+        self.counters[item] = [minimum + count, minimum]
+
+    def remove(self, item, count=1):
+        """Uncount `item`, e.g. for a call deleted after it was added."""
+        counter = self.counters.get(item)
+        if counter is None:
+            return
+        counter[0] -= count
+        if counter[0] <= 0:
+            del self.counters[item]
+
+    def merge(self, other):
+        own_minimum, other_minimum = self._minimum(), other._minimum()
+        merged = {}
+        for item in self.counters.keys() | other.counters.keys():
+            count, error = self.counters.get(item, (own_minimum, own_minimum))
+            other_count, other_error = other.counters.get(item, (other_minimum, other_minimum))
+            merged[item] = [count + other_count, error + other_error]
+        kept = sorted(merged.items(), key=lambda entry: entry[1][0], reverse=True)
+        self.capacity = max(self.capacity, other.capacity)
+        self.counters = dict(kept[: self.capacity])
+
+    def top(self, size):
+        """Return the `size` most counted (item, count, error), most counted first."""
+        entries = sorted(self.counters.items(), key=lambda entry: (-entry[1][0], entry[0]))
+        return [(item, count, error) for item, (count, error) in entries[:size]]
+
+    def to_dict(self):
+        return {'capacity': self.capacity, 'counters': self.counters}
+
+    @classmethod
+    def from_dict(cls, data):
+        summary = cls(data['capacity'])
+        summary.counters = {item: list(counter) for item, counter in data['counters'].items()}
+        return summary
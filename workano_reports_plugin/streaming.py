@@ -0,0 +1,253 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from workano_reports_plugin.cel_interpretor import (
+    DispatchCELInterpretor,
+    LocalOriginateCELInterpretor,
+)
+from workano_reports_plugin.metrics import streamed_calls, timed_stage
+from workano_reports_plugin.raw_call_log import RawCallLog
+
+logger = logging.getLogger(__name__)
+
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+
+def _streaming_interpretor(interpretors, first_cel):
+    """Return the interpretor the generator would pick for a call starting with `first_cel`.
+
+    Only the caller/callee dispatch can be applied CEL by CEL: a call whose first
+    channel is a Local channel may be a Local originate, whose interpretation
+    needs all the CELs of the call, and is left to the generator.
+    """
+    for interpretor in interpretors:
+        if isinstance(interpretor, LocalOriginateCELInterpretor):
+            if first_cel.channame.lower().startswith('local/'):
+                return None
+            continue
+        if isinstance(interpretor, DispatchCELInterpretor):
+            return interpretor
+        return None
+    return None
+
+
+class _LiveCall:
+    __slots__ = (
+        'linkedid',
+        'interpretor',
+        'call_log',
+        'cels',
+        'started_at',
+        'caller_uniqueid',
+        'callee_uniqueids',
+        'caller_ended',
+        'deferred',
+        'positions',
+        'valid',
+    )
+
+    def __init__(self, interpretor, first_cel, started_at):
+        self.linkedid = first_cel.linkedid
+        self.interpretor = interpretor
+        self.call_log = RawCallLog()
+        self.cels = []
+        self.started_at = started_at
+        self.caller_uniqueid = first_cel.uniqueid
+        self.callee_uniqueids = set()
+        self.caller_ended = False
+        # callee CELs received while the caller channel is up, the generator
+        # interprets every caller CEL before the callee ones
+        self.deferred = []
+        # (call log list, item index, CEL position) of the forwards and transfers
+        # recorded from a CEL, whose id is only known once the call is generated
+        self.positions = []
+        self.valid = True
+
+    def apply(self, cel):
+        if not self.valid:
+            return
+        if cel.eventtime is None or (self.cels and cel.eventtime < self.cels[-1].eventtime):
+            # the generator sorts CELs by time, this one would not be interpreted last
+            self.valid = False
+            return
+        self.cels.append(cel)
+        position = len(self.cels) - 1
+        caller = self.interpretor.caller_cel_interpretor
+        if cel.uniqueid == self.caller_uniqueid:
+            if self.caller_ended and cel.eventtype in caller.eventtype_map:
+                # callee CELs were already interpreted before this caller one
+                self.valid = False
+                return
+            self._interpret(caller, cel, position)
+            if cel.eventtype == 'CHAN_END':
+                self.caller_ended = True
+                self._flush()
+            return
+        if cel.eventtype == 'CHAN_START':
+            self.callee_uniqueids.add(cel.uniqueid)
+        if cel.uniqueid not in self.callee_uniqueids:
+            # channels started under another linkedid are ignored by the dispatch
+            return
+        self.deferred.append((cel, position))
+        if self.caller_ended:
+            self._flush()
+
+    def finish(self):
+        self._flush()
+
+    def matches(self, cels):
+        """Tell if `cels`, sorted as the generator does, are the CELs this call saw."""
+        if not self.valid or len(cels) != len(self.cels):
+            return False
+        return all(
+            cel.uniqueid == seen.uniqueid
+            and cel.eventtype == seen.eventtype
+            and cel.eventtime == seen.eventtime
+            for cel, seen in zip(cels, self.cels)
+        )
+
+    def bind(self, cels):
+        """Give the call log the ids of `cels`, the CELs received on the bus have none."""
+        call_log = self.call_log
+        call_log.original_call_log_id = cels[0].call_log_id
+        for items, index, position in self.positions:
+            items[index].cel_id = cels[position].id
+        return call_log
+
+    def snapshot(self):
+        call_log = self.call_log
+        answered = call_log.date_answer is not None
+        return {
+            'conversation_id': self.linkedid,
+            'tenant_uuid': call_log.tenant_uuid,
+            'start': _isoformat(call_log.date),
+            'answer': _isoformat(call_log.date_answer),
+            'duration': (
+                (datetime.now(timezone.utc) - call_log.date).total_seconds()
+                if call_log.date
+                else None
+            ),
+            'answered': answered,
+            'direction': call_log.direction,
+            'source_name': call_log.source_name,
+            'source_extension': call_log.source_exten,
+            'requested_extension': call_log.requested_exten,
+            'requested_context': call_log.requested_context,
+            'destination_name': call_log.destination_name,
+            'destination_extension': call_log.destination_exten,
+            'trunk': call_log.trunk,
+            'channels': 1 + len(self.callee_uniqueids),
+        }
+
+    def _flush(self):
+        callee = self.interpretor.callee_cel_interpretor
+        for cel, position in self.deferred:
+            if not self.valid:
+                break
+            self._interpret(callee, cel, position)
+        self.deferred = []
+
+    def _interpret(self, interpretor, cel, position):
+        call_log = self.call_log
+        forwards, transfers = len(call_log.forwards), len(call_log.transfers)
+        try:
+            self.call_log = interpretor.interpret_cel(cel, call_log)
+        except Exception:
+            # the generator interprets the call again and logs the failure
+            logger.debug('failed to interpret CEL of linkedid %s as it arrived', self.linkedid)
+            self.valid = False
+            return
+        for items, count in ((self.call_log.forwards, forwards), (self.call_log.transfers, transfers)):
+            for index in range(count, len(items)):
+                self.positions.append((items, index, position))
+
+
+class LiveCalls:
+    """Calls in progress, interpreted CEL by CEL as their CELs arrive on the bus.
+
+    The caller CELs of a call are applied to its `RawCallLog` when they arrive,
+    its callee CELs once the caller channel ended, which is the order in which
+    the generator interprets them. At LINKEDID_END, the generator takes the
+    interpreted call log instead of interpreting the CELs again when the call
+    saw exactly the CELs it generates from; any other call (correlated
+    linkedids, missed or reordered CELs, Local originates) is interpreted from
+    its CELs as before.
+
+    At most `max_calls` calls are followed and for at most `max_age` seconds,
+    the oldest are dropped beyond.
+    """
+
+    def __init__(self, interpretors, max_calls=10000, max_age=14400):
+        self._interpretors = interpretors
+        self._max_calls = max_calls
+        self._max_age = max_age
+        self._lock = threading.Lock()
+        # oldest first
+        self._calls = OrderedDict()
+
+    def __len__(self):
+        return len(self._calls)
+
+    def add(self, cel):
+        with self._lock:
+            call = self._calls.get(cel.linkedid)
+            if call is None:
+                # a call is followed from the CHAN_START of its own channel
+                if cel.eventtype != 'CHAN_START' or cel.uniqueid != cel.linkedid:
+                    return
+                interpretor = _streaming_interpretor(self._interpretors, cel)
+                if interpretor is None:
+                    return
+                call = self._calls[cel.linkedid] = _LiveCall(interpretor, cel, time.monotonic())
+                self._drop_over_bounds()
+            with timed_stage('stream'):
+                call.apply(cel)
+
+    def pop(self, linkedids, cels):
+        """Return the live call of `linkedids` if it saw exactly `cels`, or None."""
+        if len(linkedids) != 1:
+            return None
+        (linkedid,) = linkedids
+        with self._lock:
+            call = self._calls.pop(linkedid, None)
+            if call is None:
+                return None
+            if call.valid:
+                call.finish()
+            if not call.matches(cels):
+                streamed_calls.inc(outcome='fallback')
+                return None
+            streamed_calls.inc(outcome='finalized')
+            return call
+
+    def discard(self, linkedids):
+        with self._lock:
+            for linkedid in linkedids:
+                self._calls.pop(linkedid, None)
+
+    def snapshot(self, tenant_uuid=None):
+        """Return the calls in progress, of `tenant_uuid` if given, oldest first.
+
+        Calls whose tenant is not known yet are only listed without `tenant_uuid`.
+        """
+        with self._lock:
+            return [
+                call.snapshot()
+                for call in self._calls.values()
+                if call.valid
+                and (tenant_uuid is None or call.call_log.tenant_uuid == tenant_uuid)
+            ]
+
+    def _drop_over_bounds(self):
+        deadline = time.monotonic() - self._max_age
+        while self._calls:
+            linkedid, call = next(iter(self._calls.items()))
+            if len(self._calls) <= self._max_calls and call.started_at > deadline:
+                break
+            del self._calls[linkedid]
+            streamed_calls.inc(outcome='dropped')
@@ -0,0 +1,97 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from workano_reports_plugin.callbacks import match_callbacks, normalize_number
+
+T0 = datetime(2026, 1, 5, 8, 0, tzinfo=timezone.utc)
+END = T0 + timedelta(hours=1)
+TENANT = '00000000-0000-4000-8000-000000000001'
+OTHER_TENANT = '00000000-0000-4000-8000-000000000002'
+
+
+def missed(seconds, number, tenant=TENANT):
+    return (None, T0 + timedelta(seconds=seconds), tenant, 'inbound', number, True)
+
+
+def answered(seconds, number, tenant=TENANT):
+    return (None, T0 + timedelta(seconds=seconds), tenant, 'inbound', number, False)
+
+
+def outbound(seconds, number, tenant=TENANT):
+    return (None, T0 + timedelta(seconds=seconds), tenant, 'outbound', number, False)
+
+
+class TestNormalizeNumber(unittest.TestCase):
+    def test_prefixes_are_ignored(self):
+        self.assertEqual(normalize_number('09121234567'), '9121234567')
+        self.assertEqual(normalize_number('+98 912 123 4567'), '9121234567')
+
+    def test_no_digits(self):
+        self.assertIsNone(normalize_number(None))
+        self.assertIsNone(normalize_number('anonymous'))
+
+
+class TestMatchCallbacks(unittest.TestCase):
+    def test_no_calls(self):
+        result = match_callbacks([], END, 3600)
+
+        self.assertEqual(result['missed'], 0)
+        self.assertEqual(result['called_back'], 0)
+        self.assertEqual(result['callback_rate'], 0.0)
+        self.assertIsNone(result['time_to_callback']['average'])
+        self.assertEqual(result['time_to_callback']['histogram'][-1], {'up_to': 3600, 'count': 0})
+
+    def test_callback_within_the_window(self):
+        rows = [missed(0, '09121234567'), outbound(120, '+989121234567')]
+
+        result = match_callbacks(rows, END, 3600)
+
+        self.assertEqual(result['missed'], 1)
+        self.assertEqual(result['called_back'], 1)
+        self.assertEqual(result['callback_rate'], 1.0)
+        self.assertEqual(result['time_to_callback']['average'], 120)
+        self.assertEqual(result['time_to_callback']['histogram'][0], {'up_to': 300, 'count': 1})
+
+    def test_callback_at_the_end_of_the_window(self):
+        rows = [missed(0, '1001'), outbound(600, '1001')]
+
+        result = match_callbacks(rows, END, 600)
+
+        self.assertEqual(result['called_back'], 1)
+
+    def test_missed_call_expires_after_the_window(self):
+        rows = [missed(0, '1001'), outbound(601, '1001')]
+
+        result = match_callbacks(rows, END, 600)
+
+        self.assertEqual(result['missed'], 1)
+        self.assertEqual(result['called_back'], 0)
+
+    def test_one_callback_answers_every_waiting_missed_call(self):
+        rows = [missed(0, '1001'), missed(60, '1001'), outbound(120, '1001'), outbound(180, '1001')]
+
+        result = match_callbacks(rows, END, 3600)
+
+        self.assertEqual(result['called_back'], 2)
+        self.assertEqual(result['time_to_callback']['max'], 120)
+
+    def test_answered_calls_and_other_tenants_are_not_called_back(self):
+        rows = [
+            answered(0, '1001'),
+            missed(10, '1002', tenant=OTHER_TENANT),
+            outbound(20, '1001'),
+            outbound(30, '1002'),
+        ]
+
+        result = match_callbacks(rows, END, 3600)
+
+        self.assertEqual(result['missed'], 1)
+        self.assertEqual(result['called_back'], 0)
+
+    def test_missed_calls_from_the_end_are_not_counted(self):
+        rows = [missed(3600, '1001'), outbound(3700, '1001')]
+
+        result = match_callbacks(rows, END, 3600)
+
+        self.assertEqual(result['missed'], 0)
+        self.assertEqual(result['called_back'], 0)
@@ -0,0 +1,211 @@
+import shutil
+import tempfile
+import unittest
+from datetime import date, datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from workano_reports_plugin.columnar_cache import ColumnarCache, merge_groups, np
+
+T0 = datetime(2026, 3, 28, tzinfo=timezone.utc)
+TENANT = '00000000-0000-4000-8000-000000000001'
+OTHER_TENANT = '00000000-0000-4000-8000-000000000002'
+OPENED = {'state': 'opened', 'schedule_id': 1}
+CLOSED = {'state': 'closed', 'schedule_id': 1}
+DIMENSIONS = ('direction', 'trunk')
+GROUPING_SETS = [(), ('direction',), ('direction', 'trunk')]
+
+
+def call_log(id, hours, direction='inbound', trunk='trunk1', schedule_state=OPENED, tenant=TENANT):
+    date_ = T0 + timedelta(hours=hours)
+    return SimpleNamespace(
+        id=id,
+        date=date_,
+        date_answer=date_ + timedelta(seconds=5),
+        date_end=date_ + timedelta(seconds=65),
+        tenant_uuid=tenant,
+        direction=direction,
+        trunk=trunk,
+        schedule_state=schedule_state,
+    )
+
+
+def counts(groups):
+    return {
+        (group['grouping_set'], tuple(group['values'][name] for name in group['grouping_set'])): (
+            group['working_hours'],
+            group['total'],
+        )
+        for group in groups
+    }
+
+
+@unittest.skipIf(np is None, 'the columnar cache requires numpy')
+class TestColumnarCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = ColumnarCache(self.directory)
+        # days written by this cache hold all their call logs
+        self.cache._opened_at = T0 - timedelta(days=30)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def count(self, start, end, **kwargs):
+        return self.cache.count_by_grouping_sets(DIMENSIONS, GROUPING_SETS, start, end, **kwargs)
+
+    def test_empty_cache(self):
+        groups, uncached = self.count(T0, T0 + timedelta(days=2))
+
+        self.assertEqual(counts(groups), {((), ()): (0, 0)})
+        self.assertEqual(uncached, [(T0, T0 + timedelta(days=2))])
+
+    def test_counts_by_grouping_sets(self):
+        self.cache.append(
+            [
+                call_log(1, 1),
+                call_log(2, 2, schedule_state=CLOSED),
+                call_log(3, 3, direction='outbound', trunk=None, schedule_state=None),
+            ]
+        )
+
+        groups, uncached = self.count(T0, T0 + timedelta(days=1))
+
+        self.assertEqual(uncached, [])
+        self.assertEqual(
+            counts(groups),
+            {
+                ((), ()): (1, 3),
+                (('direction',), ('inbound',)): (1, 2),
+                (('direction',), ('outbound',)): (0, 1),
+                (('direction', 'trunk'), ('inbound', 'trunk1')): (1, 2),
+                (('direction', 'trunk'), ('outbound', None)): (0, 1),
+            },
+        )
+
+    def test_range_bounds_within_a_day(self):
+        self.cache.append([call_log(1, 1), call_log(2, 2), call_log(3, 3)])
+
+        groups, _ = self.count(T0 + timedelta(hours=2), T0 + timedelta(hours=3))
+
+        self.assertEqual(counts(groups)[((), ())], (1, 1))
+
+    def test_range_with_dst_offsets(self):
+        # Europe/Paris switches from +01:00 to +02:00 on 2026-03-29
+        self.cache.append([call_log(1, 22), call_log(2, 23), call_log(3, 24), call_log(4, 47)])
+        start = datetime(2026, 3, 29, tzinfo=timezone(timedelta(hours=1)))
+        end = datetime(2026, 3, 30, tzinfo=timezone(timedelta(hours=2)))
+
+        groups, uncached = self.count(start, end)
+
+        self.assertEqual(counts(groups)[((), ())], (2, 2))
+        self.assertEqual(uncached, [])
+
+    def test_deleted_call_logs_are_not_counted(self):
+        call_logs = [call_log(1, 1), call_log(2, 2)]
+        self.cache.append(call_logs)
+
+        self.cache.remove([(1, call_logs[0].date)])
+
+        groups, _ = self.count(T0, T0 + timedelta(days=1))
+        self.assertEqual(counts(groups)[((), ())], (1, 1))
+
+    def test_tenant_filter(self):
+        self.cache.append([call_log(1, 1), call_log(2, 2, tenant=OTHER_TENANT)])
+
+        groups, _ = self.count(T0, T0 + timedelta(days=1), tenant_uuid=OTHER_TENANT)
+        unknown, _ = self.count(T0, T0 + timedelta(days=1), tenant_uuid='unknown')
+
+        self.assertEqual(counts(groups)[((), ())], (1, 1))
+        self.assertEqual(counts(unknown), {((), ()): (0, 0)})
+
+    def test_days_before_the_cache_was_opened_are_left_to_sql(self):
+        self.cache._opened_at = T0 + timedelta(days=1)
+        self.cache.append([call_log(1, 1), call_log(2, 25)])
+
+        groups, uncached = self.count(T0, T0 + timedelta(days=2))
+
+        self.assertEqual(counts(groups)[((), ())], (1, 1))
+        self.assertEqual(uncached, [(T0, T0 + timedelta(days=1))])
+
+    def test_adjacent_uncached_days_are_one_span(self):
+        self.cache.append([call_log(1, 49)])
+
+        _, uncached = self.count(T0, T0 + timedelta(days=3))
+
+        self.assertEqual(uncached, [(T0, T0 + timedelta(days=2))])
+
+    def test_rebuilt_day_is_complete(self):
+        self.cache._opened_at = T0 + timedelta(days=1)
+        self.cache.append([call_log(1, 1)])
+
+        count = self.cache.rebuild_day(date(2026, 3, 28), iter([call_log(1, 1), call_log(2, 2)]))
+
+        groups, uncached = self.count(T0, T0 + timedelta(days=1))
+        self.assertEqual(count, 2)
+        self.assertEqual(uncached, [])
+        self.assertEqual(counts(groups)[((), ())], (2, 2))
+
+    def test_rebuilt_empty_day(self):
+        self.cache.rebuild_day(date(2026, 3, 28), iter([]))
+
+        groups, uncached = self.count(T0, T0 + timedelta(days=1))
+
+        self.assertEqual(uncached, [])
+        self.assertEqual(counts(groups), {((), ()): (0, 0)})
+
+
+class TestMergeGroups(unittest.TestCase):
+    def test_no_groups(self):
+        self.assertEqual(merge_groups([], []), [])
+
+    def test_counters_of_the_same_values_are_summed(self):
+        cached = [
+            {
+                'grouping_set': ('trunk',),
+                'values': {'trunk': 'trunk1'},
+                'working_hours': 1,
+                'outside_working_hours': 1,
+                'total': 2,
+            }
+        ]
+        sql = [
+            {
+                'grouping_set': ('trunk',),
+                'values': {'trunk': 'trunk1'},
+                'working_hours': 3,
+                'outside_working_hours': 0,
+                'total': 3,
+            },
+            {
+                'grouping_set': ('trunk',),
+                'values': {'trunk': None},
+                'working_hours': 0,
+                'outside_working_hours': 1,
+                'total': 1,
+            },
+        ]
+
+        merged = merge_groups(cached, sql)
+
+        self.assertEqual(
+            counts(merged), {(('trunk',), ('trunk1',)): (4, 5), (('trunk',), (None,)): (0, 1)}
+        )
+        self.assertEqual(cached[0]['total'], 2)
+
+    def test_values_are_compared_as_strings(self):
+        # the cache returns the schedule id as a string, SQL as an integer
+        groups = [
+            {
+                'grouping_set': ('schedule_id',),
+                'values': {'schedule_id': value},
+                'working_hours': 1,
+                'outside_working_hours': 0,
+                'total': 1,
+            }
+            for value in ('7', 7)
+        ]
+
+        merged = merge_groups(groups[:1], groups[1:])
+
+        self.assertEqual(len(merged), 1)
+        self.assertEqual(merged[0]['total'], 2)
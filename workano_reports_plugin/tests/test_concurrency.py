@@ -0,0 +1,75 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from workano_reports_plugin.concurrency import sweep_concurrency
+
+T0 = datetime(2026, 1, 5, 8, 0, tzinfo=timezone.utc)
+
+
+def at(minutes):
+    return T0 + timedelta(minutes=minutes)
+
+
+class TestSweepConcurrency(unittest.TestCase):
+    def test_no_intervals(self):
+        result = sweep_concurrency([], [at(0), at(60), at(120)])
+
+        self.assertEqual(result, [{}, {}])
+
+    def test_no_bucket(self):
+        self.assertEqual(sweep_concurrency([('t1', at(0), at(10))], [at(0)]), [])
+
+    def test_overlapping_calls(self):
+        intervals = [('t1', at(0), at(30)), ('t1', at(15), at(45))]
+
+        result = sweep_concurrency(intervals, [at(0), at(60)])
+
+        self.assertEqual(result[0]['t1']['max'], 2)
+        self.assertAlmostEqual(result[0]['t1']['average'], 60 / 60)
+
+    def test_touching_calls_are_not_simultaneous(self):
+        intervals = [('t1', at(0), at(30)), ('t1', at(30), at(60))]
+
+        result = sweep_concurrency(intervals, [at(0), at(60)])
+
+        self.assertEqual(result[0]['t1'], {'max': 1, 'average': 1.0})
+
+    def test_call_split_over_buckets(self):
+        intervals = [('t1', at(30), at(90))]
+
+        result = sweep_concurrency(intervals, [at(0), at(60), at(120)])
+
+        self.assertEqual(result[0]['t1'], {'max': 1, 'average': 0.5})
+        self.assertEqual(result[1]['t1'], {'max': 1, 'average': 0.5})
+
+    def test_trunks_are_counted_apart(self):
+        intervals = [('t1', at(0), at(60)), ('t2', at(0), at(30))]
+
+        result = sweep_concurrency(intervals, [at(0), at(60)])
+
+        self.assertEqual(result[0]['t1'], {'max': 1, 'average': 1.0})
+        self.assertEqual(result[0]['t2'], {'max': 1, 'average': 0.5})
+
+    def test_calls_outside_the_buckets(self):
+        intervals = [
+            ('t1', at(-30), at(-10)),
+            ('t1', at(-10), at(10)),
+            ('t1', at(60), at(70)),
+        ]
+
+        result = sweep_concurrency(intervals, [at(0), at(60)])
+
+        self.assertEqual(result[0]['t1']['max'], 1)
+        self.assertAlmostEqual(result[0]['t1']['average'], 10 / 60)
+
+    def test_bucket_over_a_dst_change(self):
+        # Europe/Paris, 2026-03-29 lasts 23 hours
+        paris_winter = timezone(timedelta(hours=1))
+        paris_summer = timezone(timedelta(hours=2))
+        start = datetime(2026, 3, 29, tzinfo=paris_winter)
+        end = datetime(2026, 3, 30, tzinfo=paris_summer)
+        intervals = [('t1', start, end)]
+
+        result = sweep_concurrency(intervals, [start, end])
+
+        self.assertEqual(result[0]['t1'], {'max': 1, 'average': 1.0})
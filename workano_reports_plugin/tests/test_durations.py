@@ -0,0 +1,41 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from workano_reports_plugin.durations import DurationStats
+
+T0 = datetime(2026, 1, 5, 8, 0, tzinfo=timezone.utc)
+
+
+def add_call(stats, direction, trunk, answer_seconds, talk_seconds):
+    date_answer = T0 + timedelta(seconds=answer_seconds)
+    stats.add(direction, trunk, T0, date_answer, date_answer + timedelta(seconds=talk_seconds))
+
+
+class TestDurationStats(unittest.TestCase):
+    def test_unanswered_calls_have_no_duration(self):
+        stats = DurationStats()
+
+        stats.add('inbound', 'trunk1', T0, None, T0 + timedelta(seconds=30))
+
+        self.assertEqual(stats.to_dict(), {})
+
+    def test_merge_dict_round_trip(self):
+        stats = DurationStats()
+        add_call(stats, 'inbound', 'trunk1', 10, 60)
+        add_call(stats, 'inbound', None, 5, 120)
+        copy = DurationStats()
+
+        copy.merge_dict(stats.to_dict())
+
+        self.assertEqual(copy.to_dict(), stats.to_dict())
+        self.assertEqual(copy.report(), stats.report())
+
+    def test_merge_adds_the_calls(self):
+        first, second = DurationStats(), DurationStats()
+        add_call(first, 'inbound', 'trunk1', 10, 60)
+        add_call(second, 'inbound', 'trunk1', 20, 600)
+
+        first.merge(second)
+
+        talk_time = first.to_dict()['inbound']['trunk1']['talk_time']
+        self.assertEqual((talk_time['count'], talk_time['min'], talk_time['max']), (2, 60, 600))
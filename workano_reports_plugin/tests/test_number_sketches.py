@@ -0,0 +1,62 @@
+import json
+import unittest
+
+from workano_reports_plugin.number_sketches import NumberSketches
+
+
+class TestNumberSketches(unittest.TestCase):
+    def test_empty(self):
+        report = NumberSketches().report(5)
+
+        self.assertEqual(
+            report,
+            {
+                'unique_callers': 0,
+                'unique_destinations': 0,
+                'top_callers': [],
+                'top_destinations': [],
+            },
+        )
+
+    def test_calls_without_numbers(self):
+        sketches = NumberSketches()
+
+        sketches.add_call(None, '')
+
+        self.assertEqual(sketches.report(5)['unique_callers'], 0)
+
+    def test_add_and_remove_calls(self):
+        sketches = NumberSketches()
+        sketches.add_call('1001', '2001')
+        sketches.add_call('1001', '2002')
+        sketches.add_call('1002', '2001')
+
+        sketches.remove_call('1002', '2002')
+
+        report = sketches.report(1)
+        self.assertEqual(report['unique_callers'], 2)
+        self.assertEqual(report['unique_destinations'], 2)
+        self.assertEqual(report['top_callers'], [{'number': '1001', 'count': 2, 'error': 0}])
+        self.assertEqual(report['top_destinations'], [{'number': '2001', 'count': 2, 'error': 0}])
+
+    def test_merge(self):
+        first, second = NumberSketches(), NumberSketches()
+        first.add_call('1001', '2001')
+        second.add_call('1001', '2002')
+
+        first.merge(second)
+
+        report = first.report(5)
+        self.assertEqual(report['unique_callers'], 1)
+        self.assertEqual(report['unique_destinations'], 2)
+        self.assertEqual(report['top_callers'], [{'number': '1001', 'count': 2, 'error': 0}])
+
+    def test_json_round_trip(self):
+        sketches = NumberSketches(capacity=10)
+        sketches.add_call('1001', '2001')
+        sketches.add_call('1002', '2001')
+
+        copy = NumberSketches.from_dict(json.loads(json.dumps(sketches.to_dict())))
+
+        self.assertEqual(copy.to_dict(), sketches.to_dict())
+        self.assertEqual(copy.report(5), sketches.report(5))
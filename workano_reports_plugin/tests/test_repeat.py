@@ -0,0 +1,93 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from workano_reports_plugin.repeat import count_repeat_callers
+
+T0 = datetime(2026, 1, 5, 8, 0, tzinfo=timezone.utc)
+TENANT = '00000000-0000-4000-8000-000000000001'
+OTHER_TENANT = '00000000-0000-4000-8000-000000000002'
+
+
+def call(seconds, number, trunk='trunk1', direction='inbound', tenant=TENANT):
+    return (T0 + timedelta(seconds=seconds), tenant, direction, trunk, number)
+
+
+class TestCountRepeatCallers(unittest.TestCase):
+    def test_no_calls(self):
+        self.assertEqual(count_repeat_callers([], 3600), {})
+
+    def test_repeat_within_the_window(self):
+        rows = [call(0, '1001'), call(600, '1001'), call(700, '1002')]
+
+        result = count_repeat_callers(rows, 3600)
+
+        inbound = result['inbound']
+        self.assertEqual(inbound['calls'], 3)
+        self.assertEqual(inbound['repeat_calls'], 1)
+        self.assertEqual(inbound['callers'], 2)
+        self.assertEqual(inbound['repeat_callers'], 1)
+        self.assertEqual(inbound['repeat_caller_rate'], 0.5)
+        self.assertEqual(inbound['time_to_repeat'], [{'up_to': 3600, 'count': 1}])
+        self.assertEqual(inbound['by_trunk']['trunk1']['repeat_calls'], 1)
+
+    def test_repeat_at_the_end_of_the_window(self):
+        rows = [call(0, '1001'), call(3600, '1001')]
+
+        result = count_repeat_callers(rows, 3600)
+
+        self.assertEqual(result['inbound']['repeat_calls'], 1)
+
+    def test_previous_call_expires_after_the_window(self):
+        rows = [call(0, '1001'), call(3601, '1001')]
+
+        result = count_repeat_callers(rows, 3600)
+
+        self.assertEqual(result['inbound']['repeat_calls'], 0)
+
+    def test_delay_is_measured_from_the_last_call(self):
+        rows = [call(0, '1001'), call(3000, '1001'), call(6000, '1001')]
+
+        result = count_repeat_callers(rows, 3600)
+
+        self.assertEqual(result['inbound']['repeat_calls'], 2)
+
+    def test_repeat_on_another_trunk_counts_for_the_direction_only(self):
+        rows = [call(0, '1001', trunk='trunk1'), call(60, '1001', trunk='trunk2')]
+
+        result = count_repeat_callers(rows, 3600)
+
+        self.assertEqual(result['inbound']['repeat_calls'], 1)
+        self.assertEqual(result['inbound']['by_trunk']['trunk1']['repeat_calls'], 0)
+        self.assertEqual(result['inbound']['by_trunk']['trunk2']['repeat_calls'], 0)
+
+    def test_directions_and_tenants_are_counted_apart(self):
+        rows = [
+            call(0, '1001'),
+            call(60, '1001', direction='outbound'),
+            call(120, '1001', tenant=OTHER_TENANT),
+        ]
+
+        result = count_repeat_callers(rows, 3600)
+
+        self.assertEqual(result['inbound']['repeat_calls'], 0)
+        self.assertEqual(result['inbound']['callers'], 2)
+        self.assertEqual(result['outbound']['repeat_calls'], 0)
+
+    def test_histogram_buckets(self):
+        rows = [call(0, '1001'), call(1800, '1001'), call(0, '1002'), call(7200, '1002')]
+        rows.sort(key=lambda row: row[0])
+
+        result = count_repeat_callers(rows, 4 * 3600)
+
+        self.assertEqual(
+            result['inbound']['time_to_repeat'],
+            [{'up_to': 3600, 'count': 1}, {'up_to': 4 * 3600, 'count': 1}],
+        )
+
+    def test_approximate_counts_callers_with_sketches(self):
+        rows = [call(0, '1001'), call(600, '1001'), call(700, '1002')]
+
+        exact = count_repeat_callers(rows, 3600)
+        approximate = count_repeat_callers(rows, 3600, approximate=True)
+
+        self.assertEqual(approximate, exact)
@@ -0,0 +1,56 @@
+import unittest
+
+from workano_reports_plugin.services import _scale_sampled_group
+
+
+def sampled_group(working_hours, outside_working_hours, squares):
+    return {
+        'direction': 'inbound',
+        'working_hours': working_hours,
+        'outside_working_hours': outside_working_hours,
+        'total': working_hours + outside_working_hours,
+        'squares': squares,
+    }
+
+
+class TestScaleSampledGroup(unittest.TestCase):
+    def test_counters_are_scaled_with_their_intervals(self):
+        group = sampled_group(10, 0, {'working_hours': 20, 'outside_working_hours': 0, 'total': 20})
+
+        scaled = _scale_sampled_group(group, 0.1)
+
+        self.assertEqual(scaled['working_hours'], 100)
+        self.assertEqual(scaled['total'], 100)
+        # 100 +- 1.96 * sqrt(0.9 * 20) / 0.1
+        self.assertEqual(scaled['confidence_intervals']['working_hours'], [16, 184])
+        self.assertEqual(scaled['direction'], 'inbound')
+        self.assertNotIn('squares', scaled)
+        self.assertIn('squares', group)
+
+    def test_zero_counter_gets_the_poisson_upper_bound(self):
+        group = sampled_group(10, 0, {'working_hours': 20, 'outside_working_hours': 0, 'total': 20})
+
+        scaled = _scale_sampled_group(group, 0.1)
+
+        # -ln(0.025) * 0.9 / 0.1
+        self.assertEqual(scaled['outside_working_hours'], 0)
+        self.assertEqual(scaled['confidence_intervals']['outside_working_hours'], [0, 34])
+
+    def test_lower_bound_is_not_under_the_sampled_count(self):
+        # one page holding all the sampled rows
+        group = sampled_group(50, 0, {'working_hours': 2500, 'outside_working_hours': 0, 'total': 2500})
+
+        scaled = _scale_sampled_group(group, 0.5)
+
+        self.assertEqual(scaled['confidence_intervals']['working_hours'][0], 50)
+
+    def test_whole_table_sample_is_exact(self):
+        group = sampled_group(7, 3, {'working_hours': 49, 'outside_working_hours': 9, 'total': 58})
+
+        scaled = _scale_sampled_group(group, 1.0)
+
+        self.assertEqual(scaled['total'], 10)
+        self.assertEqual(
+            scaled['confidence_intervals'],
+            {'working_hours': [7, 7], 'outside_working_hours': [3, 3], 'total': [10, 10]},
+        )
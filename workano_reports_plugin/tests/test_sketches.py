@@ -0,0 +1,188 @@
+import json
+import random
+import unittest
+
+from workano_reports_plugin.sketches import DDSketch, HyperLogLog, SpaceSaving
+
+
+class TestHyperLogLog(unittest.TestCase):
+    def test_empty(self):
+        self.assertEqual(len(HyperLogLog()), 0)
+
+    def test_duplicates_are_counted_once(self):
+        once, thrice = HyperLogLog(), HyperLogLog()
+        for value in range(100):
+            once.add(str(value))
+        for _ in range(3):
+            for value in range(100):
+                thrice.add(str(value))
+
+        self.assertEqual(thrice.registers, once.registers)
+        self.assertAlmostEqual(len(thrice), 100, delta=5)
+
+    def test_estimate_is_within_the_standard_error(self):
+        sketch = HyperLogLog()
+        for value in range(50000):
+            sketch.add(value)
+
+        self.assertAlmostEqual(len(sketch), 50000, delta=50000 * 0.05)
+
+    def test_merge_counts_the_union(self):
+        first, second = HyperLogLog(), HyperLogLog()
+        for value in range(1000):
+            first.add(value)
+        for value in range(500, 1500):
+            second.add(value)
+
+        first.merge(second)
+
+        self.assertAlmostEqual(len(first), 1500, delta=1500 * 0.05)
+
+    def test_merge_different_precisions(self):
+        with self.assertRaises(ValueError):
+            HyperLogLog(10).merge(HyperLogLog(12))
+
+    def test_string_round_trip(self):
+        sketch = HyperLogLog(precision=10)
+        for value in range(1000):
+            sketch.add(value)
+
+        copy = HyperLogLog.from_string(sketch.to_string())
+
+        self.assertEqual(copy.precision, 10)
+        self.assertEqual(copy.registers, sketch.registers)
+        self.assertEqual(len(copy), len(sketch))
+
+
+class TestDDSketch(unittest.TestCase):
+    def test_empty(self):
+        sketch = DDSketch()
+
+        self.assertEqual(sketch.count, 0)
+        self.assertIsNone(sketch.quantile(0.5))
+
+    def test_quantiles_are_within_the_relative_accuracy(self):
+        rng = random.Random(1)
+        values = sorted(rng.lognormvariate(4, 1.5) for _ in range(10000))
+        sketch = DDSketch(relative_accuracy=0.01)
+        for value in values:
+            sketch.add(value)
+
+        for fraction in (0, 0.5, 0.9, 0.99, 1):
+            exact = values[int(fraction * (len(values) - 1))]
+            self.assertAlmostEqual(sketch.quantile(fraction), exact, delta=exact * 0.01)
+        self.assertEqual((sketch.min, sketch.max), (values[0], values[-1]))
+
+    def test_zeros_are_counted_apart(self):
+        sketch = DDSketch()
+        for value in (0.0, 0.0, 0.0, 10.0):
+            sketch.add(value)
+
+        self.assertEqual(sketch.zeros, 3)
+        self.assertEqual(sketch.quantile(0.5), 0.0)
+        self.assertEqual(sketch.quantile(1), 10.0)
+
+    def test_merge_equals_one_sketch_of_all_values(self):
+        first, second, whole = DDSketch(), DDSketch(), DDSketch()
+        for value in range(1, 500):
+            first.add(value)
+            whole.add(value)
+        for value in range(0, 2000, 3):
+            second.add(value)
+            whole.add(value)
+
+        first.merge(second)
+
+        self.assertEqual(first.to_dict(), whole.to_dict())
+
+    def test_merge_empty_sketch(self):
+        sketch = DDSketch()
+        sketch.add(5.0)
+
+        sketch.merge(DDSketch())
+
+        self.assertEqual((sketch.count, sketch.min, sketch.max), (1, 5.0, 5.0))
+
+    def test_merge_different_accuracies(self):
+        with self.assertRaises(ValueError):
+            DDSketch(0.01).merge(DDSketch(0.02))
+
+    def test_json_round_trip(self):
+        sketch = DDSketch()
+        for value in (0.0, 1.5, 30.0, 3600.0):
+            sketch.add(value)
+
+        copy = DDSketch.from_dict(json.loads(json.dumps(sketch.to_dict())))
+
+        self.assertEqual(copy.to_dict(), sketch.to_dict())
+        self.assertEqual(copy.quantile(0.9), sketch.quantile(0.9))
+
+
+class TestSpaceSaving(unittest.TestCase):
+    def test_empty(self):
+        self.assertEqual(SpaceSaving().top(10), [])
+
+    def test_exact_under_capacity(self):
+        summary = SpaceSaving(capacity=3)
+        for item in ('a', 'b', 'a', 'c', 'a', 'b'):
+            summary.add(item)
+
+        self.assertEqual(summary.top(2), [('a', 3, 0), ('b', 2, 0)])
+
+    def test_new_item_replaces_the_least_counted(self):
+        summary = SpaceSaving(capacity=2)
+        for item in ('a', 'a', 'a', 'b', 'c'):
+            summary.add(item)
+
+        self.assertEqual(summary.top(2), [('a', 3, 0), ('c', 2, 1)])
+
+    def test_frequent_items_are_kept(self):
+        summary = SpaceSaving(capacity=10)
+        for index in range(1000):
+            summary.add('frequent' if index % 4 == 0 else f'rare{index}')
+
+        item, count, error = summary.top(1)[0]
+        self.assertEqual(item, 'frequent')
+        self.assertLessEqual(count - error, 250)
+        self.assertGreaterEqual(count, 250)
+
+    def test_remove(self):
+        summary = SpaceSaving()
+        summary.add('a', count=2)
+        summary.add('b')
+
+        summary.remove('a')
+        summary.remove('b')
+        summary.remove('unknown')
+
+        self.assertEqual(summary.top(10), [('a', 1, 0)])
+
+    def test_merge_adds_counters(self):
+        first, second = SpaceSaving(capacity=2), SpaceSaving(capacity=2)
+        first.add('a', count=5)
+        first.add('b', count=1)
+        second.add('a', count=2)
+        second.add('c', count=3)
+
+        first.merge(second)
+
+        # b and c are counted the minimum of the full summary missing them
+        self.assertEqual(first.top(2), [('a', 7, 0), ('c', 4, 1)])
+
+    def test_merge_empty_summary(self):
+        summary = SpaceSaving(capacity=2)
+        summary.add('a')
+
+        summary.merge(SpaceSaving(capacity=2))
+
+        self.assertEqual(summary.top(2), [('a', 1, 0)])
+
+    def test_json_round_trip(self):
+        summary = SpaceSaving(capacity=2)
+        for item in ('a', 'a', 'b', 'c'):
+            summary.add(item)
+
+        copy = SpaceSaving.from_dict(json.loads(json.dumps(summary.to_dict())))
+
+        self.assertEqual(copy.capacity, 2)
+        self.assertEqual(copy.top(2), summary.top(2))
@@ -0,0 +1,163 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest import mock
+
+from workano_reports_plugin import services
+from workano_reports_plugin.vectorized_reports import np
+
+# Europe/Paris switches from +01:00 to +02:00 at 2026-03-29T01:00:00Z
+T0 = datetime(2026, 3, 28, 20, 0, tzinfo=timezone.utc)
+PERIODS = {
+    'open_periods': [
+        {
+            'hours_start': '08:00',
+            'hours_end': '18:00',
+            'week_days': [1, 2, 3, 4, 5],
+            'month_days': [],
+            'months': [],
+            'timezone': 'Europe/Paris',
+        },
+        # over midnight and over the DST change
+        {
+            'hours_start': '22:00',
+            'hours_end': '03:30',
+            'week_days': [6, 7],
+            'month_days': [],
+            'months': [3],
+            'timezone': 'Europe/Paris',
+        },
+        {
+            'hours_start': '12:00',
+            'hours_end': '13:00',
+            'week_days': [],
+            'month_days': [30],
+            'months': [],
+            'timezone': None,
+        },
+    ],
+    'exceptional_periods': [
+        {
+            'hours_start': '02:00',
+            'hours_end': '02:15',
+            'week_days': [],
+            'month_days': [29],
+            'months': [3],
+            'timezone': 'Europe/Paris',
+        },
+    ],
+}
+
+
+def cel(linkedid, minutes, eventtype='CHAN_START', **fields):
+    values = {
+        'id': None,
+        'linkedid': linkedid,
+        'uniqueid': linkedid,
+        'eventtime': T0 + timedelta(minutes=minutes),
+        'eventtype': eventtype,
+        'channame': 'PJSIP/1001-00000001',
+        'context': 'default',
+        'cid_dnid': '',
+        'exten': '',
+        'appdata': '',
+    }
+    values.update(fields)
+    return SimpleNamespace(**values)
+
+
+def inbound_call(linkedid, minutes, did='2150001', channame='PJSIP/trunk1-00000001'):
+    return [
+        cel(linkedid, minutes, channame=channame, context='did', cid_dnid=did),
+        cel(linkedid, minutes, 'XIVO_INCALL', channame=channame),
+        cel(linkedid, minutes + 1, 'LINKEDID_END', channame=channame),
+    ]
+
+
+def outbound_call(linkedid, minutes, appdata='PJSIP/0912@trunk2'):
+    return [
+        cel(linkedid, minutes),
+        cel(linkedid, minutes, 'XIVO_OUTCALL'),
+        cel(linkedid, minutes, 'APP_START', appdata=appdata),
+        cel(linkedid, minutes + 1, 'LINKEDID_END'),
+    ]
+
+
+def internal_call(linkedid, minutes, channame='PJSIP/1001-00000001'):
+    return [cel(linkedid, minutes, channame=channame), cel(linkedid, minutes + 1, 'LINKEDID_END')]
+
+
+class _Session:
+    def __init__(self, cels):
+        self._cels = cels
+
+    def query(self, *args):
+        return self
+
+    def filter(self, *args):
+        return self
+
+    def __iter__(self):
+        return iter(self._cels)
+
+    def close(self):
+        pass
+
+
+@unittest.skipIf(np is None, 'the numpy engine requires numpy')
+class TestAggregateCalls(unittest.TestCase):
+    def report(self, engine, cels, periods=PERIODS):
+        service = services.build_otp_request_service(
+            None, {'workano_reports': {'reports': {'engine': engine}}}
+        )
+        service._get_work_hours_from_confd = lambda config, tenant, schedule_id=None: periods
+        service._find_number_from_trunk_db = lambda session, name: {'trunk2': '2150002'}.get(name)
+        with mock.patch.object(services, 'Session', lambda: _Session(cels)):
+            return service._compute_reports({}, config={'confd': {}}, tenant='tenant')
+
+    def assert_same_report(self, cels, periods=PERIODS):
+        python = self.report('python', cels, periods)
+        numpy = self.report('numpy', cels, periods)
+        self.assertEqual(numpy, python)
+        return python
+
+    def test_no_calls(self):
+        report = self.assert_same_report([])
+
+        self.assertEqual(report['total']['total'], 0)
+
+    def test_directions_and_trunks(self):
+        cels = (
+            inbound_call('in1', 0)
+            + inbound_call('in2', 5, did='', channame='SIP/trunk3;2@host')
+            + outbound_call('out1', 10)
+            + outbound_call('out2', 15, appdata='no trunk')
+            + internal_call('int1', 20)
+            + internal_call('int2', 25, channame='nochannel')
+        )
+
+        report = self.assert_same_report(cels)
+
+        self.assertEqual(report['total']['total'], 6)
+        self.assertEqual(report['by_direction']['inbound']['total'], 2)
+        self.assertEqual(report['by_direction']['outbound']['total'], 2)
+
+    def test_working_hours_over_the_dst_change(self):
+        # every 10 minutes from 2026-03-28T20:00Z to 2026-03-30T20:00Z
+        cels = []
+        for index in range(6 * 48):
+            cels += inbound_call(f'call{index}', index * 10)
+
+        report = self.assert_same_report(cels)
+
+        self.assertEqual(report['total']['total'], 6 * 48)
+        self.assertGreater(report['total']['working_hours'], 0)
+        self.assertGreater(report['total']['outside_working_hours'], 0)
+
+    def test_without_schedule_all_calls_are_outside_working_hours(self):
+        cels = inbound_call('in1', 0) + internal_call('int1', 5)
+
+        report = self.assert_same_report(cels, periods=None)
+
+        self.assertEqual(report['total']['working_hours'], 0)
+        self.assertEqual(report['total']['outside_working_hours'], 2)
@@ -0,0 +1,217 @@
+"""NumPy engine of the CEL based report.
+
+`aggregate_calls` takes the calls scanned by `_compute_reports` and returns the
+same result as its Python loop: the per-call fields are loaded into arrays, the
+trunk is extracted from the channel names with vectorized string operations and
+dictionary-encoded, direction and working hours are computed with masks, and
+every counter comes from one np.bincount over a (trunk, direction, working
+hours) key.
+"""
+from datetime import datetime, timedelta, timezone
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+DIRECTIONS = ('inbound', 'outbound', 'internal')
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECONDS_PER_DAY = 86400 * 10**6
+# UTC offsets are computed once per quarter of an hour, the finest granularity
+# of time zone transitions
+OFFSET_BUCKET = 15 * 60 * 10**6
+
+
+def _microseconds(value):
+    return value // timedelta(microseconds=1)
+
+
+def _string(value):
+    return str(value) if value else ''
+
+
+def _channel_trunks(channames):
+    """Return what `^[^/]+/([^\\-;:@]+)` captures in each channel name, '' without match."""
+    if not len(channames):
+        return channames
+    parts = np.char.partition(channames, '/')
+    trunks = parts[:, 2]
+    matched = (parts[:, 1] == '/') & (np.char.str_len(parts[:, 0]) > 0)
+    for separator in '-;:@':
+        trunks = np.char.partition(trunks, separator)[:, 0]
+    matched &= np.char.str_len(trunks) > 0
+    return np.where(matched, trunks, '')
+
+
+def _local_microseconds(first_events, tz):
+    """Return the wall-clock time of each event as microseconds since the epoch.
+
+    Events are converted to `tz` like datetime.astimezone, or keep their own
+    wall-clock time when `tz` is None.
+    """
+    if tz is None:
+        naive_epoch = EPOCH.replace(tzinfo=None)
+        return np.array(
+            [_microseconds(event.replace(tzinfo=None) - naive_epoch) for event in first_events],
+            dtype='int64',
+        )
+    utc = np.array(
+        [_microseconds(event.astimezone(timezone.utc) - EPOCH) for event in first_events],
+        dtype='int64',
+    )
+    buckets, inverse = np.unique(utc // OFFSET_BUCKET, return_inverse=True)
+    offsets = np.empty(len(buckets), dtype='int64')
+    constant = np.ones(len(buckets), dtype=bool)
+    for index, bucket in enumerate(buckets.tolist()):
+        start = EPOCH + timedelta(microseconds=bucket * OFFSET_BUCKET)
+        first = start.astimezone(tz).utcoffset()
+        last = (start + timedelta(microseconds=OFFSET_BUCKET - 1)).astimezone(tz).utcoffset()
+        offsets[index] = _microseconds(first)
+        constant[index] = first == last
+    local = utc + offsets[inverse]
+    # a transition within the quarter: offsets of its events one by one
+    for index in np.flatnonzero(~constant[inverse]).tolist():
+        instant = EPOCH + timedelta(microseconds=int(utc[index]))
+        local[index] = utc[index] + _microseconds(instant.astimezone(tz).utcoffset())
+    return local
+
+
+def _in_periods(first_events, periods):
+    """Return whether each event falls into any of the compiled `periods`."""
+    result = np.zeros(len(first_events), dtype=bool)
+    local_times = {}
+    for period in periods:
+        tz = period['timezone']
+        if tz not in local_times:
+            local = _local_microseconds(first_events, tz)
+            days = local // MICROSECONDS_PER_DAY
+            day = days.astype('datetime64[D]')
+            month = day.astype('datetime64[M]')
+            local_times[tz] = {
+                'time': local - days * MICROSECONDS_PER_DAY,
+                # 1970-01-01 is a Thursday, isoweekday 4
+                'week_day': (days + 3) % 7 + 1,
+                'month': month.astype('int64') % 12 + 1,
+                'month_day': (day - month.astype('datetime64[D]')).astype('int64') + 1,
+            }
+        fields = local_times[tz]
+        mask = np.ones(len(first_events), dtype=bool)
+        for name, values in (
+            ('month', period['months']),
+            ('month_day', period['month_days']),
+            ('week_day', period['week_days']),
+        ):
+            if values:
+                mask &= np.isin(fields[name], [value for value in values if isinstance(value, int)])
+        start, end = period['start'], period['end']
+        time = fields['time']
+        in_hours = (start <= time) & (time < end)
+        if end <= start:
+            # overnight period, e.g. 22:00-06:00
+            in_hours |= (time >= start) | (time < end)
+        result |= mask & in_hours
+    return result
+
+
+def aggregate_calls(calls, schedule_periods=None):
+    """Count the scanned `calls` by direction and trunk, within and outside working hours.
+
+    `schedule_periods` holds the open and exceptional periods compiled by
+    `_compile_schedule_periods`: time zone, months, month_days, week_days and
+    start / end as microseconds of the day. Without them, all calls are outside
+    working hours.
+    """
+    infos = list(calls.values())
+    count = len(infos)
+    incall = np.fromiter(
+        (
+            'XIVO_INCALL' in info['eventtypes'] or 'xivo_incall' in info['eventtypes']
+            for info in infos
+        ),
+        dtype=bool,
+        count=count,
+    )
+    outcall = np.fromiter(
+        (
+            'XIVO_OUTCALL' in info['eventtypes'] or 'xivo_outcall' in info['eventtypes']
+            for info in infos
+        ),
+        dtype=bool,
+        count=count,
+    )
+    direction = np.where(incall, 0, np.where(outcall, 1, 2))
+
+    did = np.array([_string(info.get('did_cid_dnid')) for info in infos], dtype=str)
+    outcall_number = np.array(
+        [_string(info.get('outcall_trunk_number')) for info in infos], dtype=str
+    )
+    outcall_trunk = np.array([_string(info.get('outcall_trunk')) for info in infos], dtype=str)
+    channames = np.array(
+        [info.get('did_channame') or info.get('channame') or '' for info in infos], dtype=str
+    )
+    outbound = direction == 1
+    channel_trunk = _channel_trunks(channames)
+    trunk = np.where(
+        did != '',
+        did,
+        np.where(
+            outbound & (outcall_number != ''),
+            outcall_number,
+            np.where(channel_trunk != '', channel_trunk, np.where(outbound, outcall_trunk, '')),
+        ),
+    )
+
+    in_work = np.zeros(count, dtype=bool)
+    if schedule_periods is not None and count:
+        with_event = np.fromiter(
+            (info.get('first_event') is not None for info in infos), dtype=bool, count=count
+        )
+        indexes = np.flatnonzero(with_event)
+        first_events = [infos[index]['first_event'] for index in indexes.tolist()]
+        in_open = _in_periods(first_events, schedule_periods['open_periods'])
+        in_exception = _in_periods(first_events, schedule_periods['exceptional_periods'])
+        in_work[indexes] = in_open & ~in_exception
+
+    # trunks in the order of their first call, as the Python loop adds them
+    names, first, codes = np.unique(trunk, return_index=True, return_inverse=True)
+    order = np.argsort(first, kind='stable')
+    key = (codes * 3 + direction) * 2 + in_work
+    counts = np.bincount(key, minlength=len(names) * 6).reshape(len(names), 3, 2)
+    pairs, pair_first = np.unique(codes * 3 + direction, return_index=True)
+
+    def counters(values):
+        # values: [outside working hours, working hours]
+        return {
+            'working_hours': int(values[1]),
+            'outside_working_hours': int(values[0]),
+            'total': int(values[0] + values[1]),
+        }
+
+    result = {
+        'total': dict(counters(counts.sum(axis=(0, 1))), by_trunk={}),
+        'by_direction': {
+            name: dict(counters(counts[:, index].sum(axis=0)), by_trunk={})
+            for index, name in enumerate(DIRECTIONS)
+        },
+        'by_trunk': {},
+    }
+    for code in order.tolist():
+        name = str(names[code])
+        if not name:
+            continue
+        result['total']['by_trunk'][name] = counters(counts[code].sum(axis=0))
+        result['by_trunk'][name] = {
+            'total': counters(counts[code].sum(axis=0)),
+            'by_direction': {
+                direction_name: counters(counts[code, index])
+                for index, direction_name in enumerate(DIRECTIONS)
+            },
+        }
+    for pair in pairs[np.argsort(pair_first, kind='stable')].tolist():
+        code, index = divmod(pair, 3)
+        name = str(names[code])
+        if name:
+            result['by_direction'][DIRECTIONS[index]]['by_trunk'][name] = counters(
+                counts[code, index]
+            )
+    return result
@@ -1,20 +1,44 @@
 # Copyright 2013-2023 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
+import logging
+from datetime import datetime, timezone
+
+from sqlalchemy.dialects.postgresql import insert
 from wazo_call_logd.database.queries import DAO
 from xivo_dao.helpers.db_manager import daosession
 
-from workano_reports_plugin.models import ReportsCallLog
+from workano_reports_plugin.dao import (
+    CEL_WATERMARK,
+    find_call_log_dates,
+    find_call_log_numbers,
+    invalidate_rollups,
+    rollup_hour,
+    update_number_sketches,
+)
+from workano_reports_plugin.metrics import timed_stage, written_call_logs
+from workano_reports_plugin.models import (
+    ReportsCallLog,
+    ReportsProcessedLinkedid,
+    ReportsWatermark,
+)
+
+logger = logging.getLogger(__name__)
+
 
 @daosession
 def delete_from_list(session, call_log_ids):
+    if not call_log_ids:
+        return
+    dates = session.query(ReportsCallLog.date).filter(ReportsCallLog.id.in_(call_log_ids))
+    invalidate_rollups(session, {rollup_hour(date) for date, in dates})
     query = session.query(ReportsCallLog)
     query = query.filter(ReportsCallLog.id.in_(call_log_ids))
     query.delete(synchronize_session=False)
     session.commit()
 
 @daosession
-def create_from_list(session, call_logs):
-    if not call_logs:
+def create_from_list(session, call_logs, processed_linkedids=None, watermark=None):
+    if not call_logs and not processed_linkedids and watermark is None:
         return
     for call_log in call_logs:
         session.add(call_log)
@@ -24,18 +48,97 @@ def create_from_list(session, call_logs):
         call_log.source_participant
         call_log.destination_participant
     session.expunge_all()
+    # rollups of the hours of late call logs are stale
+    invalidate_rollups(session, {rollup_hour(call_log.date) for call_log in call_logs})
+    # committed with the call logs, so a CEL is never processed twice
+    _mark_processed(session, processed_linkedids, watermark)
     session.commit()
 
 
+def _mark_processed(session, processed_linkedids, watermark):
+    now = datetime.now(timezone.utc)
+    if processed_linkedids:
+        statement = insert(ReportsProcessedLinkedid).values(
+            [
+                {'linkedid': linkedid, 'max_cel_id': max_cel_id, 'processed_at': now}
+                for linkedid, max_cel_id in processed_linkedids.items()
+            ]
+        )
+        session.execute(
+            statement.on_conflict_do_update(
+                index_elements=[ReportsProcessedLinkedid.linkedid],
+                set_={
+                    'max_cel_id': statement.excluded.max_cel_id,
+                    'processed_at': statement.excluded.processed_at,
+                },
+            )
+        )
+    if watermark is not None:
+        statement = insert(ReportsWatermark).values(
+            name=CEL_WATERMARK, cel_id=watermark, updated_at=now
+        )
+        session.execute(
+            statement.on_conflict_do_update(
+                index_elements=[ReportsWatermark.name],
+                set_={'cel_id': watermark, 'updated_at': now},
+            )
+        )
+        # CELs under the watermark are never read again, neither are their linkedids
+        session.query(ReportsProcessedLinkedid).filter(
+            ReportsProcessedLinkedid.max_cel_id <= watermark
+        ).delete(synchronize_session=False)
+
+
 class CallLogsWriter:
-    def __init__(self, dao):
+    def __init__(self, dao, number_sketch_capacity=None, columnar_cache=None):
         self._dao: DAO = dao
+        # counters of the number sketches, None when they are not maintained
+        self._number_sketch_capacity = number_sketch_capacity
+        self._columnar_cache = columnar_cache
+
+    def write(self, call_logs, watermark=None):
+        with timed_stage('write'):
+            removed = []
+            if self._number_sketch_capacity and call_logs.call_logs_to_delete:
+                removed = find_call_log_numbers(call_logs.call_logs_to_delete)
+            removed_dates = []
+            if self._columnar_cache is not None and call_logs.call_logs_to_delete:
+                removed_dates = find_call_log_dates(call_logs.call_logs_to_delete)
+            delete_from_list(call_logs.call_logs_to_delete)
+            # self._dao.cel.unassociate_all_from_call_log_ids(call_logs.call_logs_to_delete)
+            tenant_uuids = {cdr.tenant_uuid for cdr in call_logs.new_call_logs}
+            self._dao.tenant.create_all_uuids_if_not_exist(tenant_uuids)
+            create_from_list(
+                call_logs.new_call_logs, call_logs.processed_linkedids, watermark
+            )
+            self._dao.call_log.create_from_list
+            if self._number_sketch_capacity:
+                self._update_number_sketches(call_logs.new_call_logs, removed)
+            if self._columnar_cache is not None:
+                self._update_columnar_cache(call_logs.new_call_logs, removed_dates)
+        written_call_logs.inc(len(call_logs.new_call_logs))
+        # self._dao.cel.associate_all_to_call_logs(call_logs.new_call_logs)
+
+    def _update_number_sketches(self, new_call_logs, removed):
+        added = [
+            (
+                call_log.date,
+                call_log.tenant_uuid,
+                call_log.trunk,
+                call_log.source_exten,
+                call_log.destination_exten,
+            )
+            for call_log in new_call_logs
+        ]
+        try:
+            update_number_sketches(added, removed, self._number_sketch_capacity)
+        except Exception:
+            # the call logs are written, only the approximate analytics miss them
+            logger.exception('failed to update the number sketches')
 
-    def write(self, call_logs):
-        delete_from_list(call_logs.call_logs_to_delete)
-        # self._dao.cel.unassociate_all_from_call_log_ids(call_logs.call_logs_to_delete)
-        tenant_uuids = {cdr.tenant_uuid for cdr in call_logs.new_call_logs}
-        self._dao.tenant.create_all_uuids_if_not_exist(tenant_uuids)
-        create_from_list(call_logs.new_call_logs)
-        self._dao.call_log.create_from_list
-        # self._dao.cel.associate_all_to_call_logs(call_logs.new_call_logs)
\ No newline at end of file
+    def _update_columnar_cache(self, new_call_logs, removed_dates):
+        try:
+            self._columnar_cache.update(new_call_logs, removed_dates)
+        except Exception:
+            # the days being changed are left to SQL until they are rebuilt
+            logger.exception('failed to update the columnar cache')